@@ -0,0 +1,175 @@
+"""Alertas de sequência avaliados no ingest.
+
+As regras ficam indexadas por (mercado, tamanho de grupo, tipo): cada
+entrada atualizada por um tick consulta só as regras dela (um acesso a
+dict), sem varrer a árvore de estatísticas. Uma regra dispara quando a
+sequência atual passa do limite e só volta a disparar depois que a
+condição deixa de valer (dedupe) e o cooldown passa. Os eventos são
+acumulados sob o lock do ingest e entregues aos sinks depois dele.
+"""
+
+import json
+import queue
+import threading
+import time
+import urllib.request
+from collections import defaultdict, deque, namedtuple
+
+# field: campo da entrada comparado com o limite ("seq_loss" ou "seq_win")
+# markets: mercados da regra (None = todos)
+AlertRule = namedtuple("AlertRule", ["group_len", "threshold", "tipo", "field", "markets"])
+
+
+def rules_from_thresholds(thresholds, tipo="geral", field="seq_loss", markets=None):
+    """Regras a partir de ``{group_len: limite}``"""
+    return [AlertRule(group_len, threshold, tipo, field, markets) for group_len, threshold in thresholds.items()]
+
+
+class AlertEngine:
+    """Avalia as regras das entradas tocadas por cada tick"""
+
+    def __init__(self, rules, markets, cooldown=0, sinks=(), history=100):
+        self._index = defaultdict(list)  # (market, group_len, tipo) -> regras
+        for rule in rules:
+            for market in rule.markets or markets:
+                self._index[(market, rule.group_len, rule.tipo)].append(rule)
+        self.cooldown = cooldown
+        self.sinks = list(sinks)
+        self._active = {}  # (market, regra) acima do limite -> alerta foi enviado
+        self._last_fired = {}  # (market, regra) -> instante do último alerta
+        self._pending = []
+        self.recent = deque(maxlen=history)
+        self.fired = 0
+        self.suppressed = 0
+
+    def check(self, market, group_len, tipo, entry, version, notify=True):
+        """Compara a entrada atualizada com as regras dela.
+
+        Com ``notify=False`` só arma o estado (usado ao reconstruir do log).
+        """
+        rules = self._index.get((market, group_len, tipo))
+        if not rules:
+            return
+        for rule in rules:
+            value = entry[rule.field]
+            key = (market, rule)
+            if value > rule.threshold:
+                if key in self._active:
+                    continue  # Já está acima do limite: não repete o alerta
+                now = time.time()
+                cooling = now - self._last_fired.get(key, float("-inf")) < self.cooldown
+                self._active[key] = notify and not cooling
+                if not notify:
+                    continue
+                if cooling:
+                    self.suppressed += 1
+                    continue
+                self._last_fired[key] = now
+                self.fired += 1
+                self._pending.append(self._event("alert", market, rule, value, version, now))
+            elif key in self._active:
+                if self._active.pop(key) and notify:
+                    self._pending.append(self._event("clear", market, rule, value, version, time.time()))
+
+    @staticmethod
+    def _event(kind, market, rule, value, version, now):
+        return {
+            "type": kind,
+            "market": market,
+            "group_len": rule.group_len,
+            "tipo": rule.tipo,
+            "field": rule.field,
+            "value": value,
+            "threshold": rule.threshold,
+            "version": version,
+            "timestamp": now
+        }
+
+    def drain(self):
+        """Eventos gerados desde a última chamada (chamado sob o lock do ingest)"""
+        events, self._pending = self._pending, []
+        self.recent.extend(events)
+        return events
+
+    def dispatch(self, events):
+        """Entrega os eventos aos sinks (fora do lock do ingest)"""
+        if not events:
+            return
+        for sink in self.sinks:
+            try:
+                sink(events)
+            except Exception as e:
+                print(f"[Alertas] Erro no sink {type(sink).__name__}: {e}")
+
+    def reset(self):
+        self._active.clear()
+        self._pending = []
+
+    def active_alerts(self):
+        """Alertas abertos (acima do limite e enviados)"""
+        return [
+            {"market": market, "group_len": rule.group_len, "tipo": rule.tipo,
+             "field": rule.field, "threshold": rule.threshold}
+            for (market, rule), sent in tuple(self._active.items()) if sent
+        ]
+
+    def stats(self):
+        return {
+            "rules": sum(len(rules) for rules in self._index.values()),
+            "fired": self.fired,
+            "suppressed": self.suppressed,
+            "active": sum(1 for sent in tuple(self._active.values()) if sent)
+        }
+
+
+# === Sinks ===
+
+class LogSink:
+    """Grava os eventos em um arquivo JSON Lines (ou no console, sem arquivo)"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8", buffering=1) if path else None
+
+    def __call__(self, events):
+        for event in events:
+            if self._file is None:
+                print(f"[Alerta] {event['type']} {event['market']} grupo {event['group_len']} "
+                      f"{event['tipo']}: {event['field']}={event['value']} (limite {event['threshold']})")
+            else:
+                self._file.write(json.dumps(event, separators=(",", ":")) + "\n")
+
+
+class WebhookSink:
+    """POST JSON dos eventos para uma URL, em um thread próprio.
+
+    O ingest só enfileira: com a fila cheia (webhook lento ou fora do ar)
+    os lotes novos são descartados e contados em ``dropped``.
+    """
+
+    def __init__(self, url, timeout=5.0, max_pending=100):
+        self.url = url
+        self.timeout = timeout
+        self.dropped = 0
+        self._queue = queue.Queue(max_pending)
+        self._thread = threading.Thread(target=self._run, name="alert-webhook", daemon=True)
+        self._thread.start()
+
+    def __call__(self, events):
+        try:
+            self._queue.put_nowait(events)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            events = self._queue.get()
+            body = json.dumps({"alerts": events}, separators=(",", ":")).encode()
+            request = urllib.request.Request(
+                self.url, data=body, headers={"Content-Type": "application/json"}, method="POST"
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+            except Exception as e:
+                print(f"[Alertas] Falha no webhook {self.url}: {e}")
@@ -0,0 +1,273 @@
+"""Motor vetorizado (NumPy) para backtest em lote da estratégia.
+
+Converte os ticks em um array de dígitos uma única vez e calcula todos os
+tamanhos de grupo juntos: tamanho da sequência de mesma paridade e da
+sequência sem repetições terminando em cada posição, máscara de entradas
+por tamanho de grupo e contagens por soma. O resultado tem exatamente o
+mesmo formato de ``WebSocketController._calculate_filtered_stats``.
+"""
+
+import numpy as np
+from src.strategy_engine import TIPOS
+from src.window_stats import empty_entry, format_entry
+
+
+def parse_group_lens(value, allowed=None):
+    """Tamanhos de grupo de um texto como "3-8" ou "3,5,10-12" (só os de ``allowed``, se informado).
+
+    Retorna a tupla ordenada ou None se o texto for inválido ou não sobrar nenhum tamanho.
+    """
+    group_lens = set()
+    try:
+        for part in str(value).split(","):
+            low, _, high = part.strip().partition("-")
+            group_lens.update(range(int(low), int(high or low) + 1))
+    except ValueError:
+        return None
+    if allowed is not None:
+        group_lens.intersection_update(allowed)
+    if not group_lens or min(group_lens) < 1:
+        return None
+    return tuple(sorted(group_lens))
+
+
+def digits_from_prices(prices, pip_size=2):
+    """Extrai o último dígito (casa decimal ``pip_size``) de um array de cotações"""
+    prices = np.asarray(prices, dtype=np.float64)
+    scaled = np.rint(prices * (10 ** pip_size)).astype(np.int64)
+    return (scaled % 10).astype(np.uint8)
+
+
+def run_lengths(breaks):
+    """Tamanho da sequência terminando em cada posição.
+
+    ``breaks[i]`` indica que uma nova sequência começa na posição ``i``.
+    """
+    n = len(breaks)
+    index = np.arange(n)
+    starts = np.where(breaks, index, 0)
+    np.maximum.accumulate(starts, out=starts)
+    return index - starts + 1
+
+
+def streaks(results):
+    """Retorna (max_win, max_loss, seq_win_atual, seq_loss_atual) de uma série de resultados"""
+    if len(results) == 0:
+        return 0, 0, 0, 0
+    change = np.flatnonzero(results[1:] != results[:-1]) + 1
+    starts = np.concatenate(([0], change))
+    lengths = np.diff(np.concatenate((starts, [len(results)])))
+    kinds = results[starts]
+    max_win = int(lengths[kinds].max(initial=0))
+    max_loss = int(lengths[~kinds].max(initial=0))
+    current = int(lengths[-1])
+    if kinds[-1]:
+        return max_win, max_loss, current, 0
+    return max_win, max_loss, 0, current
+
+
+def group_limits(digits, repeat_filter=True):
+    """Maior grupo válido terminando em cada posição (menos a última) e as paridades.
+
+    O grupo é válido se é todo da mesma paridade e, com ``repeat_filter``,
+    não tem dígitos repetidos em sequência. Retorna ``(limit, breaks_parity,
+    parity)``.
+    """
+    digits = np.asarray(digits, dtype=np.int8)
+    parity = digits & 1
+    breaks_parity = np.ones(len(digits), dtype=bool)
+    breaks_parity[1:] = parity[1:] != parity[:-1]
+    limit = run_lengths(breaks_parity)
+    if repeat_filter:
+        breaks_repeat = np.ones(len(digits), dtype=bool)
+        breaks_repeat[1:] = digits[1:] == digits[:-1]
+        limit = np.minimum(limit, run_lengths(breaks_repeat))
+    return limit[:-1], breaks_parity, parity
+
+
+def entry_masks(digits, group_lens, start=0, repeat_filter=True):
+    """Calcula as máscaras de entrada de todos os tamanhos de grupo.
+
+    Só as posições com ao menos uma entrada são mantidas (em ordem), e só
+    as entradas cujo dígito apostado está em ``start`` ou depois: os dígitos
+    anteriores servem apenas de contexto para grupos que começam antes.
+    Retorna ``(mask, win, even)``: ``mask[k, j]`` indica entrada na k-ésima
+    posição para ``group_lens[j]``, ``win[k]`` o resultado dessa entrada e
+    ``even[k]`` se o grupo que a originou é de pares.
+    """
+    limit, breaks_parity, parity = group_limits(digits, repeat_filter)
+    lens = np.asarray(group_lens, dtype=np.int64)
+    candidates = np.flatnonzero(limit >= lens.min())
+    if start > 1:
+        candidates = candidates[candidates >= start - 1]
+    mask = limit[candidates, None] >= lens[None, :]
+    win = breaks_parity[1:][candidates]
+    even = parity[:-1][candidates] == 0
+    return mask, win, even
+
+
+def continue_entry(entry, results):
+    """Continua uma entrada formatada com uma nova série de resultados (True = win)"""
+    if len(results) == 0:
+        return entry
+    max_win, max_loss, seq_win, seq_loss = streaks(results)
+    wins = int(results.sum())
+
+    # A primeira sequência da série emenda na sequência atual da entrada
+    first = bool(results[0])
+    changes = np.flatnonzero(results[1:] != results[:-1])
+    lead = int(changes[0]) + 1 if len(changes) else len(results)
+    carried = lead + (entry["seq_win_atual"] if first else entry["seq_loss_atual"])
+    if first:
+        max_win = max(max_win, carried)
+    else:
+        max_loss = max(max_loss, carried)
+    if lead == len(results):
+        seq_win, seq_loss = (carried, 0) if first else (0, carried)
+
+    return format_entry(
+        entry["wins"] + wins,
+        entry["losses"] + len(results) - wins,
+        seq_win,
+        seq_loss,
+        max(max_win, entry["max_win"]),
+        max(max_loss, entry["max_loss"])
+    )
+
+
+def calculate_stats(digits, group_lens, start=0, previous=None, repeat_filter=True):
+    """Calcula as estatísticas de todos os tamanhos de grupo sobre um array de dígitos.
+
+    ``digits[:start]`` é só contexto (nenhuma entrada aposta nesses dígitos).
+    Com ``previous`` (no mesmo formato), as estatísticas acumuladas até
+    ``start`` são continuadas em vez de começar do zero. Sem
+    ``repeat_filter``, grupos com dígitos repetidos em sequência também valem.
+    """
+    group_lens = tuple(group_lens)
+    if previous is None:
+        groups = {str(group_len): {tipo: empty_entry() for tipo in TIPOS} for group_len in group_lens}
+    else:
+        groups = {str(group_len): dict(previous[str(group_len)]) for group_len in group_lens}
+    if len(digits) < 2 or not group_lens:
+        return groups
+
+    mask, win, even = entry_masks(digits, group_lens, start, repeat_filter)
+    selectors = {
+        "geral": mask,
+        "pares": mask & even[:, None],
+        "impares": mask & ~even[:, None],
+    }
+    for tipo, selected in selectors.items():
+        entradas = selected.sum(axis=0)
+        wins = (selected & win[:, None]).sum(axis=0)
+        for j, group_len in enumerate(group_lens):
+            if entradas[j] == 0:
+                continue
+            if previous is not None:
+                entry = groups[str(group_len)][tipo]
+                groups[str(group_len)][tipo] = continue_entry(entry, win[selected[:, j]])
+                continue
+            max_win, max_loss, seq_win, seq_loss = streaks(win[selected[:, j]])
+            groups[str(group_len)][tipo] = format_entry(
+                int(wins[j]),
+                int(entradas[j] - wins[j]),
+                seq_win,
+                seq_loss,
+                max_win,
+                max_loss
+            )
+    return groups
+
+
+# === Resumos parciais (trechos calculados em paralelo) ===
+
+def summarize(results):
+    """Resumo associativo de uma série de resultados (True = win), ou None se vazia.
+
+    ``(wins, entradas, max_win, max_loss, primeira_win, primeira_len, última_win, última_len)``:
+    além dos totais, guarda a primeira e a última sequência, que podem
+    emendar com os trechos vizinhos.
+    """
+    if len(results) == 0:
+        return None
+    max_win, max_loss, seq_win, seq_loss = streaks(results)
+    first = bool(results[0])
+    changes = np.flatnonzero(results[1:] != results[:-1])
+    lead = int(changes[0]) + 1 if len(changes) else len(results)
+    last = bool(results[-1])
+    return (int(results.sum()), len(results), max_win, max_loss,
+            first, lead, last, seq_win if last else seq_loss)
+
+
+def merge_summaries(first, second):
+    """Junta os resumos de dois trechos consecutivos"""
+    if first is None:
+        return second
+    if second is None:
+        return first
+    wins_a, count_a, max_win, max_loss, head_win, head_len, tail_win, tail_len = first
+    wins_b, count_b, max_win_b, max_loss_b, head_win_b, head_len_b, tail_win_b, tail_len_b = second
+    max_win = max(max_win, max_win_b)
+    max_loss = max(max_loss, max_loss_b)
+    if tail_win == head_win_b:
+        # A última sequência do primeiro trecho continua no segundo
+        joined = tail_len + head_len_b
+        if tail_win:
+            max_win = max(max_win, joined)
+        else:
+            max_loss = max(max_loss, joined)
+        if head_len == count_a:
+            head_len = joined
+        if tail_len_b == count_b:
+            tail_len_b = joined
+    return (wins_a + wins_b, count_a + count_b, max_win, max_loss,
+            head_win, head_len, tail_win_b, tail_len_b)
+
+
+def format_summary(summary):
+    """Entrada no formato da API a partir de um resumo"""
+    if summary is None:
+        return empty_entry()
+    wins, entradas, max_win, max_loss, _, _, last, current = summary
+    return format_entry(wins, entradas - wins, current if last else 0, 0 if last else current, max_win, max_loss)
+
+
+def partial_stats(digits, group_lens, start=0, repeat_filter=True):
+    """Resumos de cada (group_len, tipo) das entradas de um trecho de dígitos.
+
+    Como em ``calculate_stats``, ``digits[:start]`` é só contexto. Trechos
+    consecutivos são juntados com ``merge_partials``.
+    """
+    group_lens = tuple(group_lens)
+    partials = {str(group_len): dict.fromkeys(TIPOS) for group_len in group_lens}
+    if len(digits) < 2 or not group_lens:
+        return partials
+
+    mask, win, even = entry_masks(digits, group_lens, start, repeat_filter)
+    selectors = {
+        "geral": mask,
+        "pares": mask & even[:, None],
+        "impares": mask & ~even[:, None],
+    }
+    for tipo, selected in selectors.items():
+        for j, group_len in enumerate(group_lens):
+            partials[str(group_len)][tipo] = summarize(win[selected[:, j]])
+    return partials
+
+
+def merge_partials(first, second):
+    """Junta os resumos de dois trechos consecutivos (mesmos tamanhos de grupo ou disjuntos)"""
+    merged = {group_len: dict(tipos) for group_len, tipos in first.items()}
+    for group_len, tipos in second.items():
+        target = merged.setdefault(group_len, dict.fromkeys(TIPOS))
+        for tipo, summary in tipos.items():
+            target[tipo] = merge_summaries(target[tipo], summary)
+    return merged
+
+
+def format_partials(partials):
+    """Grupos no formato de ``calculate_stats`` a partir dos resumos"""
+    return {
+        group_len: {tipo: format_summary(summary) for tipo, summary in tipos.items()}
+        for group_len, tipos in partials.items()
+    }
@@ -0,0 +1,332 @@
+"""Benchmarks dos caminhos quentes com ticks sintéticos.
+
+Os ticks vêm de ``src/tick_generator.py`` (semente fixa, um movimento por
+mercado com a volatilidade do índice), então duas execuções com os mesmos
+parâmetros medem exatamente o mesmo trabalho. Nada é gravado em disco nem
+acessa a rede: log de ticks, histórico e log de alertas ficam desativados.
+
+Cenários:
+
+- ``simulate_strategy``: custo por tick do motor incremental e das janelas;
+- ``filtered_stats/<filtro>``: recálculo vetorizado de cada tamanho de
+  filtro e de "sem_filtro" sobre o buffer cheio;
+- ``get_filtered_results/<filtro>``: leitura servida às rotas (snapshots
+  para as janelas ao vivo, recálculo para as demais);
+- ``get_formatted_results`` (completo e delta);
+- ``api_data_json/<filtro>``: montagem e serialização do corpo de
+  ``/api/data``, e ``api_data_route`` com o cache de respostas;
+- ``on_message``: ticks/s de ponta a ponta, processando na hora (``sync``)
+  ou pela fila de ingest (``queued``).
+
+O resultado é um JSON com os tempos (mediana, mínimo, média por chamada) e
+os metadados da execução (commit, versões, CPU), para comparar execuções
+entre commits com ``--compare``.
+
+Uso::
+
+    python src/benchmark.py --output bench.json
+    python src/benchmark.py --ticks 5000 --scenarios simulate_strategy,on_message --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+# O benchmark não lê nem grava nada em src/database nem na memória compartilhada do coletor
+for _name in ("TICK_LOG_DIR", "TICK_STORE_PATH", "ALERT_LOG_PATH", "SHARED_STATS_NAME"):
+    os.environ[_name] = ""
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src import websocket_controller as controller_module
+from src.ingest_queue import IngestWorker
+from src.tick_generator import generate_messages
+from src.tick_parser import parse_tick_message
+
+DEFAULT_TICKS = 20000  # ticks por mercado
+DEFAULT_E2E_TICKS = 10000  # mensagens (todos os mercados) dos cenários de ponta a ponta
+DEFAULT_REPEAT = 5
+MIN_SAMPLE_SECONDS = 0.05  # chamadas rápidas são repetidas até somar esse tempo por amostra
+EXTRA_FILTERS = (2000, "2h")  # filtros fora das janelas ao vivo (recalculados na leitura)
+
+
+# === Medição ===
+
+def summarize(samples, ticks=None):
+    """Estatísticas de tempos por chamada (s); com ``ticks``, também por tick"""
+    median = statistics.median(samples)
+    result = {
+        "median_s": median,
+        "min_s": min(samples),
+        "mean_s": statistics.fmean(samples),
+        "repeat": len(samples)
+    }
+    if ticks:
+        result["ticks"] = ticks
+        result["per_tick_us"] = round(median / ticks * 1e6, 3)
+        result["ticks_per_second"] = round(ticks / median)
+    return result
+
+
+def measure(function, repeat):
+    """Mede uma chamada sem estado, repetida o bastante para cada amostra ser estável"""
+    started = time.perf_counter()
+    function()
+    number = max(1, int(MIN_SAMPLE_SECONDS / max(time.perf_counter() - started, 1e-9)))
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        samples.append((time.perf_counter() - started) / number)
+    result = summarize(samples)
+    result["number"] = number
+    return result
+
+
+def measure_run(setup, run, repeat, ticks=None):
+    """Mede ``run(setup())``, com o estado novo de ``setup`` preparado fora do tempo"""
+    samples = []
+    for _ in range(repeat):
+        state = setup()
+        started = time.perf_counter()
+        run(state)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples, ticks)
+
+
+# === Dados ===
+
+def new_controller():
+    return controller_module.WebSocketController()
+
+
+def parsed_batches(messages, batch_size):
+    """Ticks já interpretados, em lotes como os do worker de ingest"""
+    now = time.time()
+    ticks = []
+    for message in messages:
+        parsed = parse_tick_message(message)
+        ticks.append((parsed.symbol, parsed, now))
+    return [ticks[start:start + batch_size] for start in range(0, len(ticks), batch_size)]
+
+
+def load_controller(controller, batches):
+    for batch in batches:
+        controller.process_ticks(batch)
+    return controller
+
+
+# === Cenários ===
+
+def bench_simulate_strategy(messages, markets, repeat):
+    market = markets[0]
+    ticks = [parse_tick_message(message) for message in messages]
+    ticks = [(tick.quote, tick.digit, tick.epoch) for tick in ticks if tick.symbol == market]
+
+    def run(controller):
+        queue = controller.tick_queues[market]
+        simulate = controller.simulate_strategy
+        for quote, digit, epoch in ticks:
+            queue.append(quote, digit, epoch)
+            simulate(market)
+
+    return {"simulate_strategy": measure_run(new_controller, run, repeat, len(ticks))}
+
+
+def bench_filtered_stats(controller, markets, repeat):
+    market = markets[0]
+    view = controller.tick_queues[market].view()
+    results = {}
+    for filter_value in (*controller_module.FILTER_WINDOWS, "sem_filtro"):
+        digits = view.digit_window(None if filter_value == "sem_filtro" else filter_value)
+        result = measure(lambda: controller._calculate_filtered_stats(market, digits), repeat)
+        result["ticks"] = len(digits)
+        results[f"filtered_stats/{filter_value}"] = result
+    return results
+
+
+def bench_filtered_results(controller, repeat):
+    return {
+        f"get_filtered_results/{filter_value}": measure(lambda: controller.get_filtered_results(filter_value), repeat)
+        for filter_value in (*controller_module.SNAPSHOT_KEYS, *EXTRA_FILTERS)
+    }
+
+
+def bench_formatted_results(controller, repeat):
+    since = controller.state_version - 1
+    return {
+        "get_formatted_results": measure(controller.get_formatted_results, repeat),
+        "get_formatted_results/delta": measure(lambda: controller.get_formatted_results(since), repeat)
+    }
+
+
+def bench_api_data(controller, batches, repeat):
+    results = {}
+    for filter_value in (controller.data_filter, "sem_filtro"):
+        results[f"api_data_json/{filter_value}"] = measure(
+            lambda: json.dumps(controller.get_filtered_results(filter_value), separators=(",", ":")).encode(),
+            repeat
+        )
+    try:
+        from flask import Flask
+        from src.routes import api
+    except ImportError as e:
+        print(f"[Benchmark] api_data_route ignorado: {e}", file=sys.stderr)
+        return results
+
+    # A rota usa a instância global do controlador: ela recebe os mesmos ticks
+    load_controller(api.websocket_controller, batches)
+    app = Flask(__name__)
+    app.register_blueprint(api.api_bp, url_prefix="/api")
+    client = app.test_client()
+    results["api_data_route"] = measure(lambda: client.get("/api/data").data, repeat)
+    return results
+
+
+def bench_on_message(messages, repeat):
+    ticks = len(messages)
+
+    def run_sync(controller):
+        on_message = controller.on_message
+        for message in messages:
+            pending = on_message(None, message)
+            if pending is not None:
+                controller.ingest_queue.put(pending)  # fila cheia: espera o worker, como o coletor
+
+    def setup_queued():
+        controller = new_controller()
+        controller.ingest_worker = IngestWorker(
+            controller.ingest_queue, controller.process_ticks, controller_module.INGEST_BATCH_SIZE
+        )
+        controller.ingest_worker.start()
+        return controller
+
+    def run_queued(controller):
+        run_sync(controller)
+        controller.ingest_worker.stop(timeout=None)  # espera a fila esvaziar
+
+    return {
+        "on_message/sync": measure_run(new_controller, run_sync, repeat, ticks),
+        "on_message/queued": measure_run(setup_queued, run_queued, repeat, ticks)
+    }
+
+
+SCENARIOS = ("simulate_strategy", "filtered_stats", "get_filtered_results", "get_formatted_results",
+             "api_data", "on_message")
+
+
+def run_benchmarks(ticks=DEFAULT_TICKS, seed=0, repeat=DEFAULT_REPEAT, scenarios=SCENARIOS, markets=None,
+                   e2e_ticks=DEFAULT_E2E_TICKS):
+    """Executa os cenários pedidos e retorna ``{"meta": ..., "results": ...}``"""
+    markets = tuple(markets or controller_module.MARKETS)
+    started = time.perf_counter()
+    # Os ticks terminam agora: as janelas de tempo ficam com o tamanho real
+    messages = generate_messages(markets, ticks, seed, start_epoch=int(time.time()) - ticks)
+    results = {}
+
+    if "simulate_strategy" in scenarios:
+        results.update(bench_simulate_strategy(messages, markets, repeat))
+    if any(name in scenarios for name in SCENARIOS[1:5]):
+        batches = parsed_batches(messages, controller_module.INGEST_BATCH_SIZE)
+        controller = load_controller(new_controller(), batches)
+        if "filtered_stats" in scenarios:
+            results.update(bench_filtered_stats(controller, markets, repeat))
+        if "get_filtered_results" in scenarios:
+            results.update(bench_filtered_results(controller, repeat))
+        if "get_formatted_results" in scenarios:
+            results.update(bench_formatted_results(controller, repeat))
+        if "api_data" in scenarios:
+            results.update(bench_api_data(controller, batches, repeat))
+    if "on_message" in scenarios:
+        results.update(bench_on_message(messages[:e2e_ticks], repeat))
+
+    elapsed = time.perf_counter() - started
+    return {"meta": _meta(ticks, e2e_ticks, seed, repeat, markets, elapsed), "results": results}
+
+
+def _meta(ticks, e2e_ticks, seed, repeat, markets, elapsed):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": int(time.time()),
+        "ticks_per_market": ticks,
+        "e2e_ticks": e2e_ticks,
+        "markets": list(markets),
+        "seed": seed,
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "elapsed_s": round(elapsed, 3)
+    }
+
+
+def compare(baseline, current):
+    """Linhas ``(cenário, mediana antes, mediana agora, razão)`` dos cenários em comum"""
+    rows = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        rows.append((name, before["median_s"], result["median_s"], result["median_s"] / before["median_s"]))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos quentes com ticks sintéticos")
+    parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS, help=f"ticks por mercado (padrão: {DEFAULT_TICKS})")
+    parser.add_argument("--e2e-ticks", type=int, default=DEFAULT_E2E_TICKS,
+                        help=f"mensagens dos cenários on_message (padrão: {DEFAULT_E2E_TICKS})")
+    parser.add_argument("--seed", type=int, default=0, help="semente do gerador de ticks")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="amostras por cenário")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"cenários separados por vírgula (padrão: {','.join(SCENARIOS)})")
+    parser.add_argument("--markets", default=None, help="mercados separados por vírgula (padrão: todos)")
+    parser.add_argument("--output", default=None, help="arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--compare", default=None, help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args(argv)
+
+    scenarios = tuple(name.strip() for name in args.scenarios.split(","))
+    unknown = set(scenarios).difference(SCENARIOS)
+    if unknown:
+        parser.error(f"Cenários desconhecidos: {', '.join(sorted(unknown))}")
+    markets = args.markets.split(",") if args.markets else None
+
+    result = run_benchmarks(args.ticks, args.seed, args.repeat, scenarios, markets, args.e2e_ticks)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"[Benchmark] comparação com {baseline['meta'].get('commit')} (razão < 1 = mais rápido)", file=sys.stderr)
+        for key in ("ticks_per_market", "e2e_ticks", "seed", "markets"):
+            if baseline["meta"].get(key) != result["meta"][key]:
+                print(f"  atenção: {key} diferente ({baseline['meta'].get(key)} -> {result['meta'][key]})", file=sys.stderr)
+        for name, before, after, ratio in compare(baseline, result):
+            print(f"  {name:40s} {before * 1e3:10.3f} ms -> {after * 1e3:10.3f} ms  x{ratio:.2f}", file=sys.stderr)
+    print(f"[Benchmark] {len(result['results'])} medições em {result['meta']['elapsed_s']}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Coletor de ticks da Deriv sobre um único event loop asyncio.
+
+Substitui a thread por mercado e a thread por reconexão: um único thread
+roda o event loop, com uma task por conexão (shard). Cada task reconecta
+com backoff exponencial e jitter, e um watchdog por mercado, baseado em
+timers do loop, detecta feeds parados sem nenhuma varredura periódica.
+Parar a coleta cancela as tasks e encerra o loop.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+
+from websockets.asyncio.client import connect
+
+
+def backoff_delay(attempt, base, cap):
+    """Atraso exponencial com jitter para a tentativa ``attempt`` (1, 2, ...)"""
+    delay = min(cap, base * (2 ** (attempt - 1)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class AsyncCollector:
+    """Mantém as conexões de todos os shards em um event loop dedicado"""
+
+    def __init__(self, controller, url, shards, reconnect_delay, max_reconnect_delay,
+                 max_reconnect_attempts, stale_timeout, on_finished=None):
+        self.controller = controller
+        self.url = url
+        self.shards = shards
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.max_reconnect_attempts = max_reconnect_attempts
+        self.stale_timeout = stale_timeout
+        self.on_finished = on_finished  # chamado (no thread do loop) se todos os shards desistirem sozinhos
+        self.loop = None
+        self.thread = None
+        self._main_task = None
+        self._ready = threading.Event()
+        self._watchdogs = {}  # mercado -> TimerHandle do watchdog
+        self._resubscribed = {}  # mercado -> instante da última reassinatura
+
+    # === Ciclo de vida (chamado de outros threads) ===
+
+    def start(self):
+        """Inicia o event loop em um thread dedicado"""
+        self._ready.clear()
+        self.thread = threading.Thread(target=self._run_loop, name="deriv-collector", daemon=True)
+        self.thread.start()
+        self._ready.wait()
+
+    def stop(self, timeout=5):
+        """Cancela todas as tasks e espera o event loop terminar"""
+        # Cópias locais: o _run_loop zera self.loop ao terminar, inclusive entre as duas linhas
+        loop, thread = self.loop, self.thread
+        if loop is None or thread is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._main_task.cancel)
+        except RuntimeError:
+            pass  # O loop já terminou (todas as tentativas de reconexão esgotadas)
+        thread.join(timeout)
+        self.thread = None
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._main_task = self.loop.create_task(self._run_all())
+        self._ready.set()
+        cancelled = False
+        try:
+            self.loop.run_until_complete(self._main_task)
+        except asyncio.CancelledError:
+            cancelled = True
+        finally:
+            self.loop.close()
+            self.loop = None
+            if not cancelled and self.on_finished is not None:
+                self.on_finished(self)
+
+    async def _run_all(self):
+        tasks = [asyncio.create_task(self._run_shard(shard_id, markets), name=shard_id)
+                 for shard_id, markets in self.shards.items()]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    # === Conexão de um shard ===
+
+    async def _run_shard(self, shard_id, markets):
+        controller = self.controller
+        while True:
+            try:
+                async with connect(self.url, ping_interval=20, close_timeout=2) as ws:
+                    for market in markets:
+                        await ws.send(json.dumps({"ticks": market, "subscribe": 1}))
+                    controller.on_open(ws, shard_id)
+                    for market in markets:
+                        self._watch_market(ws, shard_id, market)
+                    try:
+                        async for message in ws:
+                            pending = controller.on_message(ws, message)
+                            if pending is not None:
+                                # Fila cheia: só este shard para de ler enquanto espera espaço
+                                await self.loop.run_in_executor(None, controller.ingest_queue.put, pending)
+                    except asyncio.CancelledError:
+                        self._cancel_watchdogs(markets)  # Nada de reconexão durante o fechamento
+                        await ws.close()  # Fechamento limpo (1000) ao parar a coleta
+                        raise
+                    finally:
+                        self._cancel_watchdogs(markets)
+                    controller.on_close(ws, ws.close_code, ws.close_reason, shard_id)
+            except asyncio.CancelledError:
+                controller.on_close(None, None, "Coleta parada", shard_id)
+                raise
+            except Exception as e:
+                controller.on_error(None, e, shard_id)
+
+            attempt = controller.reconnect_attempts[shard_id] + 1
+            if attempt > self.max_reconnect_attempts:
+                print(f"[Reconexão] Máximo de tentativas atingido para {shard_id}")
+                return
+            controller.reconnect_attempts[shard_id] = attempt
+            controller.reconnects[shard_id] += 1
+            delay = backoff_delay(attempt, self.reconnect_delay, self.max_reconnect_delay)
+            print(f"[Reconexão] Tentativa {attempt}/{self.max_reconnect_attempts} para {shard_id} em {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    def _watch_market(self, ws, shard_id, market):
+        """Arma o watchdog de feed parado de um mercado.
+
+        O timer não é reiniciado a cada tick: quando dispara, confere o
+        horário do último tick e se rearma para o tempo restante.
+        """
+        controller = self.controller
+
+        def check():
+            now = time.time()
+            idle = now - max(controller.last_tick_time[market], self._resubscribed.get(market, 0))
+            if idle < self.stale_timeout:
+                self._watchdogs[market] = self.loop.call_later(self.stale_timeout - idle, check)
+                return
+            controller.on_stale_feed(shard_id, market, now - controller.last_tick_time[market])
+            # Só ticks de verdade contam: uma reassinatura recente não prova que o socket está vivo,
+            # e mercados parados juntos disparam o watchdog com alguns ms de diferença
+            alive = [m for m in self.shards[shard_id]
+                     if now - controller.last_tick_time[m] < self.stale_timeout / 2]
+            subscription = controller.subscription_ids.get(market)
+            if alive and subscription:
+                # O socket ainda entrega outros mercados: só refaz a assinatura parada. A Deriv
+                # recusa uma nova assinatura do mesmo símbolo (AlreadySubscribed) sem o forget antes
+                print(f"[Monitor] Reassinando {market} em {shard_id}")
+                asyncio.ensure_future(self._resubscribe(ws, market, subscription))
+                self._resubscribed[market] = now
+                self._watchdogs[market] = self.loop.call_later(self.stale_timeout, check)
+            else:
+                # Socket parado, ou assinatura sem nenhum tick (sem id para o forget)
+                print(f"[Monitor] {shard_id} parado - Reconectando")
+                asyncio.ensure_future(ws.close())
+
+        controller.subscription_ids.pop(market, None)  # ids do socket anterior não valem neste
+        controller.last_tick_time[market] = time.time()
+        self._watchdogs[market] = self.loop.call_later(self.stale_timeout, check)
+
+    @staticmethod
+    async def _resubscribe(ws, market, subscription):
+        """Cancela a assinatura parada e assina o mercado de novo no mesmo socket"""
+        await ws.send(json.dumps({"forget": subscription}))
+        await ws.send(json.dumps({"ticks": market, "subscribe": 1}))
+
+    def _cancel_watchdogs(self, markets):
+        for market in markets:
+            self._resubscribed.pop(market, None)
+            handle = self._watchdogs.pop(market, None)
+            if handle is not None:
+                handle.cancel()
@@ -5,6 +5,7 @@ import time
 from collections import deque, defaultdict
 from flask import Flask, jsonify
 from flask_cors import CORS
+from src.tick_parser import DEFAULT_PIP_SIZE, last_digit_from_price, parse_tick_message
 
 # === CONFIGURAÇÃO ===
 MARKETS = ["1HZ10V", "1HZ25V", "1HZ50V", "1HZ75V", "1HZ100V"]
@@ -16,6 +17,7 @@ MAX_RECONNECT_ATTEMPTS = 100  # máximo de tentativas de reconexão
 
 # === Armazena histórico de ticks por mercado ===
 tick_queues = {market: deque(maxlen=TICK_LIMIT) for market in MARKETS}
+digit_queues = {market: deque(maxlen=TICK_LIMIT) for market in MARKETS}
 
 # === Estatísticas por mercado e tamanho de grupo ===
 results = defaultdict(lambda: defaultdict(lambda: {
@@ -30,11 +32,8 @@ reconnect_attempts = {market: 0 for market in MARKETS}
 last_tick_time = {market: time.time() for market in MARKETS}
 ws_instances = {market: None for market in MARKETS}
 
-def get_last_digit(price):
-    try:
-        return int(str(price).split(".")[1][1])
-    except:
-        return 0
+def get_last_digit(price, pip_size=DEFAULT_PIP_SIZE):
+    return last_digit_from_price(price, pip_size)
 
 def is_all_even(seq):
     return all(d % 2 == 0 for d in seq)
@@ -60,7 +59,7 @@ def update_result(market, group_len, tipo, result):
     entry["max_loss"] = max(entry["max_loss"], entry["seq_loss"])
 
 def simulate_strategy(market):
-    digits = [get_last_digit(p) for p in tick_queues[market]]
+    digits = list(digit_queues[market])
     for group_len in ANALYZE_DIGITS_RANGE:
         if len(digits) < group_len + 1:
             continue
@@ -80,10 +79,10 @@ def simulate_strategy(market):
             update_result(market, group_len, "impares", result)
 
 def on_message(ws, message, market):
-    data = json.loads(message)
-    if "tick" in data:
-        tick = float(data["tick"]["quote"])
-        tick_queues[market].append(tick)
+    parsed = parse_tick_message(message)
+    if parsed is not None:
+        tick_queues[market].append(parsed.quote)
+        digit_queues[market].append(parsed.digit)  # Extraído do texto bruto da cotação
         last_tick_time[market] = time.time()  # Atualiza o tempo do último tick
         reconnect_attempts[market] = 0  # Reset tentativas de reconexão
         simulate_strategy(market)
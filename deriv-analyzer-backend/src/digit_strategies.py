@@ -0,0 +1,284 @@
+"""Registro de estratégias de contratos de dígito avaliadas juntas.
+
+Cada estratégia é declarada por dois elementos:
+
+- ``pattern``: gatilho sobre a paridade dos últimos dígitos, do mais antigo
+  para o mais novo ("P" par, "I" ímpar; "" entra em todo tick);
+- ``outcome``: tabela de resultado do contrato de um tick, indexada pelo
+  próximo dígito e pela direção da cotação (queda, igual, alta).
+
+Over/under N, matches/differs N, rise/fall e padrões de paridade cabem
+nesse formato. Na compilação as estratégias viram tabelas NumPy: os
+gatilhos são indexados pelo código de paridade dos últimos dígitos e os
+resultados pelo tick que fecha o contrato, então o custo por tick é um
+número fixo de operações vetoriais, independente de quantas estratégias
+existem. O cálculo em lote usa as mesmas tabelas sobre o buffer inteiro.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+from src.batch_engine import continue_entry, streaks
+from src.window_stats import empty_entry, format_entry
+
+FALL, FLAT, RISE = 0, 1, 2
+OUTCOME_ROWS = 10 * 3  # próximo dígito x direção
+EXTEND_MIN_TICKS = 4  # lotes menores são processados tick a tick
+
+Strategy = namedtuple("Strategy", ["name", "pattern", "outcome"])
+
+STRATEGIES = {}
+
+
+def register(strategy):
+    """Adiciona (ou substitui) uma estratégia no registro global"""
+    if any(symbol not in "PI" for symbol in strategy.pattern):
+        raise ValueError(f"Padrão de paridade inválido: {strategy.pattern}")
+    STRATEGIES[strategy.name] = strategy
+    return strategy
+
+
+def _outcome(win):
+    """Tabela de resultado a partir de ``win(próximo dígito, direção)``"""
+    return tuple(bool(win(digit, direction)) for digit in range(10) for direction in (FALL, FLAT, RISE))
+
+
+# === Construtores dos contratos ===
+
+def over(barrier, pattern=""):
+    return Strategy(f"over_{barrier}", pattern, _outcome(lambda digit, _: digit > barrier))
+
+
+def under(barrier, pattern=""):
+    return Strategy(f"under_{barrier}", pattern, _outcome(lambda digit, _: digit < barrier))
+
+
+def matches(target, pattern=""):
+    return Strategy(f"matches_{target}", pattern, _outcome(lambda digit, _: digit == target))
+
+
+def differs(target, pattern=""):
+    return Strategy(f"differs_{target}", pattern, _outcome(lambda digit, _: digit != target))
+
+
+def rise(pattern=""):
+    return Strategy("rise", pattern, _outcome(lambda _, direction: direction == RISE))
+
+
+def fall(pattern=""):
+    return Strategy("fall", pattern, _outcome(lambda _, direction: direction == FALL))
+
+
+def parity_after(pattern, bet):
+    """Aposta na paridade ``bet`` ("P" ou "I") do próximo dígito depois de ``pattern``"""
+    parity = 0 if bet == "P" else 1
+    name = f"{'par' if bet == 'P' else 'impar'}_apos_{pattern}"
+    return Strategy(name, pattern, _outcome(lambda digit, _: digit % 2 == parity))
+
+
+for _strategy in (over(4), under(5), matches(0), differs(0), rise(), fall(),
+                  parity_after("IIII", "P"), parity_after("PPPP", "I")):
+    register(_strategy)
+
+
+# === Compilação ===
+
+def _pattern_bits(pattern):
+    """Bits do padrão no código de paridade (bit 0 = dígito mais novo)"""
+    bits = 0
+    for age, symbol in enumerate(reversed(pattern)):
+        if symbol == "I":
+            bits |= 1 << age
+    return bits
+
+
+def compile_strategies(strategies):
+    """Tabelas ``(triggers, outcomes, depth)`` de um conjunto de estratégias.
+
+    ``triggers[filled, code, s]``: a estratégia ``s`` entra quando os
+    ``filled`` dígitos mais recentes (até ``depth``) têm o código de
+    paridade ``code``. ``outcomes[digit * 3 + direction, s]``: resultado do
+    contrato fechado por esse tick.
+    """
+    depth = max((len(strategy.pattern) for strategy in strategies), default=0)
+    codes = np.arange(1 << depth)
+    triggers = np.zeros((depth + 1, 1 << depth, len(strategies)), dtype=bool)
+    for index, strategy in enumerate(strategies):
+        size = len(strategy.pattern)
+        matched = (codes & ((1 << size) - 1)) == _pattern_bits(strategy.pattern)
+        triggers[size:, :, index] = matched
+    outcomes = np.array([strategy.outcome for strategy in strategies], dtype=bool).reshape(-1, OUTCOME_ROWS).T
+    return triggers, outcomes, depth
+
+
+def _direction(previous, quote):
+    if quote > previous:
+        return RISE
+    if quote < previous:
+        return FALL
+    return FLAT
+
+
+class FusedStrategyEngine:
+    """Estado de todas as estratégias de um mercado, atualizado em um passo por tick"""
+
+    def __init__(self, strategies):
+        self.strategies = tuple(strategies)
+        self.names = tuple(strategy.name for strategy in self.strategies)
+        self.triggers, self.outcomes, self.depth = compile_strategies(self.strategies)
+        size = len(self.strategies)
+        # Linhas: wins, losses, seq_win, seq_loss, max_win, max_loss
+        self.counters = np.zeros((6, size), dtype=np.int64)
+        self.pending = np.zeros(size, dtype=bool)  # entradas abertas, fechadas pelo próximo tick
+        self._changed = np.zeros(size, dtype=bool)
+        self.code = 0
+        self.filled = 0
+        self.last_quote = None
+
+    def push(self, digit, quote):
+        """Fecha as entradas abertas com este tick e abre as que o gatilho pedir"""
+        pending = self.pending
+        if self.last_quote is not None and pending.any():
+            won = pending & self.outcomes[digit * 3 + _direction(self.last_quote, quote)]
+            lost = pending ^ won
+            wins, losses, seq_win, seq_loss, max_win, max_loss = self.counters
+            wins += won
+            losses += lost
+            seq_win += won
+            seq_win[lost] = 0
+            seq_loss += lost
+            seq_loss[won] = 0
+            np.maximum(max_win, seq_win, out=max_win)
+            np.maximum(max_loss, seq_loss, out=max_loss)
+            self._changed |= pending
+
+        if self.depth:
+            self.code = ((self.code << 1) | (digit & 1)) & ((1 << self.depth) - 1)
+            self.filled = min(self.filled + 1, self.depth)
+        self.pending = self.triggers[self.filled, self.code]  # visão da tabela: só leitura
+        self.last_quote = quote
+
+    def extend(self, digits, quotes):
+        """Processa um lote de ticks de uma vez (mesmo resultado de ``push`` em sequência)"""
+        if len(digits) < EXTEND_MIN_TICKS:
+            for digit, quote in zip(digits, quotes):
+                self.push(int(digit), float(quote))
+            return
+        digits = np.asarray(digits, dtype=np.int64)
+        quotes = np.asarray(quotes, dtype=np.float64)
+        count = len(digits)
+        depth = self.depth
+
+        # Gatilhos depois de cada tick: código de paridade continuando o atual
+        if depth:
+            history = [(self.code >> age) & 1 for age in range(depth - 1, -1, -1)]
+            parity = np.concatenate((np.array(history, dtype=np.int64), digits & 1))
+            code = np.zeros(count, dtype=np.int64)
+            for age in range(depth):
+                code |= parity[depth - age:depth - age + count] << age
+            filled = np.minimum(self.filled + np.arange(1, count + 1), depth)
+        else:
+            code = filled = np.zeros(count, dtype=np.int64)
+        triggered = self.triggers[filled, code]
+
+        # Entradas abertas antes de cada tick e o resultado que o tick dá a elas
+        opened = np.vstack((self.pending[None, :], triggered[:-1]))
+        previous = np.concatenate(([quotes[0] if self.last_quote is None else self.last_quote], quotes[:-1]))
+        closed = self.outcomes[digits * 3 + np.sign(quotes - previous).astype(np.int64) + 1]
+        won = opened & closed
+        lost = opened & ~closed
+
+        wins, losses, seq_win, seq_loss, max_win, max_loss = self.counters
+        rows = np.arange(count)[:, None]
+        for hits, breaks, current, best in ((won, lost, seq_win, max_win), (lost, won, seq_loss, max_loss)):
+            # Sequência em cada linha: acertos desde a última quebra (ou continuando a atual)
+            total = np.cumsum(hits, axis=0)
+            last_break = np.maximum.accumulate(np.where(breaks, rows, -1), axis=0)
+            before = np.take_along_axis(total, np.maximum(last_break, 0), axis=0)
+            run = np.where(last_break >= 0, total - before, total + current)
+            np.maximum(best, run.max(axis=0), out=best)
+            current[:] = run[-1]
+        wins += won.sum(axis=0)
+        losses += lost.sum(axis=0)
+        self._changed |= opened.any(axis=0)
+
+        self.pending = triggered[-1]
+        self.code = int(code[-1])
+        self.filled = int(filled[-1])
+        self.last_quote = float(quotes[-1])
+
+    def entry(self, index):
+        wins, losses, seq_win, seq_loss, max_win, max_loss = self.counters[:, index].tolist()
+        return format_entry(wins, losses, seq_win, seq_loss, max_win, max_loss)
+
+    def results(self):
+        """Entradas formatadas de todas as estratégias"""
+        return {name: self.entry(index) for index, name in enumerate(self.names)}
+
+    def pop_changes(self):
+        """Entradas formatadas das estratégias alteradas desde a última chamada"""
+        changed = np.flatnonzero(self._changed)
+        if len(changed) == 0:
+            return {}
+        self._changed[:] = False
+        return {self.names[index]: self.entry(index) for index in changed.tolist()}
+
+    def restore(self, entries, digits, quotes):
+        """Retoma a partir de resultados calculados em lote e dos últimos ticks"""
+        for index, name in enumerate(self.names):
+            entry = entries.get(name) or empty_entry()
+            self.counters[:, index] = (entry["wins"], entry["losses"], entry["seq_win_atual"],
+                                       entry["seq_loss_atual"], entry["max_win"], entry["max_loss"])
+        self._changed[:] = True
+        self.code = self.filled = 0
+        self.last_quote = None
+        self.pending = np.zeros(len(self.strategies), dtype=bool)
+        for digit, quote in zip(digits[-max(self.depth, 1):].tolist(), quotes[-max(self.depth, 1):].tolist()):
+            if self.depth:
+                self.code = ((self.code << 1) | (digit & 1)) & ((1 << self.depth) - 1)
+                self.filled = min(self.filled + 1, self.depth)
+            self.last_quote = quote
+        if self.last_quote is not None:
+            self.pending = self.triggers[self.filled, self.code]
+
+
+# === Cálculo em lote ===
+
+def strategy_stats(digits, quotes, strategies, start=0, previous=None):
+    """Estatísticas de todas as estratégias sobre arrays de dígitos e cotações.
+
+    Como em ``calculate_stats``, ``digits[:start]`` é só contexto (nenhum
+    contrato fecha nesses ticks) e ``previous`` continua resultados anteriores.
+    """
+    strategies = tuple(strategies)
+    results = {strategy.name: (previous or {}).get(strategy.name) or empty_entry() for strategy in strategies}
+    if len(digits) < 2 or not strategies:
+        return results
+
+    triggers, outcomes, depth = compile_strategies(strategies)
+    digits = np.asarray(digits, dtype=np.int64)
+    quotes = np.asarray(quotes, dtype=np.float64)
+    # Código de paridade e quantidade de dígitos conhecidos em cada posição
+    code = np.zeros(len(digits), dtype=np.int64)
+    parity = digits & 1
+    for age in range(depth):
+        code[age:] |= parity[:len(digits) - age] << age
+    filled = np.minimum(np.arange(len(digits)) + 1, depth)
+    # Entrada no tick t, fechada pelo tick t + 1
+    opened = triggers[filled[:-1], code[:-1]]
+    direction = np.sign(np.diff(quotes)).astype(np.int64) + 1
+    closed = outcomes[digits[1:] * 3 + direction]
+    first = max(start - 1, 0)
+
+    for index, strategy in enumerate(strategies):
+        selected = opened[first:, index]
+        series = closed[first:, index][selected]
+        if len(series) == 0:
+            continue
+        if previous is not None:
+            results[strategy.name] = continue_entry(results[strategy.name], series)
+            continue
+        max_win, max_loss, seq_win, seq_loss = streaks(series)
+        wins = int(series.sum())
+        results[strategy.name] = format_entry(wins, len(series) - wins, seq_win, seq_loss, max_win, max_loss)
+    return results
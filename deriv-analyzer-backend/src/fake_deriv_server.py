@@ -0,0 +1,297 @@
+"""Servidor WebSocket local que imita o feed de ticks da Deriv.
+
+Fala o mesmo protocolo usado pelo coletor (``{"ticks": símbolo,
+"subscribe": 1}``, mais ``forget``, ``forget_all`` e ``ping``) e entrega
+ticks sintéticos (``src/tick_generator.py``) ou gravados (CSV, JSONL ou o
+log binário, lidos como no ``replay.py``). Serve para testar carga e os
+caminhos de reconexão e de feed parado sem tocar no serviço real.
+
+Cada símbolo tem um feed compartilhado por todas as conexões que o
+assinaram. O feed só anda enquanto tem assinantes e envia 1 tick/s
+multiplicado por ``speed`` (``speed=0``: o mais rápido que os clientes
+consumirem). O epoch enviado é o horário atual, para as janelas de tempo
+do controlador funcionarem como ao vivo.
+
+Falhas podem ser injetadas pela linha de comando (periódicas) ou pela API
+(``disconnect_all``, ``stall``): desconexões com close frame ("close") ou
+derrubando o TCP ("drop"), e feeds parados com o socket aberto.
+
+Uso::
+
+    python src/fake_deriv_server.py --speed 100
+    python src/fake_deriv_server.py database/ticks --speed 0 --disconnect-every 60 --disconnect-mode drop
+    WS_URL=ws://127.0.0.1:8765 python src/main.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+from src.replay import detect_format, load_file, merge_files
+from src.tick_generator import generate_ticks, tick_message
+from src.tick_parser import DEFAULT_PIP_SIZE
+
+DEFAULT_PORT = 8765
+DEFAULT_SYMBOLS = "1HZ10V,1HZ25V,1HZ50V,1HZ75V,1HZ100V"
+DEFAULT_SYNTHETIC_TICKS = 100000  # ticks gerados por símbolo (o feed recomeça do início no fim)
+FAST_YIELD_TICKS = 100  # no modo mais rápido, devolve o loop a outras tasks a cada N ticks
+
+
+def synthetic_source(symbols, count, seed=0, pip_size=DEFAULT_PIP_SIZE):
+    """Cotações sintéticas por símbolo: ``{símbolo: quotes}``"""
+    return {symbol: generate_ticks(symbol, count, seed, pip_size=pip_size)[1] for symbol in symbols}
+
+
+def recorded_source(paths, pip_size=DEFAULT_PIP_SIZE, market=None):
+    """Cotações gravadas por símbolo, na ordem dos epochs: ``{símbolo: quotes}``"""
+    tasks = [
+        (path, detect_format(path), market or os.path.splitext(os.path.basename(path))[0], pip_size)
+        for path in paths
+    ]
+    return {symbol: quotes for symbol, (quotes, _) in merge_files(map(load_file, tasks)).items()}
+
+
+class _Feed:
+    """Ticks de um símbolo e as conexões que o assinaram"""
+
+    def __init__(self, symbol, quotes):
+        self.symbol = symbol
+        self.quotes = quotes.tolist()
+        self.position = 0
+        self.subscribers = {}  # websocket -> id da assinatura
+        self.stalled_until = 0.0
+        self.wake = asyncio.Event()
+        self.task = None
+
+
+class FakeDerivServer:
+    """Servidor de ticks com ritmo configurável e injeção de falhas"""
+
+    def __init__(self, source, speed=1.0, pip_size=DEFAULT_PIP_SIZE, loop_feed=True):
+        self.source = source
+        self.speed = speed
+        self.pip_size = pip_size
+        self.loop_feed = loop_feed
+        self.feeds = {}
+        self.connections = set()
+        self.sent = 0
+        self.disconnects = 0
+        self.stalls = 0
+        self._server = None
+
+    # === Ciclo de vida ===
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self.feeds = {symbol: _Feed(symbol, quotes) for symbol, quotes in self.source.items()}
+        for feed in self.feeds.values():
+            feed.task = asyncio.create_task(self._run_feed(feed))
+        self._server = await serve(self._handle, host, port, ping_interval=None, max_queue=None)
+        return self._server
+
+    @property
+    def port(self):
+        return next(iter(self._server.sockets)).getsockname()[1]
+
+    async def stop(self):
+        for feed in self.feeds.values():
+            feed.task.cancel()
+        self._server.close()
+        await self._server.wait_closed()
+
+    # === Injeção de falhas ===
+
+    def disconnect_all(self, mode="close"):
+        """Derruba todas as conexões: "close" manda close frame (1001), "drop" corta o TCP"""
+        for ws in list(self.connections):
+            self.disconnects += 1
+            if mode == "drop":
+                ws.transport.abort()
+            else:
+                asyncio.ensure_future(ws.close(1001, "Fake server disconnect"))
+
+    def stall(self, duration, symbols=None):
+        """Para os feeds (todos ou ``symbols``) por ``duration`` segundos, com os sockets abertos"""
+        until = time.monotonic() + duration
+        for symbol in symbols or self.feeds:
+            feed = self.feeds.get(symbol)
+            if feed is not None:
+                feed.stalled_until = until
+                self.stalls += 1
+
+    # === Protocolo ===
+
+    async def _handle(self, ws):
+        self.connections.add(ws)
+        try:
+            async for message in ws:
+                try:
+                    request = json.loads(message)
+                except ValueError:
+                    await ws.send(self._error({}, "error", "InputValidationFailed", "Invalid JSON"))
+                    continue
+                await self._dispatch(ws, request)
+        except ConnectionClosed:
+            pass
+        finally:
+            self.connections.discard(ws)
+            for feed in self.feeds.values():
+                feed.subscribers.pop(ws, None)
+
+    async def _dispatch(self, ws, request):
+        if "ping" in request:
+            await ws.send(json.dumps({"echo_req": request, "msg_type": "ping", "ping": "pong"}))
+        elif "forget" in request:
+            forgotten = 0
+            for feed in self.feeds.values():
+                if feed.subscribers.get(ws) == request["forget"]:
+                    del feed.subscribers[ws]
+                    forgotten = 1
+            await ws.send(json.dumps({"echo_req": request, "forget": forgotten, "msg_type": "forget"}))
+        elif "forget_all" in request:
+            forgotten = [feed.subscribers.pop(ws) for feed in self.feeds.values() if ws in feed.subscribers]
+            await ws.send(json.dumps({"echo_req": request, "forget_all": forgotten, "msg_type": "forget_all"}))
+        elif "ticks" in request:
+            feed = self.feeds.get(request["ticks"])
+            if feed is None:
+                await ws.send(self._error(request, "tick", "InvalidSymbol", f"Symbol {request['ticks']} invalid."))
+            elif ws in feed.subscribers:
+                await ws.send(self._error(
+                    request, "tick", "AlreadySubscribed", f"You are already subscribed to {feed.symbol}."
+                ))
+            else:
+                feed.subscribers[ws] = f"{random.getrandbits(128):032x}"
+                feed.wake.set()
+        else:
+            await ws.send(self._error(request, "error", "UnrecognisedRequest", "Unrecognised request."))
+
+    @staticmethod
+    def _error(request, msg_type, code, message):
+        return json.dumps({"echo_req": request, "error": {"code": code, "message": message}, "msg_type": msg_type})
+
+    # === Feeds ===
+
+    async def _run_feed(self, feed):
+        interval = 1.0 / self.speed if self.speed else 0.0
+        next_at = time.monotonic()
+        while True:
+            if not feed.subscribers:
+                feed.wake.clear()
+                await feed.wake.wait()
+                next_at = time.monotonic()
+            now = time.monotonic()
+            if feed.stalled_until > now:
+                await asyncio.sleep(feed.stalled_until - now)
+                next_at = time.monotonic()
+                continue
+
+            if interval:
+                if next_at > now:
+                    await asyncio.sleep(next_at - now)
+                # Atrasado (loop ocupado): manda em rajada os ticks já vencidos
+                due = max(1, int((time.monotonic() - next_at) / interval) + 1)
+                next_at += due * interval
+            else:
+                due = FAST_YIELD_TICKS
+
+            for _ in range(due):
+                if feed.position >= len(feed.quotes):
+                    if not self.loop_feed:
+                        return
+                    feed.position = 0
+                quote = feed.quotes[feed.position]
+                feed.position += 1
+                await self._broadcast(feed, quote)
+            if not interval:
+                await asyncio.sleep(0)
+
+    async def _broadcast(self, feed, quote):
+        epoch = int(time.time())
+        for ws, subscription_id in list(feed.subscribers.items()):
+            try:
+                await ws.send(tick_message(feed.symbol, epoch, quote, self.pip_size, subscription_id))
+                self.sent += 1
+            except ConnectionClosed:
+                feed.subscribers.pop(ws, None)
+
+
+async def _periodic(interval, action):
+    while True:
+        await asyncio.sleep(interval)
+        action()
+
+
+async def run_server(args):
+    if args.paths:
+        source = recorded_source(args.paths, args.pip_size, args.market)
+    else:
+        source = synthetic_source(args.symbols.split(","), args.ticks, args.seed, args.pip_size)
+    server = FakeDerivServer(source, args.speed, args.pip_size, loop_feed=not args.no_loop)
+    await server.start(args.host, args.port)
+    rate = "máximo" if not args.speed else f"{args.speed:g} ticks/s por símbolo"
+    print(f"[Fake Deriv] ws://{args.host}:{server.port} - {len(source)} símbolos, ritmo {rate}")
+
+    tasks = []
+    if args.disconnect_every:
+        tasks.append(asyncio.create_task(_periodic(
+            args.disconnect_every, lambda: server.disconnect_all(args.disconnect_mode)
+        )))
+    if args.stall_every:
+        stall_symbols = args.stall_symbols.split(",") if args.stall_symbols else None
+        tasks.append(asyncio.create_task(_periodic(
+            args.stall_every, lambda: server.stall(args.stall_duration, stall_symbols)
+        )))
+
+    last_sent, last_time = 0, time.monotonic()
+    try:
+        while True:
+            await asyncio.sleep(args.stats_interval)
+            now = time.monotonic()
+            print(f"[Fake Deriv] {len(server.connections)} conexões, "
+                  f"{(server.sent - last_sent) / (now - last_time):.0f} ticks/s, "
+                  f"{server.disconnects} desconexões, {server.stalls} pausas")
+            last_sent, last_time = server.sent, now
+    finally:
+        for task in tasks:
+            task.cancel()
+        await server.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local que imita o feed de ticks da Deriv")
+    parser.add_argument("paths", nargs="*", help="arquivos CSV/JSONL ou diretórios do log (padrão: ticks sintéticos)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="multiplicador de 1 tick/s por símbolo (0 = o mais rápido possível)")
+    parser.add_argument("--symbols", default=DEFAULT_SYMBOLS, help="símbolos sintéticos separados por vírgula")
+    parser.add_argument("--ticks", type=int, default=DEFAULT_SYNTHETIC_TICKS, help="ticks sintéticos por símbolo")
+    parser.add_argument("--seed", type=int, default=0, help="semente do gerador sintético")
+    parser.add_argument("--market", default=None, help="símbolo dos arquivos sem coluna symbol (padrão: nome do arquivo)")
+    parser.add_argument("--pip-size", type=int, default=DEFAULT_PIP_SIZE, help="casas decimais das cotações")
+    parser.add_argument("--no-loop", action="store_true", help="encerra cada feed no fim dos ticks em vez de recomeçar")
+    parser.add_argument("--stats-interval", type=float, default=5.0, help="segundos entre linhas de estatística")
+    faults = parser.add_argument_group("injeção de falhas")
+    faults.add_argument("--disconnect-every", type=float, default=0, help="derruba todas as conexões a cada N segundos")
+    faults.add_argument("--disconnect-mode", choices=("close", "drop"), default="close",
+                        help="close frame (close) ou conexão cortada sem aviso (drop)")
+    faults.add_argument("--stall-every", type=float, default=0, help="para os feeds a cada N segundos")
+    faults.add_argument("--stall-duration", type=float, default=40.0, help="duração (s) de cada pausa")
+    faults.add_argument("--stall-symbols", default=None, help="símbolos pausados (padrão: todos)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run_server(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Fila de ingest entre os leitores dos sockets e o worker de análise.
+
+O callback de leitura só extrai o tick e o coloca na fila; um thread
+dedicado drena a fila em lotes e processa cada lote de uma vez (um lock,
+uma versão e uma publicação de snapshot por lote). Assim uma análise lenta
+ou um leitor da API segurando o GIL não atrasam a leitura do socket.
+
+A fila é limitada. Quando enche, a política define o que acontece:
+
+- ``block``: o leitor espera espaço (até ``block_timeout``), segurando a
+  leitura do socket; só descarta o tick se o tempo esgotar. No coletor a
+  espera roda fora do event loop (``put_nowait`` e, se a fila estiver
+  cheia, ``put`` em um executor): só o shard que precisa esperar para de
+  ler, e os outros shards, os pings e os watchdogs continuam;
+- ``drop_oldest``: descarta o tick mais antigo da fila;
+- ``drop_newest``: descarta o tick que está chegando.
+
+Todos os descartes e esperas ficam contabilizados em ``stats()``.
+"""
+
+import threading
+import time
+from collections import deque
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST)
+
+
+class IngestQueue:
+    """Fila limitada com política de transbordo e contadores"""
+
+    def __init__(self, maxsize, policy=BLOCK, block_timeout=1.0):
+        if policy not in POLICIES:
+            raise ValueError(f"Política de fila inválida: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self.closed = False
+        # === Contadores ===
+        self.enqueued = 0
+        self.dropped = 0
+        self.blocked = 0  # puts que precisaram esperar espaço
+        self.blocked_time = 0.0  # tempo total (s) de espera dos leitores
+        self.high_watermark = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item):
+        """Enfileira um item; retorna False se ele (ou outro) foi descartado"""
+        with self._lock:
+            return self._put(item)
+
+    def put_nowait(self, item):
+        """Enfileira sem esperar; False se a fila está cheia na política "block" (nada é descartado)"""
+        with self._lock:
+            if self.policy == BLOCK and len(self._items) >= self.maxsize and not self.closed:
+                return False
+            self._put(item)
+            return True
+
+    def _put(self, item):
+        # Chamado com o lock
+        accepted = True
+        if len(self._items) >= self.maxsize:
+            if self.policy == DROP_NEWEST:
+                self.dropped += 1
+                return False
+            if self.policy == DROP_OLDEST:
+                self._items.popleft()
+                self.dropped += 1
+                accepted = False
+            else:
+                self.blocked += 1
+                started = time.monotonic()
+                has_room = self._not_full.wait_for(
+                    lambda: len(self._items) < self.maxsize or self.closed, self.block_timeout
+                )
+                self.blocked_time += time.monotonic() - started
+                if not has_room or self.closed:
+                    self.dropped += 1
+                    return False
+        self._items.append(item)
+        self.enqueued += 1
+        if len(self._items) > self.high_watermark:
+            self.high_watermark = len(self._items)
+        self._not_empty.notify()
+        return accepted
+
+    def get_batch(self, max_items, timeout=None):
+        """Retira até ``max_items`` itens, esperando até ``timeout`` se a fila estiver vazia"""
+        with self._lock:
+            if not self._items:
+                self._not_empty.wait_for(lambda: self._items or self.closed, timeout)
+            items = self._items
+            count = min(len(items), max_items)
+            batch = [items.popleft() for _ in range(count)]
+            if batch:
+                self._not_full.notify_all()
+            return batch
+
+    def close(self):
+        """Acorda quem estiver esperando; o worker drena o que restou e termina"""
+        with self._lock:
+            self.closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    def stats(self):
+        return {
+            "policy": self.policy,
+            "size": len(self._items),
+            "maxsize": self.maxsize,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "blocked": self.blocked,
+            "blocked_time": round(self.blocked_time, 3),
+            "high_watermark": self.high_watermark
+        }
+
+
+class IngestWorker:
+    """Thread que drena a fila em lotes e entrega cada lote a ``handler``.
+
+    ``idle``, se informado, é chamado a cada ``idle_interval`` segundos
+    mesmo sem ticks (tarefas periódicas do mesmo thread).
+    """
+
+    def __init__(self, queue, handler, batch_size, idle=None, idle_interval=1.0, name="ingest-worker"):
+        self.queue = queue
+        self.handler = handler
+        self.batch_size = batch_size
+        self.idle = idle
+        self.idle_interval = idle_interval
+        self.name = name
+        self.batches = 0
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        """Fecha a fila e espera o worker processar o que já foi enfileirado"""
+        self.queue.close()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def _run(self):
+        queue = self.queue
+        last_idle = time.monotonic()
+        while True:
+            batch = queue.get_batch(self.batch_size, timeout=0.5)
+            if batch:
+                try:
+                    self.handler(batch)
+                except Exception as e:
+                    print(f"[Ingest] Erro ao processar lote de {len(batch)} ticks: {e}")
+                self.batches += 1
+            elif queue.closed:
+                return
+            if self.idle is not None and time.monotonic() - last_idle >= self.idle_interval:
+                last_idle = time.monotonic()
+                try:
+                    self.idle()
+                except Exception as e:
+                    print(f"[Ingest] Erro na tarefa periódica: {e}")
@@ -12,8 +12,8 @@ from src.routes.api import api_bp
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 
-# Habilita CORS para permitir requisições do frontend
-CORS(app)
+# Habilita CORS para permitir requisições do frontend (menos as rotas de administração)
+CORS(app, resources={r"^/(?!api/admin/).*": {}})
 
 # Registra o blueprint da API
 app.register_blueprint(api_bp, url_prefix='/api')
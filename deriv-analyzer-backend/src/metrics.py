@@ -0,0 +1,110 @@
+"""Métricas de latência e contadores no formato texto do Prometheus.
+
+Os histogramas têm limites fixos e contagens em arrays NumPy: o ingest
+registra um lote inteiro de uma vez (``observe_many``), com um custo fixo
+por lote e nenhum objeto novo por tick. As rotas registram uma observação
+por requisição. A exposição (``/api/metrics``) só lê os contadores.
+"""
+
+import bisect
+import threading
+
+import numpy as np
+
+# Limites (s) dos histogramas
+FEED_LATENCY_BUCKETS = (0.25, 0.5, 0.75, 1, 1.25, 1.5, 2, 3, 5, 10, 30)  # epoch da Deriv tem resolução de 1 s
+PIPELINE_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+TICK_PROCESSING_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01)
+ROUTE_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+
+class Histogram:
+    """Histograma de limites fixos (cumulativo só na exposição)"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self._bounds = np.array(self.buckets, dtype=np.float64)
+        self.counts = np.zeros(len(self.buckets) + 1, dtype=np.int64)  # último: acima do maior limite
+        self.sum = 0.0
+
+    def observe(self, value, count=1):
+        self.counts[bisect.bisect_left(self.buckets, value)] += count
+        self.sum += value * count
+
+    def observe_many(self, values):
+        """Registra um array de observações com operações vetoriais"""
+        if len(values) < 2:
+            if len(values):
+                self.observe(float(values[0]))  # lote de um tick: mais barato sem NumPy
+            return
+        self.counts += np.bincount(np.searchsorted(self._bounds, values), minlength=len(self.counts))
+        self.sum += float(values.sum())
+
+    def snapshot(self):
+        """``(contagens cumulativas por limite, total, soma)``"""
+        cumulative = np.cumsum(self.counts)
+        return cumulative[:-1].tolist(), int(cumulative[-1]), self.sum
+
+
+class RouteMetrics:
+    """Latência e respostas por rota da API (várias threads do Flask)"""
+
+    def __init__(self, buckets=ROUTE_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.latency = {}  # rota -> Histogram
+        self.responses = {}  # (rota, status) -> quantidade
+        self._lock = threading.Lock()
+
+    def observe(self, route, status, seconds):
+        with self._lock:
+            histogram = self.latency.get(route)
+            if histogram is None:
+                histogram = self.latency[route] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            self.responses[(route, status)] = self.responses.get((route, status), 0) + 1
+
+    def series(self):
+        with self._lock:
+            latency = [({"route": route}, histogram.snapshot()) for route, histogram in self.latency.items()]
+            responses = [({"route": route, "status": str(status)}, count)
+                         for (route, status), count in self.responses.items()]
+        return latency, responses
+
+
+# === Exposição ===
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value):
+    if isinstance(value, float):
+        if value == float("inf"):
+            return "+Inf"
+        return repr(value)
+    return str(value)
+
+
+def metric_lines(name, kind, help_text, samples):
+    """Linhas de um contador ou gauge: ``samples`` = [(labels, valor)]"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples)
+    return lines
+
+
+def histogram_lines(name, help_text, buckets, series):
+    """Linhas de um histograma: ``series`` = [(labels, Histogram.snapshot())]"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, (cumulative, count, total) in series:
+        for bound, value in zip(buckets, cumulative):
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': _number(float(bound))})} {value}")
+        lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {count}")
+        lines.append(f"{name}_sum{_labels(labels)} {_number(float(total))}")
+        lines.append(f"{name}_count{_labels(labels)} {count}")
+    return lines
@@ -0,0 +1,317 @@
+"""Profiling sob demanda do processo em execução.
+
+Uma sessão dura N segundos e é ligada pela API, sem reiniciar o servidor:
+
+- ``sampling``: um thread lê as pilhas de todos os threads a cada
+  ``interval`` segundos; a saída é no formato collapsed-stack
+  (``thread;função (arquivo:linha);... amostras``, aceito pelo
+  flamegraph.pl e pelo speedscope). O amostrador precisa do GIL, e um
+  thread ocupado só o cede nos pontos em que código C o libera (NumPy,
+  locks, I/O) ou quando o intervalo de troca do interpretador vence; por
+  isso o intervalo de troca é reduzido durante a sessão, para as amostras
+  não se concentrarem nesses pontos.
+- ``deterministic``: cProfile em cada thread enquanto ele executa um dos
+  métodos instrumentados ou uma requisição da API; a saída é um dump do
+  pstats (``pstats.Stats(arquivo)``) ou o relatório em texto.
+- ``spans``: só os tempos dos métodos instrumentados.
+
+Os spans (contagem e tempos de cada método instrumentado) são medidos em
+todos os modos. Eles são instalados como atributos da instância só durante
+a sessão e removidos no fim: desligado, o código roda sem nenhum desvio.
+"""
+
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+
+PROFILE_MODES = ("sampling", "deterministic", "spans")
+PSTATS_TEXT_LINES = 60  # funções listadas no relatório em texto do cProfile
+
+_THREAD_NUMBER = re.compile(r"-\d+")
+
+
+class _Span:
+    """Contagem e tempos de um método instrumentado"""
+
+    __slots__ = ("count", "total", "max", "lock")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, elapsed):
+        with self.lock:
+            self.count += 1
+            self.total += elapsed
+            if elapsed > self.max:
+                self.max = elapsed
+
+    def summary(self):
+        with self.lock:
+            return {
+                "count": self.count,
+                "total_ms": round(self.total * 1000, 3),
+                "mean_us": round(self.total / self.count * 1e6, 2) if self.count else 0.0,
+                "max_us": round(self.max * 1e6, 2)
+            }
+
+
+class Profiler:
+    """Sessões de profiling e spans de tempo dos métodos de ``target``"""
+
+    def __init__(self, target, span_names, max_duration=300, sample_interval=0.005, switch_interval=None):
+        self.target = target
+        self.span_names = tuple(span_names)
+        self.max_duration = max_duration
+        self.sample_interval = sample_interval
+        self.switch_interval = switch_interval  # intervalo de troca do GIL no modo sampling (None = não muda)
+        self.session = None  # sessão em andamento
+        self.result = None  # resultado da última sessão encerrada
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._session_id = 0
+        self._spans = {}
+        self._timer = None
+        # Modo sampling
+        self._sampler = None
+        self._sampler_stop = None
+        self._samples = None
+        self._saved_switch_interval = None
+        # Modo deterministic: perfis por thread e quantos threads estão dentro de um span ou requisição
+        self._profiles = None
+        self._inflight = 0
+        self._inflight_lock = threading.Lock()
+
+    # === Sessões ===
+
+    def start(self, mode, duration, interval=None):
+        """Liga uma sessão de ``duration`` segundos (ValueError se inválida, RuntimeError se já houver uma)"""
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Modo de profiling inválido (use {', '.join(PROFILE_MODES)})")
+        if not 0 < duration <= self.max_duration:
+            raise ValueError(f"Duração deve estar entre 0 e {self.max_duration} segundos")
+        interval = interval or self.sample_interval
+        if interval <= 0:
+            raise ValueError("Intervalo de amostragem inválido")
+        with self._lock:
+            if self.session is not None:
+                raise RuntimeError("Já existe uma sessão de profiling em andamento")
+            self._session_id += 1
+            self.session = {
+                "id": self._session_id,
+                "mode": mode,
+                "duration": duration,
+                "interval": interval if mode == "sampling" else None,
+                "started": time.time()
+            }
+            self._spans = {name: _Span() for name in self.span_names}
+            if mode == "deterministic":
+                self._profiles = []
+            elif mode == "sampling":
+                self._samples = defaultdict(int)
+                if self.switch_interval:
+                    self._saved_switch_interval = sys.getswitchinterval()
+                    sys.setswitchinterval(self.switch_interval)
+                self._sampler_stop = threading.Event()
+                self._sampler = threading.Thread(
+                    target=self._sample, args=(self._samples, self._sampler_stop, interval),
+                    name="profiler-sampler", daemon=True
+                )
+                self._sampler.start()
+            self._attach_spans()
+            self._timer = threading.Timer(duration, self.stop)
+            self._timer.daemon = True
+            self._timer.start()
+        print(f"[Profiler] Sessão {mode} iniciada por {duration:g}s")
+        return self.status()
+
+    def stop(self):
+        """Encerra a sessão em andamento e guarda o resultado (None se não havia sessão)"""
+        with self._lock:
+            session = self.session
+            if session is None:
+                return None
+            self.session = None
+            self._detach_spans()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            profiles, self._profiles = self._profiles, None
+            samples, self._samples = self._samples, None
+            if self._sampler is not None:
+                self._sampler_stop.set()
+                self._sampler.join()
+                self._sampler = self._sampler_stop = None
+            if self._saved_switch_interval is not None:
+                sys.setswitchinterval(self._saved_switch_interval)
+                self._saved_switch_interval = None
+
+            ended = time.time()
+            result = {
+                **session,
+                "ended": ended,
+                "elapsed": round(ended - session["started"], 3),
+                "spans": {name: span.summary() for name, span in self._spans.items()},
+                "output": None
+            }
+            if profiles is not None:
+                self._wait_inflight()
+                result["output"] = self._merge_profiles(profiles)
+                result["threads"] = len(profiles)
+            elif samples is not None:
+                result["output"] = samples
+                result["samples"] = sum(samples.values())
+            self.result = result
+        print(f"[Profiler] Sessão {session['mode']} encerrada após {result['elapsed']:g}s")
+        return self.summary(result)
+
+    def status(self):
+        """Sessão em andamento (com os spans parciais) e resumo da última encerrada"""
+        session = self.session
+        return {
+            "active": session is not None,
+            "session": session and {
+                **session,
+                "remaining": round(max(0.0, session["started"] + session["duration"] - time.time()), 3),
+                "spans": {name: span.summary() for name, span in self._spans.items()}
+            },
+            "last": self.summary(self.result)
+        }
+
+    @staticmethod
+    def summary(result):
+        if result is None:
+            return None
+        summary = {key: value for key, value in result.items() if key != "output"}
+        summary["formats"] = {"sampling": ["collapsed"], "deterministic": ["text", "pstats"]}.get(result["mode"], [])
+        return summary
+
+    def output(self, fmt=None):
+        """Saída da última sessão: ``(conteúdo, mimetype)`` ou None se não houver nesse formato"""
+        result = self.result
+        if result is None or result["output"] is None:
+            return None
+        if result["mode"] == "sampling" and fmt in (None, "collapsed"):
+            lines = sorted(f"{stack} {count}" for stack, count in result["output"].items())
+            return "\n".join(lines) + "\n", "text/plain"
+        if result["mode"] == "deterministic":
+            stats = result["output"]
+            if fmt == "pstats":
+                return marshal.dumps(stats), "application/octet-stream"
+            if fmt in (None, "text"):
+                return self._pstats_text(stats), "text/plain"
+        return None
+
+    # === Spans ===
+
+    def _attach_spans(self):
+        for name in self.span_names:
+            setattr(self.target, name, self._timed(name, getattr(self.target, name)))
+
+    def _detach_spans(self):
+        for name in self.span_names:
+            self.target.__dict__.pop(name, None)  # volta para o método da classe
+
+    def _timed(self, name, method):
+        span = self._spans[name]
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            profiling = self.enter()
+            started = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                span.record(perf_counter() - started)
+                if profiling:
+                    self.exit()
+
+        timed.__name__ = name
+        timed.__wrapped__ = method
+        return timed
+
+    # === Modo deterministic ===
+
+    def enter(self):
+        """Liga o cProfile do thread atual (sessões deterministic); True se o chamador deve chamar ``exit``"""
+        profiles = self._profiles
+        if profiles is None:
+            return False
+        local = self._local
+        depth = getattr(local, "depth", 0)
+        if depth == 0:
+            if getattr(local, "session", None) != self._session_id:
+                local.profile = cProfile.Profile()
+                local.session = self._session_id
+                profiles.append(local.profile)
+            with self._inflight_lock:
+                self._inflight += 1
+            local.profile.enable()
+        local.depth = depth + 1
+        return True
+
+    def exit(self):
+        local = self._local
+        local.depth -= 1
+        if local.depth == 0:
+            local.profile.disable()
+            with self._inflight_lock:
+                self._inflight -= 1
+
+    def _wait_inflight(self, timeout=2.0):
+        """Espera os threads que estão dentro de um método instrumentado saírem dele"""
+        own = 1 if getattr(self._local, "depth", 0) else 0  # o próprio thread (parada pela API)
+        deadline = time.monotonic() + timeout
+        while self._inflight > own and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    @staticmethod
+    def _merge_profiles(profiles):
+        stats = pstats.Stats()
+        for profile in profiles:
+            stats.add(profile)
+        return stats.stats
+
+    @staticmethod
+    def _pstats_text(raw):
+        stream = io.StringIO()
+        stats = pstats.Stats(stream=stream)
+        stats.stats = raw
+        stats.get_top_level_stats()
+        stats.strip_dirs().sort_stats("cumulative").print_stats(PSTATS_TEXT_LINES)
+        return stream.getvalue()
+
+    # === Modo sampling ===
+
+    @staticmethod
+    def _sample(samples, stop, interval):
+        own = threading.get_ident()
+        labels = {}  # code -> "função (arquivo:linha)"
+        while not stop.wait(interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = (
+                            f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                        )
+                    stack.append(label)
+                    frame = frame.f_back
+                # Threads de requisição ("Thread-12 (process_request_thread)") viram uma raiz só
+                stack.append(_THREAD_NUMBER.sub("", names.get(ident, str(ident))))
+                stack.reverse()
+                samples[";".join(stack)] += 1
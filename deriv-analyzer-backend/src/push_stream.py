@@ -0,0 +1,198 @@
+"""Stream de atualizações (Server-Sent Events) para os dashboards.
+
+Em vez de cada aba consultar ``/api/data`` a cada segundo, os clientes
+abrem ``/api/stream`` e recebem um snapshot completo na conexão e depois
+apenas os deltas: entradas (market, group_len, tipo) que mudaram, ticks
+novos, alertas de sequência e mudanças de conexão. Um único thread agrupa as mudanças no ritmo
+máximo configurado e monta cada frame uma vez por janela de filtro; o
+frame já codificado é compartilhado por todos os clientes dessa janela.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+HEARTBEAT_INTERVAL = 15  # segundos entre comentários de keep-alive
+FRAME_HISTORY = 32  # frames guardados por janela para clientes atrasados
+
+
+def format_event(event, payload):
+    """Codifica um evento SSE"""
+    data = json.dumps(payload, separators=(",", ":"))
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def diff_markets(previous, current):
+    """Retorna só o que mudou entre dois estados de get_filtered_results"""
+    changes = {}
+    for market, data in current.items():
+        before = previous.get(market)
+        if before is None:
+            changes[market] = data
+            continue
+        change = {}
+        if data["connected"] != before["connected"]:
+            change["connected"] = data["connected"]
+        if data["total_ticks"] != before["total_ticks"]:
+            change["total_ticks"] = data["total_ticks"]
+        groups = {}
+        for group_len, tipos in data["groups"].items():
+            old_tipos = before["groups"].get(group_len, {})
+            changed = {tipo: entry for tipo, entry in tipos.items() if old_tipos.get(tipo) != entry}
+            if changed:
+                groups[group_len] = changed
+        if groups:
+            change["groups"] = groups
+        strategies = {
+            name: entry for name, entry in data.get("strategies", {}).items()
+            if before.get("strategies", {}).get(name) != entry
+        }
+        if strategies:
+            change["strategies"] = strategies
+        if change:
+            changes[market] = change
+    return changes
+
+
+class _Channel:
+    """Estado publicado para uma janela de filtro"""
+
+    def __init__(self, state, status):
+        self.state = state
+        self.status = status
+        self.frame_id = 0
+        self.frames = deque(maxlen=FRAME_HISTORY)  # (frame_id, evento codificado)
+        self.subscribers = 0
+
+
+class PushHub:
+    """Agrupa mudanças do ingest e distribui frames para os clientes SSE"""
+
+    def __init__(self, controller, max_rate):
+        self.controller = controller
+        self.min_interval = 1.0 / max_rate
+        self._cond = threading.Condition()
+        self._channels = {}  # filtro -> _Channel
+        self._dirty = False
+        self._ticks = []  # ticks novos desde o último frame
+        self._alerts = []  # eventos do motor de alertas desde o último frame
+        self._thread = None
+
+    # === Chamado pelo ingest ===
+
+    def publish_tick(self, market, tick, timestamp, digit):
+        self.publish_ticks(((market, tick, timestamp, digit),))
+
+    def publish_ticks(self, ticks):
+        """Registra um lote de tuplas (market, tick, timestamp, digit)"""
+        if not self._channels:
+            return  # Ninguém conectado: custo zero no ingest
+        with self._cond:
+            self._ticks.extend(
+                {"market": market, "tick": tick, "timestamp": timestamp, "digit": digit}
+                for market, tick, timestamp, digit in ticks
+            )
+            self._dirty = True
+
+    def publish_alerts(self, events):
+        """Sink do motor de alertas: os eventos vão no próximo frame de todas as janelas"""
+        if not self._channels:
+            return
+        with self._cond:
+            self._alerts.extend(events)
+            self._dirty = True
+
+    def publish_change(self):
+        if not self._channels:
+            return
+        with self._cond:
+            self._dirty = True
+
+    # === Thread de coalescência ===
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="push-hub", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.min_interval)
+            with self._cond:
+                if not self._channels:
+                    self._thread = None
+                    return
+                if not self._dirty:
+                    continue
+                self._dirty = False
+                ticks, self._ticks = self._ticks, []
+                alerts, self._alerts = self._alerts, []
+                windows = list(self._channels)
+            self._flush(windows, ticks, alerts)
+
+    def _flush(self, windows, ticks, alerts=()):
+        status = self.controller.get_status()
+        states = {window: self.controller.get_filtered_results(window) for window in windows}
+        with self._cond:
+            for window, state in states.items():
+                channel = self._channels.get(window)
+                if channel is None:
+                    continue
+                payload = {"changes": diff_markets(channel.state, state)}
+                if ticks:
+                    payload["ticks"] = ticks
+                if alerts:
+                    payload["alerts"] = alerts
+                if status != channel.status:
+                    payload["status"] = status
+                channel.state = state
+                channel.status = status
+                channel.frame_id += 1
+                payload["frame"] = channel.frame_id
+                channel.frames.append((channel.frame_id, format_event("delta", payload)))
+            self._cond.notify_all()
+
+    # === Clientes ===
+
+    def _snapshot_event(self, window, channel):
+        return format_event("snapshot", {
+            "frame": channel.frame_id,
+            "data": channel.state,
+            "status": channel.status,
+            "tickets": self.controller.get_recent_tickets()
+        })
+
+    def subscribe(self, window):
+        """Gerador de eventos SSE para um cliente: snapshot e depois deltas"""
+        with self._cond:
+            channel = self._channels.get(window)
+            if channel is None:
+                # Primeiro cliente desta janela: o estado inicial é montado uma vez
+                state = self.controller.get_filtered_results(window)
+                channel = self._channels[window] = _Channel(state, self.controller.get_status())
+            channel.subscribers += 1
+            self._ensure_thread()
+            snapshot = self._snapshot_event(window, channel)
+            last = channel.frame_id
+
+        try:
+            yield snapshot
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: channel.frame_id != last, timeout=HEARTBEAT_INTERVAL)
+                    if channel.frame_id == last:
+                        pending = [": keep-alive\n\n"]
+                    elif channel.frames and channel.frames[0][0] <= last + 1:
+                        pending = [event for frame_id, event in channel.frames if frame_id > last]
+                    else:
+                        # Cliente ficou para trás além do histórico: manda um snapshot novo
+                        pending = [self._snapshot_event(window, channel)]
+                    last = channel.frame_id
+                for event in pending:
+                    yield event
+        finally:
+            with self._cond:
+                channel.subscribers -= 1
+                if channel.subscribers == 0:
+                    self._channels.pop(window, None)
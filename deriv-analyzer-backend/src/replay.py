@@ -0,0 +1,362 @@
+"""Replay/backtest offline da estratégia sobre ticks gravados.
+
+Lê arquivos CSV, JSONL ou o log binário de ticks e calcula, fora do
+processo Flask, as mesmas estatísticas por (mercado, group_len, tipo) de
+``/api/data`` (motor vetorizado de ``batch_engine``), mais os tempos.
+
+O trabalho é dividido em um pool de processos em duas etapas: cada arquivo
+é lido em um processo, e a sequência de dígitos de cada mercado é cortada
+em trechos (com os dígitos anteriores como contexto) e em faixas de
+tamanhos de grupo. Os trechos voltam como resumos parciais, juntados na
+ordem dos ticks.
+
+Formatos:
+
+- CSV com cabeçalho: ``epoch``, ``quote`` e, opcionalmente, ``symbol`` (ou
+  ``market``), ``digit`` e ``pip_size``;
+- JSONL: uma mensagem de tick da Deriv por linha (``{"tick": {...}}``) ou
+  objetos com os mesmos campos do CSV;
+- log binário: o diretório de um mercado (``database/ticks/1HZ10V``) ou o
+  diretório com um subdiretório por mercado.
+
+Com ``--sweep``, em vez das estatísticas de um conjunto de parâmetros, avalia
+todas as combinações de tamanhos de grupo, filtro de repetições e casa
+decimal (``src/sweep.py``) e lista as melhores por mercado.
+
+Uso::
+
+    python src/replay.py ticks/*.csv --groups 3-15 --workers 16
+    python src/replay.py database/ticks --sweep --groups 2-50 --decimals 1,2,3 --repeat-filter both
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.batch_engine import format_partials, merge_partials, parse_group_lens, partial_stats
+from src.sweep import rank, sweep
+from src.tick_log import SEGMENT_SUFFIX, read_segments
+from src.tick_parser import DEFAULT_PIP_SIZE, last_digit_from_text, parse_tick_message
+
+DEFAULT_GROUPS = "3-15"  # mesmo intervalo de ANALYZE_DIGITS_RANGE
+MIN_CHUNK_TICKS = 100000  # trechos menores não compensam o custo de enviar para outro processo
+REPEAT_FILTERS = {"on": (True,), "off": (False,), "both": (True, False)}
+
+
+def parse_groups(value):
+    """Tamanhos de grupo de um argumento como "3-15" ou "3,5,10-12" (o mesmo formato do ?groups= da API)"""
+    group_lens = parse_group_lens(value)
+    if group_lens is None:
+        raise argparse.ArgumentTypeError(f"Faixa de grupos inválida: {value}")
+    return group_lens
+
+
+def parse_decimals(value):
+    """Casas decimais de um argumento como "2" ou "1,2,3" """
+    try:
+        places = tuple(sorted({int(part) for part in value.split(",")}))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Casas decimais inválidas: {value}")
+    if min(places) < 0:
+        raise argparse.ArgumentTypeError(f"Casas decimais inválidas: {value}")
+    return places
+
+
+# === Leitura dos arquivos ===
+
+def detect_format(path):
+    if os.path.isdir(path):
+        return "log"
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    raise ValueError(f"Formato não reconhecido: {path}")
+
+
+def _tick_fields(row, market, pip_size):
+    """(mercado, epoch, cotação, dígito) de uma linha de CSV ou de um objeto JSONL"""
+    quote = str(row["quote"])
+    row_pip_size = int(row.get("pip_size") or pip_size)
+    digit = row.get("digit")
+    digit = int(digit) if digit not in (None, "") else last_digit_from_text(quote, row_pip_size)
+    epoch = row.get("epoch")
+    return (
+        row.get("symbol") or row.get("market") or market,
+        float(epoch) if epoch not in (None, "") else math.nan,
+        float(quote),
+        digit
+    )
+
+
+def _columns(ticks):
+    """{mercado: [(epoch, cotação, dígito)]} -> {mercado: (epochs, quotes, digits)}"""
+    return {
+        market: (np.array([tick[0] for tick in rows], dtype=np.float64),
+                 np.array([tick[1] for tick in rows], dtype=np.float64),
+                 np.array([tick[2] for tick in rows], dtype=np.uint8))
+        for market, rows in ticks.items()
+    }
+
+
+def read_csv(path, market, pip_size=DEFAULT_PIP_SIZE):
+    ticks = defaultdict(list)
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            tick_market, *fields = _tick_fields(row, market, pip_size)
+            ticks[tick_market].append(fields)
+    return _columns(ticks)
+
+
+def read_jsonl(path, market, pip_size=DEFAULT_PIP_SIZE):
+    ticks = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if '"tick"' in line:
+                tick = parse_tick_message(line)
+                if tick is None:
+                    continue
+                epoch = float(tick.epoch) if tick.epoch is not None else math.nan
+                ticks[tick.symbol or market].append((epoch, tick.quote, tick.digit))
+                continue
+            tick_market, *fields = _tick_fields(json.loads(line, parse_float=str), market, pip_size)
+            ticks[tick_market].append(fields)
+    return _columns(ticks)
+
+
+def read_log(path):
+    """Log binário de um mercado, ou de todos os mercados de um diretório"""
+    if any(name.endswith(SEGMENT_SUFFIX) for name in os.listdir(path)):
+        directories = {os.path.basename(os.path.normpath(path)): path}
+    else:
+        directories = {
+            name: os.path.join(path, name)
+            for name in sorted(os.listdir(path))
+            if os.path.isdir(os.path.join(path, name))
+        }
+    return {market: read_segments(directory) for market, directory in directories.items()}
+
+
+def load_file(task):
+    """Lê um arquivo (executado no pool): {mercado: (epochs, quotes, digits)}"""
+    path, file_format, market, pip_size = task
+    if file_format == "log":
+        return read_log(path)
+    if file_format == "csv":
+        return read_csv(path, market, pip_size)
+    return read_jsonl(path, market, pip_size)
+
+
+def merge_files(loaded):
+    """Junta os ticks de cada mercado em ordem de epoch, sem repetir trechos sobrepostos.
+
+    Retorna ``{mercado: (quotes, digits)}``.
+    """
+    per_market = defaultdict(list)
+    for columns in loaded:
+        for market, (epochs, quotes, digits) in columns.items():
+            if len(digits):
+                per_market[market].append((epochs, quotes, digits))
+
+    merged = {}
+    for market, parts in per_market.items():
+        # Arquivos sem epoch ficam na ordem informada (sort estável)
+        parts.sort(key=lambda part: part[0][0] if not math.isnan(part[0][0]) else -math.inf)
+        quotes, digits = [], []
+        last = -math.inf
+        for epochs, part_quotes, part_digits in parts:
+            if not math.isnan(epochs[-1]):
+                keep = ~(epochs <= last)
+                epochs, part_quotes, part_digits = epochs[keep], part_quotes[keep], part_digits[keep]
+                if len(epochs):
+                    last = max(last, float(np.nanmax(epochs)))
+            quotes.append(part_quotes)
+            digits.append(part_digits)
+        merged[market] = (np.concatenate(quotes), np.concatenate(digits))
+    return merged
+
+
+# === Cálculo ===
+
+def compute_chunk(task):
+    """Resumos de um trecho de um mercado para uma faixa de grupos (executado no pool)"""
+    market, index, digits, start, group_lens = task
+    return market, index, partial_stats(digits, group_lens, start)
+
+
+def chunk_tasks(market, digits, group_lens, chunk_size, group_chunks):
+    """Trechos (com contexto) x faixas de grupos de um mercado"""
+    context = max(group_lens)
+    per_chunk = math.ceil(len(group_lens) / group_chunks)
+    group_ranges = [group_lens[i:i + per_chunk] for i in range(0, len(group_lens), per_chunk)]
+    tasks = []
+    for index, start in enumerate(range(0, max(len(digits), 1), chunk_size)):
+        lead = min(start, context)
+        piece = digits[start - lead:start + chunk_size]
+        for group_range in group_ranges:
+            tasks.append((market, index, piece, lead, group_range))
+    return tasks
+
+
+def sweep_task(task):
+    """Varredura de um mercado com um filtro de repetições (executado no pool)"""
+    market, quotes, group_lens, decimal_places, repeat_filter = task
+    return market, sweep(quotes, group_lens, decimal_places, (repeat_filter,))
+
+
+def _files(paths, market, pip_size, file_format):
+    return [
+        (path, file_format or detect_format(path), market or os.path.splitext(os.path.basename(path))[0], pip_size)
+        for path in paths
+    ]
+
+
+def _timing(started, loaded, finished, ticks, files, tasks, workers):
+    return {
+        "load": round(loaded - started, 3),
+        "compute": round(finished - loaded, 3),
+        "total": round(finished - started, 3),
+        "ticks": ticks,
+        "ticks_per_second": round(ticks / (finished - started)) if finished > started else None,
+        "files": files,
+        "tasks": tasks,
+        "workers": workers
+    }
+
+
+def replay(paths, group_lens, workers=None, chunk_size=None, group_chunks=1,
+           market=None, pip_size=DEFAULT_PIP_SIZE, file_format=None):
+    """Executa o replay e retorna ``{"data": ..., "timing": ...}``"""
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    files = _files(paths, market, pip_size, file_format)
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    run = executor.map if executor is not None else map
+    try:
+        digits = {name: columns[1] for name, columns in merge_files(run(load_file, files)).items()}
+        loaded = time.perf_counter()
+
+        tasks = []
+        for market_name, market_digits in digits.items():
+            size = chunk_size or max(MIN_CHUNK_TICKS, math.ceil(len(market_digits) / workers))
+            tasks.extend(chunk_tasks(market_name, market_digits, group_lens, size, group_chunks))
+        chunks = defaultdict(dict)
+        for market_name, index, partials in run(compute_chunk, tasks):
+            chunks[market_name][index] = merge_partials(chunks[market_name].get(index, {}), partials)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    data = {}
+    for market_name in sorted(digits):
+        total = {}
+        for index in sorted(chunks[market_name]):
+            total = merge_partials(total, chunks[market_name][index])
+        groups = format_partials(total)
+        data[market_name] = {
+            "total_ticks": len(digits[market_name]),
+            "groups": {str(group_len): groups[str(group_len)] for group_len in group_lens}
+        }
+    finished = time.perf_counter()
+
+    ticks = sum(len(market_digits) for market_digits in digits.values())
+    return {"data": data, "timing": _timing(started, loaded, finished, ticks, len(files), len(tasks), workers)}
+
+
+def replay_sweep(paths, group_lens, decimal_places=(DEFAULT_PIP_SIZE,), repeat_filters=(True,),
+                 workers=None, min_entries=1, top=None, market=None, pip_size=DEFAULT_PIP_SIZE,
+                 file_format=None):
+    """Varredura de parâmetros por mercado: ``{"sweep": {mercado: [configurações]}, ...}``.
+
+    As configurações de cada mercado vêm ordenadas por ``sweep.rank``.
+    """
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    files = _files(paths, market, pip_size, file_format)
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    run = executor.map if executor is not None else map
+    try:
+        columns = merge_files(run(load_file, files))
+        loaded = time.perf_counter()
+        tasks = [
+            (market_name, quotes, group_lens, decimal_places, repeat_filter)
+            for market_name, (quotes, _) in columns.items()
+            for repeat_filter in repeat_filters
+        ]
+        rows = defaultdict(list)
+        for market_name, market_rows in run(sweep_task, tasks):
+            rows[market_name].extend(market_rows)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    ranked = {market_name: rank(rows[market_name], min_entries, top) for market_name in sorted(columns)}
+    finished = time.perf_counter()
+
+    ticks = sum(len(quotes) for quotes, _ in columns.values())
+    return {
+        "sweep": ranked,
+        "configs": len(group_lens) * 3 * len(decimal_places) * len(repeat_filters),  # x tipos
+        "timing": _timing(started, loaded, finished, ticks, len(files), len(tasks), workers)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay offline da estratégia de reversão par/ímpar")
+    parser.add_argument("paths", nargs="+", help="arquivos CSV/JSONL ou diretórios do log binário")
+    parser.add_argument("--groups", type=parse_groups, default=parse_groups(DEFAULT_GROUPS),
+                        help=f"tamanhos de grupo, ex.: 3-15 ou 3,5,10-12 (padrão: {DEFAULT_GROUPS})")
+    parser.add_argument("--workers", type=int, default=None, help="processos (padrão: número de CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="ticks por trecho de cálculo")
+    parser.add_argument("--group-chunks", type=int, default=1, help="faixas de grupos calculadas em separado")
+    parser.add_argument("--market", default=None, help="mercado dos arquivos sem coluna symbol (padrão: nome do arquivo)")
+    parser.add_argument("--pip-size", type=int, default=DEFAULT_PIP_SIZE, help="casa decimal do último dígito")
+    parser.add_argument("--format", dest="file_format", choices=("csv", "jsonl", "log"), default=None,
+                        help="formato dos arquivos (padrão: pela extensão)")
+    parser.add_argument("--output", default=None, help="arquivo JSON de saída (padrão: stdout)")
+    sweep_options = parser.add_argument_group("varredura de parâmetros")
+    sweep_options.add_argument("--sweep", action="store_true", help="avalia e ordena todas as combinações")
+    sweep_options.add_argument("--decimals", type=parse_decimals, default=None,
+                               help="casas decimais usadas como último dígito, ex.: 1,2,3 (padrão: --pip-size)")
+    sweep_options.add_argument("--repeat-filter", choices=tuple(REPEAT_FILTERS), default="on",
+                               help="filtro de repetições consecutivas")
+    sweep_options.add_argument("--min-entries", type=int, default=30, help="mínimo de entradas para o ranking")
+    sweep_options.add_argument("--top", type=int, default=20, help="configurações listadas por mercado")
+    args = parser.parse_args(argv)
+
+    if args.sweep:
+        result = replay_sweep(args.paths, args.groups, args.decimals or (args.pip_size,),
+                              REPEAT_FILTERS[args.repeat_filter], args.workers, args.min_entries, args.top,
+                              args.market, args.pip_size, args.file_format)
+    else:
+        result = replay(args.paths, args.groups, args.workers, args.chunk_size, args.group_chunks,
+                        args.market, args.pip_size, args.file_format)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f)
+    else:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    timing = result["timing"]
+    print(f"[Replay] {timing['ticks']} ticks em {timing['total']}s "
+          f"(leitura {timing['load']}s, cálculo {timing['compute']}s, {timing['workers']} processos)",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Cache de respostas JSON já serializadas.
+
+As respostas de ``/api/data`` e ``/api/market/<name>`` dependem só dos
+parâmetros da consulta (janela, mercados, grupos) e da versão do estado.
+O corpo é montado e codificado no máximo uma vez por chave e
+compartilhado entre requisições concorrentes: quem chega enquanto a chave
+está sendo montada espera o resultado em vez de montar de novo. Versões
+antigas da mesma consulta são descartadas assim que uma nova é gravada.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Cache LRU limitado de bytes, com montagem única por chave"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # chave -> bytes
+        self._latest = {}  # chave sem versão -> chave completa mais recente
+        self._building = {}  # chave -> threading.Event
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, query, version, build):
+        """Retorna os bytes de ``(query, version)``, chamando ``build()`` só se necessário"""
+        key = (query, version)
+        while True:
+            with self._lock:
+                body = self._entries.get(key)
+                if body is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return body
+                pending = self._building.get(key)
+                if pending is None:
+                    pending = self._building[key] = threading.Event()
+                    break
+            # Outra requisição já está montando esta chave
+            pending.wait()
+            with self._lock:
+                body = self._entries.get(key)
+                if body is not None:
+                    self.hits += 1
+                    return body
+            # A montagem falhou no outro thread: tenta montar aqui
+
+        try:
+            body = build()
+            with self._lock:
+                self.misses += 1
+                previous = self._latest.get(query)
+                if previous is not None and previous[1] <= version:
+                    self._entries.pop(previous, None)
+                if previous is None or previous[1] <= version:
+                    self._latest[query] = key
+                self._entries[key] = body
+                while len(self._entries) > self.max_entries:
+                    old_key, _ = self._entries.popitem(last=False)
+                    if self._latest.get(old_key[0]) == old_key:
+                        del self._latest[old_key[0]]
+            return body
+        finally:
+            with self._lock:
+                del self._building[key]
+            pending.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._latest.clear()
@@ -1,19 +1,145 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, g, jsonify, request, stream_with_context
+from functools import wraps
+import hmac
+import json
 import time
-from src.websocket_controller import websocket_controller
+from src.batch_engine import parse_group_lens
+from src.metrics import ROUTE_LATENCY_BUCKETS, RouteMetrics, histogram_lines, metric_lines
+from src.response_cache import ResponseCache
+from src.websocket_controller import (
+    ADMIN_TOKEN, ANALYZE_DIGITS_RANGE, LIVE_WINDOWS, MARKETS, parse_filter, parse_time_window, websocket_controller
+)
 
 api_bp = Blueprint('api', __name__)
 
+# Corpos JSON já codificados, compartilhados entre requisições da mesma versão
+response_cache = ResponseCache(max_entries=64)
+
+# Latência e respostas por rota, expostas em /api/metrics
+route_metrics = RouteMetrics()
+
+@api_bp.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if request.endpoint != 'api.stream_updates':  # O SSE fica aberto: não entra no profiling
+        g.profiling = websocket_controller.profiler.enter()
+
+@api_bp.after_request
+def record_request_metrics(response):
+    """Registra a latência da rota (no /stream, até o início da resposta)"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "desconhecida"
+        route_metrics.observe(route, response.status_code, time.perf_counter() - started)
+    return response
+
+@api_bp.teardown_request
+def stop_request_profiling(exc):
+    if g.pop('profiling', False):
+        websocket_controller.profiler.exit()
+
+def not_modified(etag):
+    """Responde 304 sem recalcular nada se o cliente já tem essa versão"""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+def versioned_request(version, *parts):
+    """Lê o ?since= e monta o ETag da resposta com a ``version`` dos dados"""
+    since = request.args.get('since', type=int)
+    etag = "-".join(str(part) for part in (version, *parts))
+    if since is not None:
+        etag += f"-since{since}"
+        if not websocket_controller.is_delta_valid(since) or since > version:
+            since = None  # Versão antiga demais, mais nova que os dados lidos ou reset no meio: resposta completa
+    return since, etag
+
+def invalid_parameter(message):
+    return jsonify({
+        "success": False,
+        "error": message
+    }), 400
+
+def data_parameters():
+    """Lê ?window=, ?market= e ?groups= da requisição.
+
+    Retorna ``(janela, mercados, tamanhos de grupo)`` normalizados (a mesma
+    consulta escrita de formas diferentes vira a mesma chave de cache), ou
+    uma resposta de erro.
+    """
+    filter_value = parse_filter(request.args.get('window', websocket_controller.data_filter))
+    if filter_value is None:
+        return None, invalid_parameter("Valor de janela inválido")
+    
+    markets = None
+    market_names = request.args.get('market')
+    if market_names:
+        names = set(market_names.split(","))
+        unknown = names.difference(MARKETS)
+        if unknown:
+            return None, (jsonify({
+                "success": False,
+                "error": f"Mercado {', '.join(sorted(unknown))} não encontrado"
+            }), 404)
+        markets = tuple(market for market in MARKETS if market in names)
+    
+    group_lens = None
+    if request.args.get('groups'):
+        group_lens = parse_group_lens(request.args['groups'], ANALYZE_DIGITS_RANGE)
+        if group_lens is None:
+            return None, invalid_parameter("Faixa de grupos inválida")
+    return (filter_value, markets, group_lens), None
+
+def cached_data_response(filter_value, market=None, markets=None, group_lens=None):
+    """Resposta de /data (ou de um mercado) servida do cache por (parâmetros, versão).
+
+    Requisições simultâneas com os mesmos parâmetros esperam uma única montagem.
+    """
+    query = (filter_value, market, markets, group_lens)
+    if filter_value not in LIVE_WINDOWS and parse_time_window(filter_value):
+        query += (int(time.time()),)  # Janela de tempo calculada na hora: muda a cada segundo
+    parts = [part for part in query if part is not None]
+    # Versão e snapshots da mesma publicação: o corpo montado deles vale exatamente o ETag
+    version, snapshots = websocket_controller.published()
+    since, etag = versioned_request(version, *(
+        ",".join(map(str, part)) if isinstance(part, tuple) else part for part in parts
+    ))
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    if filter_value not in LIVE_WINDOWS and filter_value != "sem_filtro":
+        since = None  # Janela avulsa é sempre calculada inteira: a resposta não é um delta
+    
+    def build():
+        data = websocket_controller.get_filtered_results(
+            filter_value, since, (market,) if market else markets, group_lens, snapshots
+        )
+        if market:
+            data = data.get(market, {})
+        return json.dumps(data, separators=(",", ":")).encode()
+    
+    body = response_cache.get_or_build((*query, since), version, build)
+    # Só o timestamp muda entre requisições: é concatenado ao corpo do cache
+    head = b'{"success":true,'
+    if market:
+        head += b'"market":' + json.dumps(market).encode() + b','
+    tail = b',"version":%d,"delta":%s,"timestamp":%d}' % (
+        version, b"true" if since is not None else b"false", int(time.time()))
+    response = Response(head + b'"data":' + body + tail, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
 @api_bp.route('/data', methods=['GET'])
 def get_data():
-    """Endpoint para obter todos os dados de análise"""
+    """Endpoint para obter os dados de análise (?window=, ?market=, ?groups=; padrão: filtro atual)"""
     try:
-        data = websocket_controller.get_filtered_results()
-        return jsonify({
-            "success": True,
-            "data": data,
-            "timestamp": int(time.time())
-        })
+        params, error = data_parameters()
+        if error is not None:
+            return error
+        filter_value, markets, group_lens = params
+        return cached_data_response(filter_value, markets=markets, group_lens=group_lens)
     except Exception as e:
         return jsonify({
             "success": False,
@@ -24,11 +150,18 @@ def get_data():
 def get_status():
     """Endpoint para verificar o status das conexões"""
     try:
+        etag = str(websocket_controller.state_version)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        
         status = websocket_controller.get_status()
-        return jsonify({
+        response = jsonify({
             "success": True,
             **status
         })
+        response.set_etag(etag)
+        return response
     except Exception as e:
         return jsonify({
             "success": False,
@@ -101,22 +234,61 @@ def get_recent_tickets():
             "error": str(e)
         }), 500
 
+@api_bp.route('/alerts', methods=['GET'])
+def get_alerts():
+    """Endpoint para obter os alertas de sequência abertos e os mais recentes"""
+    try:
+        return jsonify({
+            "success": True,
+            **websocket_controller.get_alerts()
+        })
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
 @api_bp.route('/market/<market_name>', methods=['GET'])
 def get_market_data(market_name):
-    """Endpoint para obter dados de um mercado específico"""
+    """Endpoint para obter dados de um mercado específico (?window=, ?groups=)"""
     try:
-        from src.websocket_controller import MARKETS
         if market_name not in MARKETS:
             return jsonify({
                 "success": False,
                 "error": f"Mercado {market_name} não encontrado"
             }), 404
         
-        all_data = websocket_controller.get_filtered_results()
+        params, error = data_parameters()
+        if error is not None:
+            return error
+        filter_value, _, group_lens = params
+        return cached_data_response(filter_value, market_name, group_lens=group_lens)
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@api_bp.route('/history', methods=['GET'])
+def get_history():
+    """Endpoint para obter estatísticas de um intervalo do histórico (?start=&end= em epoch)"""
+    try:
+        start = request.args.get('start', type=float)
+        end = request.args.get('end', type=float)
+        market_name = request.args.get('market')
+        if market_name is not None and market_name not in MARKETS:
+            return jsonify({
+                "success": False,
+                "error": f"Mercado {market_name} não encontrado"
+            }), 404
+        
+        markets = (market_name,) if market_name else None
+        data = websocket_controller.get_history_results(start, end, markets)
         return jsonify({
             "success": True,
-            "market": market_name,
-            "data": all_data.get(market_name, {}),
+            "data": data,
+            "start": start,
+            "end": end,
             "timestamp": int(time.time())
         })
     except Exception as e:
@@ -125,3 +297,152 @@ def get_market_data(market_name):
             "error": str(e)
         }), 500
 
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Endpoint de métricas no formato texto do Prometheus"""
+    try:
+        latency, responses = route_metrics.series()
+        lines = websocket_controller.get_metrics_lines()
+        lines += histogram_lines("deriv_analyzer_http_request_duration_seconds",
+                                 "Latência das rotas da API", ROUTE_LATENCY_BUCKETS, latency)
+        lines += metric_lines("deriv_analyzer_http_responses_total", "counter",
+                              "Respostas por rota e status (304 = cliente já tinha a versão)", responses)
+        lines += metric_lines("deriv_analyzer_response_cache_hits_total", "counter",
+                              "Respostas de /data servidas do cache", [({}, response_cache.hits)])
+        lines += metric_lines("deriv_analyzer_response_cache_misses_total", "counter",
+                              "Respostas de /data montadas", [({}, response_cache.misses)])
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+def admin_required(view):
+    """Rotas de administração: só existem com ADMIN_TOKEN definido e exigem o token.
+
+    Ficam fora do CORS (main.py): uma página qualquer aberta no navegador
+    não consegue chamá-las nem ler a resposta.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if ADMIN_TOKEN is None:
+            return jsonify({
+                "success": False,
+                "error": "Rotas de administração desativadas (defina ADMIN_TOKEN)"
+            }), 404
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+            return jsonify({
+                "success": False,
+                "error": "Token de administração inválido"
+            }), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+@api_bp.route('/admin/profile', methods=['GET'])
+@admin_required
+def get_profile_status():
+    """Endpoint para ver a sessão de profiling em andamento e a última encerrada"""
+    try:
+        return jsonify({
+            "success": True,
+            **websocket_controller.profiler.status()
+        })
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@api_bp.route('/admin/profile', methods=['POST'])
+@admin_required
+def start_profile():
+    """Endpoint para ligar o profiling por N segundos ({"mode": "sampling", "duration": 30})"""
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            duration = float(data.get('duration', 30))
+            interval = float(data['interval']) if data.get('interval') is not None else None
+            status = websocket_controller.profiler.start(data.get('mode', 'sampling'), duration, interval)
+        except (TypeError, ValueError) as e:
+            return invalid_parameter(str(e))
+        except RuntimeError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 409
+        return jsonify({
+            "success": True,
+            **status
+        }), 202
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@api_bp.route('/admin/profile', methods=['DELETE'])
+@admin_required
+def stop_profile():
+    """Endpoint para encerrar a sessão de profiling antes do tempo"""
+    try:
+        result = websocket_controller.profiler.stop()
+        if result is None:
+            return jsonify({
+                "success": False,
+                "error": "Nenhuma sessão de profiling em andamento"
+            }), 404
+        return jsonify({
+            "success": True,
+            "last": result
+        })
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@api_bp.route('/admin/profile/output', methods=['GET'])
+@admin_required
+def get_profile_output():
+    """Endpoint para baixar a saída da última sessão (?format=collapsed, text ou pstats)"""
+    try:
+        output = websocket_controller.profiler.output(request.args.get('format'))
+        if output is None:
+            return jsonify({
+                "success": False,
+                "error": "Nenhuma saída de profiling nesse formato"
+            }), 404
+        body, mimetype = output
+        return Response(body, mimetype=mimetype)
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@api_bp.route('/stream', methods=['GET'])
+def stream_updates():
+    """Endpoint SSE: snapshot completo na conexão e depois só os deltas"""
+    filter_value = request.args.get('filter', websocket_controller.data_filter)
+    if filter_value not in LIVE_WINDOWS and filter_value != "sem_filtro":
+        try:
+            filter_value = int(filter_value)
+        except (TypeError, ValueError):
+            filter_value = None
+    if filter_value not in LIVE_WINDOWS and filter_value != "sem_filtro":
+        return jsonify({
+            "success": False,
+            "error": "Valor de filtro inválido"
+        }), 400
+    
+    events = websocket_controller.push_hub.subscribe(filter_value)
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Evita buffering no proxy reverso (nginx)
+        }
+    )
@@ -0,0 +1,538 @@
+"""Estado publicado em memória compartilhada para vários processos da API.
+
+Um único processo coletor (o ``main.py`` de sempre) mantém as conexões com
+a Deriv, os motores e os logs; os workers da API (por exemplo, vários
+workers do gunicorn com ``SHARED_STATS_ROLE=reader``) só leem. O coletor
+copia os snapshots publicados para um segmento ``multiprocessing.shared_memory``
+no máximo ``max_rate`` vezes por segundo, em um thread próprio, fora do
+lock do ingest:
+
+- por mercado: os dados do snapshot (JSON) e um anel com os dígitos e
+  epochs dos últimos ticks, para as janelas calculadas na hora;
+- status, tickets recentes, alertas e métricas do coletor (JSON).
+
+Cada bloco JSON é protegido por um seqlock: o escritor deixa o contador
+ímpar enquanto escreve e par ao terminar; o leitor copia os bytes e
+descarta a cópia se o contador mudou no meio. O anel de ticks não usa o
+seqlock: o escritor anuncia o novo total antes de gravar, e uma leitura só
+vale se os ticks lidos não foram alcançados por esse total. Os leitores
+nunca escrevem no segmento nem bloqueiam o coletor. A ordem das escritas
+conta com o modelo de memória do x86-64 (stores não são reordenados entre si).
+
+Se um bloco JSON não cabe no espaço reservado, o coletor recria o segmento
+com o dobro do espaço (marcando o antigo como movido) e publica tudo de novo.
+Cada segmento criado tem uma geração aleatória no cabeçalho: os leitores só
+trocam de segmento quando a geração muda, e fecham o antigo assim que não
+restam visões dele.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+MAGIC = int.from_bytes(b"DRVSTAT1", "little")
+LAYOUT_VERSION = 2
+HEADER_WORDS = 16  # palavras uint64 do cabeçalho do segmento
+SLOT_WORDS = 8  # palavras uint64 do cabeçalho de cada bloco
+READ_RETRIES = 100  # tentativas de leitura de um bloco antes de desistir
+STATUS_INTERVAL = 1.0  # segundos máximos entre publicações do status (fila, métricas) sem mudança nos mercados
+ATTACH_INTERVAL = 1.0  # segundos mínimos entre tentativas do leitor de trocar de segmento
+
+# Palavras do cabeçalho do segmento
+(_MAGIC, _LAYOUT, _MARKETS, _TICK_CAPACITY, _BLOB_SIZE, _STATUS_SIZE, _WRITER_PID, _HEARTBEAT,
+ _GENERATION, _MOVED) = range(10)
+# Palavras do cabeçalho de cada bloco
+_SEQ, _LENGTH, _TICKS_TOTAL = range(3)
+
+
+class _SharedMemory(shared_memory.SharedMemory):
+    """Segmento fora do resource_tracker e que não é fechado pelo coletor de lixo.
+
+    Até o Python 3.12 o tracker de cada processo apaga o segmento quando o
+    processo termina, mesmo que ele só tenha se conectado a um existente.
+    E as visões NumPy dos blocos podem viver até o fim do processo (guardadas
+    nos snapshots): fechar o mmap antes delas falharia.
+    """
+
+    def __init__(self, name, create=False, size=0):
+        if sys.version_info >= (3, 13):
+            super().__init__(name, create, size, track=False)
+        else:
+            super().__init__(name, create, size)
+            if os.name == "posix":
+                resource_tracker.unregister(self._name, "shared_memory")
+
+    def __del__(self):
+        pass
+
+    def unlink(self):
+        if sys.version_info < (3, 13) and os.name == "posix":
+            resource_tracker.register(self._name, "shared_memory")  # o unlink() desfaz o registro
+        super().unlink()
+
+
+class _Layout:
+    """Posições dos blocos no segmento"""
+
+    def __init__(self, markets, tick_capacity, blob_size, status_size):
+        self.markets = markets
+        self.tick_capacity = tick_capacity
+        self.blob_size = _align(blob_size)
+        self.status_size = _align(status_size)
+        self.status = HEADER_WORDS * 8
+        self.digits_size = _align(tick_capacity)
+        self.market_stride = SLOT_WORDS * 8 + self.blob_size + self.digits_size + tick_capacity * 8
+        self.first_market = self.status + SLOT_WORDS * 8 + self.status_size
+        self.size = self.first_market + markets * self.market_stride
+
+    def header_values(self):
+        return {
+            _MAGIC: MAGIC, _LAYOUT: LAYOUT_VERSION, _MARKETS: self.markets,
+            _TICK_CAPACITY: self.tick_capacity, _BLOB_SIZE: self.blob_size, _STATUS_SIZE: self.status_size
+        }
+
+    def fits(self, markets, tick_capacity):
+        return self.markets == markets and self.tick_capacity == tick_capacity
+
+
+def _align(size):
+    return (size + 7) // 8 * 8
+
+
+def _read_header(segment):
+    """``(layout, geração)`` de um segmento pronto, ou ``(None, None)`` se o escritor ainda não terminou"""
+    header = np.ndarray(HEADER_WORDS, np.uint64, segment.buf, 0)
+    try:
+        if int(header[_MAGIC]) != MAGIC or int(header[_LAYOUT]) != LAYOUT_VERSION:
+            return None, None
+        layout = _Layout(
+            int(header[_MARKETS]), int(header[_TICK_CAPACITY]), int(header[_BLOB_SIZE]), int(header[_STATUS_SIZE])
+        )
+        generation = int(header[_GENERATION])
+    finally:
+        del header  # a visão não pode impedir o close() do segmento
+    if segment.size < layout.size:
+        return None, None
+    return layout, generation
+
+
+class SlotFull(ValueError):
+    """Bloco JSON maior que o espaço reservado no segmento"""
+
+    def __init__(self, kind, needed, size):
+        super().__init__(f"Bloco de {needed} bytes ({kind}) não cabe em {size} bytes")
+        self.kind = kind  # "status" ou "market"
+        self.needed = needed
+
+
+class _Slot:
+    """Bloco de bytes com seqlock"""
+
+    kind = "status"
+
+    def __init__(self, buf, offset, size):
+        self.words = np.ndarray(SLOT_WORDS, np.uint64, buf, offset)
+        self.data = buf[offset + SLOT_WORDS * 8:offset + SLOT_WORDS * 8 + size]
+        self.size = size
+
+    @property
+    def seq(self):
+        return int(self.words[_SEQ])
+
+    def write(self, payload):
+        if len(payload) > self.size:
+            raise SlotFull(self.kind, len(payload), self.size)
+        words = self.words
+        words[_SEQ] += 1  # ímpar: escrita em andamento
+        self.data[:len(payload)] = payload
+        words[_LENGTH] = len(payload)
+        words[_SEQ] += 1
+
+    def read(self):
+        """``(seq, bytes)`` de uma cópia consistente, ou None se o escritor não deixou"""
+        words = self.words
+        for _ in range(READ_RETRIES):
+            seq = int(words[_SEQ])
+            if not seq & 1:
+                payload = bytes(self.data[:min(int(words[_LENGTH]), self.size)])
+                if int(words[_SEQ]) == seq:
+                    return seq, payload
+            time.sleep(0)
+        return None
+
+
+class _MarketSlot(_Slot):
+    """Bloco JSON de um mercado e o anel com os dígitos e epochs dos últimos ticks"""
+
+    kind = "market"
+
+    def __init__(self, buf, offset, layout):
+        super().__init__(buf, offset, layout.blob_size)
+        ring = offset + SLOT_WORDS * 8 + layout.blob_size
+        self.capacity = layout.tick_capacity
+        self.digits = np.ndarray(self.capacity, np.uint8, buf, ring)
+        self.epochs = np.ndarray(self.capacity, np.float64, buf, ring + layout.digits_size)
+
+    @property
+    def ticks_total(self):
+        return int(self.words[_TICKS_TOTAL])
+
+    def append_ticks(self, digits, epochs):
+        """Grava ticks no anel e retorna o novo total"""
+        capacity = self.capacity
+        if len(digits) > capacity:
+            digits, epochs = digits[-capacity:], epochs[-capacity:]
+        count = len(digits)
+        total = self.ticks_total + count
+        self.words[_TICKS_TOTAL] = total  # anunciado antes: leitores descartam o que vai ser sobrescrito
+        first = (total - count) % capacity
+        head = min(count, capacity - first)
+        self.digits[first:first + head] = digits[:head]
+        self.epochs[first:first + head] = epochs[:head]
+        self.digits[:count - head] = digits[head:]
+        self.epochs[:count - head] = epochs[head:]
+        return total
+
+    def read_ticks(self, array, end, count):
+        """Cópia dos ticks [end - count, end) do anel, ou None se já foram sobrescritos"""
+        capacity = self.capacity
+        start = end - count
+        first = start % capacity
+        if first + count <= capacity:
+            values = array[first:first + count].copy()
+        else:
+            values = np.concatenate((array[first:], array[:first + count - capacity]))
+        if self.ticks_total - start > capacity:
+            return None
+        return values
+
+
+class SharedTickView:
+    """Ticks publicados de um mercado, com a mesma leitura de ``TickView``"""
+
+    __slots__ = ("slot", "end", "count")
+
+    def __init__(self, slot, end, count):
+        self.slot = slot
+        self.end = end
+        self.count = count
+
+    def digit_window(self, n=None):
+        """Cópia dos dígitos dos últimos ``n`` ticks, ou None se o anel já andou demais"""
+        count = self.count if n is None else max(0, min(n, self.count))
+        return self.slot.read_ticks(self.slot.digits, self.end, count)
+
+    def digits_since(self, epoch):
+        """Cópia dos dígitos dos ticks com epoch >= ``epoch``, ou None se o anel já andou demais"""
+        epochs = self.slot.read_ticks(self.slot.epochs, self.end, self.count)
+        if epochs is None:
+            return None
+        return self.digit_window(self.count - int(np.searchsorted(epochs, epoch)))
+
+
+class _Segment:
+    def __init__(self, segment, layout):
+        self.segment = segment
+        self.layout = layout
+        buf = segment.buf
+        self.header = np.ndarray(HEADER_WORDS, np.uint64, buf, 0)
+        self.heartbeat = np.ndarray(1, np.float64, buf, _HEARTBEAT * 8)
+        self.status = _Slot(buf, layout.status, layout.status_size)
+        self.markets = [
+            _MarketSlot(buf, layout.first_market + index * layout.market_stride, layout)
+            for index in range(layout.markets)
+        ]
+
+    def close(self):
+        # As visões NumPy precisam sumir antes de fechar o mmap
+        self.header = self.heartbeat = self.status = None
+        self.markets = []
+        self.segment.close()
+
+
+class SharedStatsWriter:
+    """Lado do coletor: cria (ou reaproveita) o segmento e escreve nele"""
+
+    def __init__(self, name, markets, tick_capacity, blob_size, status_size):
+        self.name = name
+        self.tick_capacity = tick_capacity
+        layout = _Layout(markets, tick_capacity, blob_size, status_size)
+        try:
+            segment = _SharedMemory(name, create=True, size=layout.size)
+        except FileExistsError:
+            # Segmento de uma execução anterior: reaproveitado se tem espaço suficiente,
+            # para os leitores continuarem conectados a ele
+            segment = _SharedMemory(name)
+            existing, _ = _read_header(segment)
+            if (existing is not None and existing.fits(markets, tick_capacity)
+                    and existing.blob_size >= layout.blob_size and existing.status_size >= layout.status_size):
+                self._open(segment, existing, None)
+                return
+            segment.close()
+            segment.unlink()
+            segment = _SharedMemory(name, create=True, size=layout.size)
+        self._open(segment, layout, _new_generation())
+
+    def _open(self, segment, layout, generation):
+        self._segment = _Segment(segment, layout)
+        header = self._segment.header
+        for word, value in layout.header_values().items():
+            if word != _MAGIC:
+                header[word] = value
+        if generation is not None:
+            header[_GENERATION] = generation
+        header[_WRITER_PID] = os.getpid()
+        header[_MOVED] = 0
+        header[_MAGIC] = MAGIC  # por último: só então o segmento está pronto para os leitores
+        self.beat()
+
+    @property
+    def layout(self):
+        return self._segment.layout
+
+    def grow(self, kind, needed):
+        """Recria o segmento com espaço para ``needed`` bytes nos blocos ``kind``; o conteúdo é perdido"""
+        old = self._segment
+        layout = old.layout
+        blob_size, status_size = layout.blob_size, layout.status_size
+        if kind == "status":
+            status_size = max(2 * status_size, needed * 3 // 2)
+        else:
+            blob_size = max(2 * blob_size, needed * 3 // 2)
+        layout = _Layout(layout.markets, layout.tick_capacity, blob_size, status_size)
+        old.header[_MOVED] = 1  # leitores procuram o novo segmento sem esperar o heartbeat envelhecer
+        self.close(unlink=True)
+        self._open(_SharedMemory(self.name, create=True, size=layout.size), layout, _new_generation())
+        return layout
+
+    def write_status(self, payload):
+        self._segment.status.write(payload)
+
+    def write_market(self, index, payload):
+        self._segment.markets[index].write(payload)
+
+    def append_ticks(self, index, digits, epochs):
+        return self._segment.markets[index].append_ticks(digits, epochs)
+
+    def ticks_total(self, index):
+        return self._segment.markets[index].ticks_total
+
+    def beat(self):
+        self._segment.heartbeat[0] = time.time()
+
+    def close(self, unlink=False):
+        segment = self._segment.segment
+        self._segment.close()
+        if unlink:
+            segment.unlink()
+
+
+def _new_generation():
+    return int.from_bytes(os.urandom(8), "little")
+
+
+class SharedStatsReader:
+    """Lado dos workers da API: conecta ao segmento e lê os blocos, decodificando só o que mudou"""
+
+    def __init__(self, name, markets, tick_capacity, stale_after=5.0):
+        self.name = name
+        self.markets = markets
+        self.tick_capacity = tick_capacity
+        self.stale_after = stale_after
+        self.retries = 0  # leituras descartadas por escrita no meio
+        self.attaches = 0  # segmentos novos encontrados (coletor reiniciado ou segmento ampliado)
+        self._segment = None
+        self._generation = None
+        self._retired = []  # segmentos substituídos que ainda têm visões em uso
+        self._cache = {}  # bloco -> (seq, valor decodificado)
+        self._next_attach = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def attached(self):
+        return self._segment is not None
+
+    def heartbeat_age(self):
+        """Segundos desde a última publicação do coletor (None se desconectado)"""
+        segment = self._segment
+        return None if segment is None else max(0.0, time.time() - float(segment.heartbeat[0]))
+
+    def check(self):
+        """Conecta ao segmento (ou troca por um novo, se o atual parou ou foi movido); retorna se está conectado"""
+        segment = self._segment
+        now = time.monotonic()
+        if (segment is not None and not segment.header[_MOVED]
+                and time.time() - float(segment.heartbeat[0]) < self.stale_after):
+            if self._retired and now >= self._next_attach:
+                with self._lock:
+                    self._next_attach = now + ATTACH_INTERVAL
+                    self._close_retired()
+            return True
+        if now < self._next_attach:
+            return segment is not None
+        with self._lock:
+            self._next_attach = now + ATTACH_INTERVAL
+            self._close_retired()
+            try:
+                fresh = _SharedMemory(self.name)
+            except FileNotFoundError:
+                return self._segment is not None
+            layout, generation = _read_header(fresh)
+            if (layout is None or not layout.fits(self.markets, self.tick_capacity)
+                    or (self._segment is not None and generation == self._generation)):
+                # Ainda não está pronto, ou é o mesmo segmento em que já estamos (coletor parado)
+                fresh.close()
+                return self._segment is not None
+            if self._segment is not None:
+                # Visões do segmento antigo ainda podem estar em uso em outras requisições
+                self._retired.append(self._segment)
+            self._segment = _Segment(fresh, layout)
+            self._generation = generation
+            self._cache.clear()
+            self.attaches += 1
+            self._close_retired()
+        return True
+
+    def _close_retired(self):
+        retired = []
+        for segment in self._retired:
+            try:
+                segment.close()
+            except BufferError:
+                retired.append(segment)  # ainda há visões: tenta de novo na próxima troca
+        self._retired = retired
+
+    def _read(self, key, slot):
+        seq = slot.seq
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == seq:
+            return cached[1]
+        copy = slot.read()
+        if copy is None:
+            self.retries += 1
+            return None if cached is None else cached[1]
+        seq, payload = copy
+        value = json.loads(payload) if payload else None
+        self._cache[key] = (seq, value)
+        return value
+
+    def status(self):
+        """Último status publicado (None se ainda não há)"""
+        segment = self._segment
+        return None if segment is None else self._read("status", segment.status)
+
+    def market(self, index):
+        """``(dados publicados, slot)`` de um mercado (dados None se ainda não há)"""
+        segment = self._segment
+        if segment is None:
+            return None, None
+        slot = segment.markets[index]
+        return self._read(index, slot), slot
+
+
+class SharedStatsPublisher:
+    """Copia o estado publicado do controlador para o segmento, em um thread próprio"""
+
+    def __init__(self, controller, writer, markets, max_rate):
+        self.controller = controller
+        self.writer = writer
+        self.markets = list(markets)
+        self.min_interval = 1.0 / max_rate
+        self.publications = 0
+        self.overflows = 0  # blocos que não couberam no segmento (cada um o recriou maior)
+        self._last_error = None
+        self._published = {}  # market -> snapshot já copiado (snapshots são imutáveis)
+        self._rings = {}  # market -> (buffer, total) dos ticks já copiados para o anel
+        self._last_status = 0.0
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="shared-stats", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.min_interval)
+            try:
+                self.publish()
+                self._last_error = None
+            except Exception as e:
+                if str(e) != self._last_error:  # o mesmo erro a cada publicação é registrado uma vez
+                    print(f"[Memória compartilhada] Erro ao publicar: {e}")
+                    self._last_error = str(e)
+
+    def publish(self):
+        try:
+            self._publish()
+            return
+        except SlotFull as e:
+            full = (e.kind, e.needed, str(e))
+        # Fora do except: o traceback guarda visões do segmento, que precisa ser fechado
+        kind, needed, message = full
+        layout = self.writer.grow(kind, needed)
+        self.overflows += 1
+        # Segmento novo e vazio: tudo é copiado de novo na próxima publicação
+        self._published.clear()
+        self._rings.clear()
+        self._last_status = 0.0
+        print(f"[Memória compartilhada] {message}: segmento recriado com {layout.size} bytes "
+              f"(mercado {layout.blob_size}, status {layout.status_size})")
+
+    def _publish(self):
+        controller = self.controller
+        # Versão e snapshots da mesma publicação; o full refresh lido depois nunca é mais antigo que eles
+        state_version, snapshots = controller.published()
+        full_refresh_version = controller.full_refresh_version
+        changed = False
+        for index, market in enumerate(self.markets):
+            snapshot = snapshots[market]
+            if self._published.get(market) is not snapshot and self._publish_market(index, market, snapshot):
+                self._published[market] = snapshot
+                changed = True
+        now = time.time()
+        if changed or now - self._last_status >= STATUS_INTERVAL:
+            self.writer.write_status(json.dumps({
+                "state_version": state_version,
+                "full_refresh_version": full_refresh_version,
+                "data_filter": controller.data_filter,
+                "status": controller.get_status(),
+                "recent_tickets": controller.get_recent_tickets(),
+                "alerts": controller.get_alerts(),
+                "metrics": controller.get_metrics_lines(),
+                "published": now
+            }, separators=(",", ":")).encode())
+            self._last_status = now
+            self.publications += 1
+        self.writer.beat()
+
+    def _publish_market(self, index, market, snapshot):
+        ticks = snapshot.ticks
+        buffer, total = self._rings.get(market, (None, 0))
+        if ticks.buffer is not buffer or ticks.total < total:
+            total = 0  # Buffer novo (reset): o anel recebe os ticks dele desde o início
+        new = min(ticks.total - total, ticks.count)
+        if new > 0:
+            copied = ticks.tail(new)
+            if copied is None:
+                return False  # Compactado durante a cópia: tenta de novo na próxima publicação
+            end = self.writer.append_ticks(index, *copied)
+        else:
+            end = self.writer.ticks_total(index)
+        self._rings[market] = (ticks.buffer, ticks.total)
+        self.writer.write_market(index, json.dumps({
+            "version": snapshot.version,
+            "connected": snapshot.connected,
+            "total_ticks": snapshot.total_ticks,
+            "groups": snapshot.groups,
+            "versions": snapshot.versions,
+            "strategies": snapshot.strategies,
+            "strategy_versions": snapshot.strategy_versions,
+            "ticks_end": end,
+            "ticks_count": min(ticks.count, self.writer.tick_capacity)
+        }, separators=(",", ":")).encode())
+        return True
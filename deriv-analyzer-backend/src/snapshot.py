@@ -0,0 +1,80 @@
+"""Snapshots imutáveis do estado publicado de cada mercado.
+
+Só o ingest altera buffers, motores e contadores. Depois de processar os
+ticks ele monta um ``MarketSnapshot`` novo e o publica trocando uma única
+referência; as rotas e o stream só leem snapshots, então nunca veem um
+estado pela metade e nunca bloqueiam o ingest. O snapshot novo reaproveita
+do anterior tudo o que não mudou (só os níveis alterados são copiados), e
+nada que já foi publicado volta a ser alterado.
+"""
+
+from collections import namedtuple
+from src.strategy_engine import TIPOS
+from src.window_stats import empty_entry
+
+# groups: {filtro: {group_len: {tipo: entrada formatada}}}
+# versions: {filtro: {group_len: {tipo: versão da última mudança}}}
+# ticks: TickView dos ticks gravados até a publicação
+# strategies / strategy_versions: {estratégia: entrada} e {estratégia: versão} (registro de estratégias)
+MarketSnapshot = namedtuple("MarketSnapshot", [
+    "version", "connected", "total_ticks", "groups", "versions", "ticks", "strategies", "strategy_versions"
+])
+
+
+def initial_snapshot(keys, group_lens, version, connected, ticks, strategy_names=()):
+    """Snapshot de um mercado sem nenhuma entrada"""
+    groups = {key: {str(group_len): {tipo: empty_entry() for tipo in TIPOS} for group_len in group_lens}
+              for key in keys}
+    versions = {key: {str(group_len): dict.fromkeys(TIPOS, version) for group_len in group_lens}
+                for key in keys}
+    strategies = {name: empty_entry() for name in strategy_names}
+    return MarketSnapshot(version, connected, ticks.count, groups, versions, ticks,
+                          strategies, dict.fromkeys(strategy_names, version))
+
+
+def next_snapshot(previous, version, connected, changes, ticks, strategy_changes=None):
+    """Snapshot seguinte a ``previous``.
+
+    ``changes`` tem o formato de ``groups`` com apenas as entradas alteradas;
+    ``strategy_changes``, o de ``strategies``.
+    """
+    groups = previous.groups
+    versions = previous.versions
+    if changes:
+        groups = dict(groups)
+        versions = dict(versions)
+        for key, changed in changes.items():
+            key_groups = groups[key] = dict(groups[key])
+            key_versions = versions[key] = dict(versions[key])
+            for group_len, tipos in changed.items():
+                key_groups[group_len] = {**key_groups[group_len], **tipos}
+                key_versions[group_len] = {**key_versions[group_len], **dict.fromkeys(tipos, version)}
+    strategies = previous.strategies
+    strategy_versions = previous.strategy_versions
+    if strategy_changes:
+        strategies = {**strategies, **strategy_changes}
+        strategy_versions = {**strategy_versions, **dict.fromkeys(strategy_changes, version)}
+    return MarketSnapshot(version, connected, ticks.count, groups, versions, ticks, strategies, strategy_versions)
+
+
+def snapshot_groups(snapshot, key, since=None):
+    """Grupos publicados para o filtro ``key`` (só os alterados após ``since``, se informado)"""
+    groups = snapshot.groups[key]
+    if since is None:
+        return groups
+    changed_groups = {}
+    for group_len, tipo_versions in snapshot.versions[key].items():
+        changed = {tipo: groups[group_len][tipo] for tipo, version in tipo_versions.items() if version > since}
+        if changed:
+            changed_groups[group_len] = changed
+    return changed_groups
+
+
+def snapshot_strategies(snapshot, since=None):
+    """Resultados publicados das estratégias (só os alterados após ``since``, se informado)"""
+    if since is None:
+        return snapshot.strategies
+    return {
+        name: snapshot.strategies[name]
+        for name, version in snapshot.strategy_versions.items() if version > since
+    }
@@ -0,0 +1,58 @@
+"""Motor incremental da estratégia de reversão par/ímpar.
+
+Em vez de refazer a lista de dígitos a cada tick, cada mercado mantém um
+estado rolante (sequência atual de mesma paridade e distância até a última
+repetição consecutiva). Com esse estado, todos os tamanhos de grupo são
+avaliados em tempo constante, independente do tamanho do histórico.
+"""
+
+TIPOS = ("geral", "pares", "impares")
+
+
+class IncrementalStrategyEngine:
+    """Estado rolante de um mercado para a estratégia de reversão"""
+
+    def __init__(self, group_lens, repeat_filter=True):
+        self.group_lens = tuple(sorted(group_lens))
+        self.repeat_filter = repeat_filter  # False: repetições consecutivas não invalidam o grupo
+        self.reset()
+
+    def reset(self):
+        """Zera o estado rolante"""
+        self.last_digit = None
+        self.parity_run = 0  # dígitos seguidos com a mesma paridade do último
+        self.no_repeat_run = 0  # dígitos seguidos sem repetição consecutiva
+
+    def push(self, digit):
+        """Processa um novo dígito.
+
+        Retorna ``(tipo, result, group_lens)`` com os tamanhos de grupo que
+        geraram entrada neste tick, ou ``None`` se nenhum grupo foi válido.
+        """
+        last = self.last_digit
+        fired = None
+
+        if last is not None:
+            # O grupo dos últimos N dígitos é válido se não tem repetições
+            # e é todo da mesma paridade, ou seja, N <= min(runs)
+            limit = min(self.parity_run, self.no_repeat_run) if self.repeat_filter else self.parity_run
+            count = 0
+            for group_len in self.group_lens:
+                if group_len > limit:
+                    break
+                count += 1
+            if count:
+                parity = last % 2
+                tipo = "pares" if parity == 0 else "impares"
+                result = "loss" if digit % 2 == parity else "win"
+                fired = (tipo, result, self.group_lens[:count])
+
+            # Atualiza o estado rolante com o novo dígito
+            self.no_repeat_run = 1 if digit == last else self.no_repeat_run + 1
+            self.parity_run = self.parity_run + 1 if digit % 2 == last % 2 else 1
+        else:
+            self.no_repeat_run = 1
+            self.parity_run = 1
+
+        self.last_digit = digit
+        return fired
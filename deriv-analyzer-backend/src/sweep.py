@@ -0,0 +1,85 @@
+"""Varredura de parâmetros da estratégia sobre um histórico de cotações.
+
+Avalia muitas configurações de uma vez: tamanhos de grupo (por exemplo
+2..50), filtro de repetições ligado/desligado e a casa decimal usada como
+"último dígito". O trabalho pesado é compartilhado: as cotações são
+convertidas para inteiros uma vez (na casa mais fina pedida) e o dígito de
+cada casa sai por divisão inteira; para cada filtro as sequências
+(run lengths) são calculadas uma vez. Todos os tamanhos de grupo saem do
+mesmo array de limites: as entradas do grupo G são as posições com limite
+>= G, então os candidatos são filtrados em ordem crescente de G e cada
+passo trabalha só com o que sobrou (que diminui rapidamente).
+"""
+
+import numpy as np
+from src.batch_engine import group_limits, streaks
+from src.window_stats import empty_entry, format_entry
+
+
+def sweep_digits(digits, group_lens, repeat_filter=True):
+    """Estatísticas de todos os tamanhos de grupo e tipos sobre um array de dígitos.
+
+    Retorna ``{(group_len, tipo): entrada}`` no formato da API.
+    """
+    group_lens = sorted(group_lens)
+    stats = {}
+    if len(digits) < 2 or not group_lens:
+        return stats
+
+    limit, breaks_parity, parity = group_limits(digits, repeat_filter)
+    candidates = np.flatnonzero(limit >= group_lens[0])
+    limits = limit[candidates]
+    wins = breaks_parity[1:][candidates]
+    even = parity[:-1][candidates] == 0
+
+    for tipo, selected in (("geral", None), ("pares", even), ("impares", ~even)):
+        tipo_limits = limits if selected is None else limits[selected]
+        tipo_wins = wins if selected is None else wins[selected]
+        for group_len in group_lens:
+            keep = tipo_limits >= group_len
+            tipo_limits, tipo_wins = tipo_limits[keep], tipo_wins[keep]
+            if len(tipo_wins) == 0:
+                stats[(group_len, tipo)] = empty_entry()
+                continue
+            max_win, max_loss, seq_win, seq_loss = streaks(tipo_wins)
+            won = int(tipo_wins.sum())
+            stats[(group_len, tipo)] = format_entry(
+                won, len(tipo_wins) - won, seq_win, seq_loss, max_win, max_loss
+            )
+    return stats
+
+
+def sweep(quotes, group_lens, decimal_places=(2,), repeat_filters=(True,)):
+    """Avalia todas as combinações e retorna uma linha por configuração.
+
+    Cada linha tem ``decimal_place``, ``repeat_filter``, ``group_len``,
+    ``tipo`` e os campos da entrada (``wins``, ``taxa_acerto``, ``max_loss``...).
+    """
+    finest = max(decimal_places)
+    scaled = np.rint(np.asarray(quotes, dtype=np.float64) * (10 ** finest)).astype(np.int64)
+    rows = []
+    for decimal_place in decimal_places:
+        # Dígito exibido nessa casa (truncado, não arredondado)
+        digits = ((scaled // (10 ** (finest - decimal_place))) % 10).astype(np.uint8)
+        for repeat_filter in repeat_filters:
+            for (group_len, tipo), entry in sweep_digits(digits, group_lens, repeat_filter).items():
+                rows.append({
+                    "decimal_place": decimal_place,
+                    "repeat_filter": repeat_filter,
+                    "group_len": group_len,
+                    "tipo": tipo,
+                    **entry
+                })
+    return rows
+
+
+def rank(rows, min_entries=1, top=None):
+    """Ordena as configurações por taxa de acerto (maior) e maior sequência de losses (menor).
+
+    Configurações com menos de ``min_entries`` entradas ficam de fora.
+    """
+    ranked = sorted(
+        (row for row in rows if row["entradas"] >= min_entries),
+        key=lambda row: (-row["taxa_acerto"], row["max_loss"], -row["entradas"])
+    )
+    return ranked if top is None else ranked[:top]
@@ -0,0 +1,151 @@
+"""Buffer circular compacto de ticks por mercado.
+
+Cotação, dígito e epoch ficam em arrays NumPy contíguos e paralelos
+(``float64``, ``uint8`` e ``float64``), em vez de um float Python por tick.
+O dígito é calculado uma única vez na entrada. Os dados válidos ocupam
+sempre um trecho contíguo do array (há uma folga no final que é
+compactada de tempos em tempos), então qualquer janela dos últimos N ticks
+é uma visão sem cópia.
+
+Leitores de outros threads usam ``view()``: a visão guarda o ponto de
+escrita no momento em que foi criada e, na leitura, copia os dados e
+confere o contador de compactações. Só a compactação move dados já
+gravados, então uma cópia feita sem compactação no meio é consistente.
+"""
+
+import numpy as np
+
+
+class TickRingBuffer:
+    """Últimos ``capacity`` ticks de um mercado em arrays contíguos"""
+
+    def __init__(self, capacity, slack=None):
+        self.capacity = capacity
+        if slack is None:
+            slack = max(capacity // 4, 1)
+        size = capacity + slack
+        self.prices = np.zeros(size, dtype=np.float64)
+        self.digits = np.zeros(size, dtype=np.uint8)
+        self.epochs = np.zeros(size, dtype=np.float64)
+        self.start = 0
+        self.end = 0
+        self.total = 0  # ticks gravados desde a criação
+        self.compactions = 0  # incrementado antes de mover dados já gravados
+
+    def __len__(self):
+        return self.end - self.start
+
+    def _compact(self):
+        """Move os dados válidos para o início do array, liberando a folga"""
+        count = self.end - self.start
+        self.compactions += 1
+        for array in (self.prices, self.digits, self.epochs):
+            array[:count] = array[self.start:self.end]
+        self.start = 0
+        self.end = count
+
+    def append(self, price, digit, epoch):
+        """Grava um tick, descartando o mais antigo se o buffer estiver cheio"""
+        if self.end == len(self.prices):
+            self._compact()
+        end = self.end
+        self.prices[end] = price
+        self.digits[end] = digit
+        self.epochs[end] = epoch
+        self.end = end + 1
+        self.total += 1
+        if self.end - self.start > self.capacity:
+            self.start += 1
+
+    def extend(self, prices, digits, epochs):
+        """Grava um lote de ticks de uma vez"""
+        count = len(digits)
+        if count >= self.capacity:
+            prices, digits, epochs = prices[-self.capacity:], digits[-self.capacity:], epochs[-self.capacity:]
+            self.compactions += 1  # sobrescreve o início do array
+            self.start = self.end = 0
+            self.total += count - self.capacity
+            count = self.capacity
+        if self.end + count > len(self.prices):
+            # Descarta antes o que seria sobrescrito, para caber após compactar
+            self.start = max(self.start, self.end + count - self.capacity)
+            self._compact()
+        end = self.end
+        self.prices[end:end + count] = prices
+        self.digits[end:end + count] = digits
+        self.epochs[end:end + count] = epochs
+        self.end = end + count
+        self.total += count
+        self.start = max(self.start, self.end - self.capacity)
+
+    def _bounds(self, n):
+        if n is None:
+            return self.start, self.end
+        n = max(0, min(n, self.end - self.start))
+        return self.end - n, self.end
+
+    def window(self, n=None):
+        """Visões (prices, digits, epochs) dos últimos ``n`` ticks, sem cópia"""
+        start, end = self._bounds(n)
+        return self.prices[start:end], self.digits[start:end], self.epochs[start:end]
+
+    def digit_window(self, n=None):
+        """Visão dos dígitos dos últimos ``n`` ticks, sem cópia"""
+        start, end = self._bounds(n)
+        return self.digits[start:end]
+
+    def view(self):
+        """Visão dos ticks gravados até agora, para leitura a partir de outros threads"""
+        return TickView(self, self.end, self.end - self.start, self.compactions, self.total)
+
+    def last_digit(self):
+        return int(self.digits[self.end - 1])
+
+    def last_price(self):
+        return float(self.prices[self.end - 1])
+
+    def clear(self):
+        self.compactions += 1
+        self.start = 0
+        self.end = 0
+        self.total = 0
+
+
+class TickView:
+    """Ticks de um buffer até o ponto em que a visão foi criada"""
+
+    __slots__ = ("buffer", "end", "count", "compactions", "total")
+
+    def __init__(self, buffer, end, count, compactions, total):
+        self.buffer = buffer
+        self.end = end
+        self.count = count
+        self.compactions = compactions
+        self.total = total  # ticks gravados no buffer até a visão
+
+    def digit_window(self, n=None):
+        """Cópia dos dígitos dos últimos ``n`` ticks, ou None se o buffer foi compactado"""
+        count = self.count if n is None else max(0, min(n, self.count))
+        digits = self.buffer.digits[self.end - count:self.end].copy()
+        if self.buffer.compactions != self.compactions:
+            return None  # Os dados foram movidos durante a cópia: use uma visão mais nova
+        return digits
+
+    def digits_since(self, epoch):
+        """Cópia dos dígitos dos ticks com epoch >= ``epoch``, ou None se o buffer foi compactado"""
+        buffer = self.buffer
+        start = self.end - self.count
+        first = start + int(np.searchsorted(buffer.epochs[start:self.end], epoch))
+        digits = buffer.digits[first:self.end].copy()
+        if buffer.compactions != self.compactions:
+            return None
+        return digits
+
+    def tail(self, n):
+        """Cópias (dígitos, epochs) dos últimos ``n`` ticks, ou None se o buffer foi compactado"""
+        start = self.end - max(0, min(n, self.count))
+        digits = self.buffer.digits[start:self.end].copy()
+        epochs = self.buffer.epochs[start:self.end].copy()
+        if self.buffer.compactions != self.compactions:
+            return None
+        return digits, epochs
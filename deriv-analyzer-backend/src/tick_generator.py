@@ -0,0 +1,74 @@
+"""Gerador sintético e reprodutível de ticks dos índices de volatilidade.
+
+Cada mercado segue um movimento browniano geométrico com a volatilidade
+anual do nome do índice (1HZ10V = 10%, 1HZ100V = 100%) e um tick por
+``interval`` segundos, como os índices 1s da Deriv. A mesma semente gera
+sempre os mesmos ticks, e cada mercado tem sua própria sequência
+(independente de quais outros mercados são gerados junto).
+"""
+
+import json
+import re
+import zlib
+
+import numpy as np
+
+from src.tick_parser import DEFAULT_PIP_SIZE
+
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+DEFAULT_START_PRICE = 10000.0
+DEFAULT_VOLATILITY = 0.10
+
+_VOLATILITY_INDEX = re.compile(r"^(?:1HZ|R_)(\d+)V?$")
+
+
+def market_volatility(market):
+    """Volatilidade anual de um índice pelo nome (``1HZ25V`` -> 0.25)"""
+    match = _VOLATILITY_INDEX.match(market)
+    return int(match.group(1)) / 100 if match else DEFAULT_VOLATILITY
+
+
+def _rng(market, seed):
+    return np.random.default_rng((seed, zlib.crc32(market.encode())))
+
+
+def generate_ticks(market, count, seed=0, start_epoch=0, interval=1,
+                   start_price=DEFAULT_START_PRICE, pip_size=DEFAULT_PIP_SIZE):
+    """Arrays ``(epochs, quotes, digits)`` de ``count`` ticks de um mercado"""
+    sigma = market_volatility(market) * np.sqrt(interval / SECONDS_PER_YEAR)
+    steps = _rng(market, seed).standard_normal(count) * sigma - sigma * sigma / 2
+    scaled = np.rint(start_price * np.exp(np.cumsum(steps)) * 10 ** pip_size).astype(np.int64)
+    epochs = start_epoch + np.arange(count, dtype=np.int64) * interval
+    return epochs, scaled / 10 ** pip_size, (scaled % 10).astype(np.uint8)
+
+
+def tick_message(market, epoch, quote, pip_size=DEFAULT_PIP_SIZE, subscription_id=None):
+    """Mensagem de tick no formato da API da Deriv (a cotação vai como número JSON)"""
+    subscription_id = subscription_id or f"{zlib.crc32(market.encode()):08x}"
+    return json.dumps({
+        "echo_req": {"subscribe": 1, "ticks": market},
+        "msg_type": "tick",
+        "subscription": {"id": subscription_id},
+        "tick": {
+            "ask": quote,
+            "bid": quote,
+            "epoch": int(epoch),
+            "id": subscription_id,
+            "pip_size": pip_size,
+            "quote": quote,
+            "symbol": market
+        }
+    }, separators=(",", ":"))
+
+
+def generate_messages(markets, count, seed=0, start_epoch=0, interval=1, pip_size=DEFAULT_PIP_SIZE):
+    """Mensagens de ``count`` ticks por mercado, intercaladas em ordem de epoch"""
+    columns = {
+        market: generate_ticks(market, count, seed, start_epoch, interval, pip_size=pip_size)
+        for market in markets
+    }
+    return [
+        tick_message(market, epochs[index], quotes[index], pip_size)
+        for index in range(count)
+        for market, (epochs, quotes, _) in columns.items()
+    ]
@@ -0,0 +1,230 @@
+"""Log binário append-only de ticks por mercado, com arquivos mapeados em memória.
+
+Cada mercado tem um diretório com segmentos de tamanho fixo
+(``00000001.seg``, ``00000002.seg``, ...). Cada segmento tem um cabeçalho
+com o número de registros válidos, seguido de registros fixos
+``(epoch, quote, digit)``. A escrita é uma cópia direta para o mapa de
+memória; o ``flush`` (fsync) é feito periodicamente, então uma queda perde
+no máximo os últimos segundos.
+
+Quando um segmento enche, outro é criado (rotação). A compactação dobra os
+segmentos antigos, que não são mais necessários para o buffer ao vivo, em
+um checkpoint (estado opaco fornecido pelo dono do log, gravado em JSON de
+forma atômica) e apaga esses segmentos. Na reinicialização o estado é o
+checkpoint mais os registros dos segmentos restantes.
+"""
+
+import json
+import mmap
+import os
+import shutil
+import time
+
+import numpy as np
+
+RECORD_DTYPE = np.dtype([("epoch", "<f8"), ("quote", "<f8"), ("digit", "u1")])
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("count", "<u8")])
+MAGIC = b"TICKLOG1"
+SEGMENT_SUFFIX = ".seg"
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+class _Segment:
+    """Um arquivo de segmento mapeado em memória"""
+
+    def __init__(self, path, sequence, capacity=None):
+        self.path = path
+        self.sequence = sequence
+        if capacity is not None:
+            with open(path, "wb") as f:
+                f.truncate(HEADER_DTYPE.itemsize + capacity * RECORD_DTYPE.itemsize)
+        self.file = open(path, "r+b")
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+        self.header = np.frombuffer(self.mm, HEADER_DTYPE, count=1)
+        if capacity is not None:
+            self.header["magic"] = MAGIC
+            self.header["count"] = 0
+        elif self.header["magic"][0] != MAGIC:
+            self.close()
+            raise ValueError(f"Segmento inválido: {path}")
+        self.capacity = (len(self.mm) - HEADER_DTYPE.itemsize) // RECORD_DTYPE.itemsize
+        self.records = np.frombuffer(self.mm, RECORD_DTYPE, count=self.capacity, offset=HEADER_DTYPE.itemsize)
+
+    @property
+    def count(self):
+        return min(int(self.header["count"][0]), self.capacity)
+
+    def append(self, epochs, quotes, digits):
+        """Grava o que couber; retorna quantos registros foram gravados"""
+        count = self.count
+        written = min(len(digits), self.capacity - count)
+        if written:
+            chunk = self.records[count:count + written]
+            chunk["epoch"] = epochs[:written]
+            chunk["quote"] = quotes[:written]
+            chunk["digit"] = digits[:written]
+            # O contador só avança depois dos dados: uma queda no meio não expõe lixo
+            self.header["count"] = count + written
+        return written
+
+    def flush(self):
+        self.mm.flush()
+
+    def close(self):
+        # As visões NumPy precisam ser liberadas antes de fechar o mapa
+        self.header = self.records = None
+        self.mm.close()
+        self.file.close()
+
+
+def read_segments(directory):
+    """Cópias (epochs, quotes, digits) dos segmentos de um log, sem abrir para escrita.
+
+    Para leitura offline (replay): não apaga nada nem cria arquivos. Os
+    registros já dobrados no checkpoint não estão mais nos segmentos.
+    """
+    checkpoint_path = os.path.join(directory, CHECKPOINT_FILE)
+    first_sequence = 0
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            first_sequence = json.load(f)["segment"]
+    parts = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(SEGMENT_SUFFIX) or int(name[:-len(SEGMENT_SUFFIX)]) < first_sequence:
+            continue
+        with open(os.path.join(directory, name), "rb") as f:
+            header = np.fromfile(f, HEADER_DTYPE, count=1)
+            if len(header) == 0 or header["magic"][0] != MAGIC:
+                raise ValueError(f"Segmento inválido: {name}")
+            parts.append(np.fromfile(f, RECORD_DTYPE, count=int(header["count"][0])))
+    records = np.concatenate(parts) if parts else np.empty(0, dtype=RECORD_DTYPE)
+    return records["epoch"].copy(), records["quote"].copy(), records["digit"].copy()
+
+
+class TickLog:
+    """Log de ticks de um mercado"""
+
+    def __init__(self, directory, segment_records=1 << 20, fsync_interval=5.0):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.fsync_interval = fsync_interval
+        self._last_flush = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+
+        self.checkpoint = self._load_checkpoint()
+        self.base = self.checkpoint["records"] if self.checkpoint else 0  # registros já no checkpoint
+        self.segments = []
+        first_sequence = self.checkpoint["segment"] if self.checkpoint else 0
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(SEGMENT_SUFFIX):
+                path = os.path.join(directory, name)
+                sequence = int(name[:-len(SEGMENT_SUFFIX)])
+                if sequence < first_sequence:
+                    os.remove(path)  # Já dobrado no checkpoint (queda antes da remoção)
+                    continue
+                self.segments.append(_Segment(path, sequence))
+
+    @property
+    def total(self):
+        """Registros gravados desde o início (incluindo os já compactados)"""
+        return self.base + sum(segment.count for segment in self.segments)
+
+    # === Escrita ===
+
+    def _rotate(self):
+        if self.segments:
+            self.segments[-1].flush()
+        sequence = self.segments[-1].sequence + 1 if self.segments else 1
+        path = os.path.join(self.directory, f"{sequence:08d}{SEGMENT_SUFFIX}")
+        self.segments.append(_Segment(path, sequence, self.segment_records))
+
+    def append(self, epochs, quotes, digits):
+        """Grava um lote de ticks"""
+        offset = 0
+        while offset < len(digits):
+            if not self.segments or self.segments[-1].count >= self.segments[-1].capacity:
+                self._rotate()
+            offset += self.segments[-1].append(epochs[offset:], quotes[offset:], digits[offset:])
+        if time.monotonic() - self._last_flush >= self.fsync_interval:
+            self.flush()
+
+    def flush(self):
+        if self.segments:
+            self.segments[-1].flush()
+        self._last_flush = time.monotonic()
+
+    # === Leitura ===
+
+    def read(self, start=None):
+        """Cópias (epochs, quotes, digits) dos registros a partir da posição absoluta ``start``"""
+        start = self.base if start is None else max(start, self.base)
+        parts = []
+        position = self.base
+        for segment in self.segments:
+            count = segment.count
+            if position + count > start:
+                parts.append(segment.records[max(0, start - position):count])
+            position += count
+        records = np.concatenate(parts) if parts else np.empty(0, dtype=RECORD_DTYPE)
+        return records["epoch"].copy(), records["quote"].copy(), records["digit"].copy()
+
+    # === Compactação ===
+
+    def _load_checkpoint(self):
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def compact(self, keep, fold):
+        """Dobra no checkpoint os segmentos fechados anteriores aos últimos ``keep`` registros.
+
+        ``fold(state, digits, quotes)`` recebe o estado do checkpoint anterior
+        (ou None) e os dígitos e cotações dos segmentos dobrados, e retorna o
+        estado novo (serializável em JSON). Retorna quantos registros foram
+        dobrados.
+        """
+        limit = self.total - keep
+        folded = []
+        position = self.base
+        for segment in self.segments[:-1]:
+            if position + segment.count > limit:
+                break
+            folded.append(segment)
+            position += segment.count
+        if not folded:
+            return 0
+
+        records = np.concatenate([segment.records[:segment.count] for segment in folded])
+        digits = records["digit"]
+        state = fold(self.checkpoint["state"] if self.checkpoint else None, digits, records["quote"])
+        checkpoint = {"records": position, "segment": folded[-1].sequence + 1, "state": state}
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)  # troca atômica: ou o checkpoint antigo, ou o novo
+
+        for segment in folded:
+            segment.close()
+            os.remove(segment.path)
+        self.segments = self.segments[len(folded):]
+        self.checkpoint = checkpoint
+        self.base = position
+        return len(digits)
+
+    def clear(self):
+        """Apaga todo o log (reset)"""
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+        self.checkpoint = None
+        self.base = 0
+
+    def close(self):
+        for segment in self.segments:
+            segment.flush()
+            segment.close()
+        self.segments = []
@@ -0,0 +1,99 @@
+"""Leitura rápida das mensagens de tick da Deriv.
+
+O último dígito é extraído direto do texto da cotação, usando o
+``pip_size`` enviado pela Deriv. Converter para float e voltar para texto
+perde zeros à direita (123.40 vira "123.4"), o que distorcia o dígito.
+O caminho rápido lê só os campos do objeto ``tick`` com uma expressão
+regular pré-compilada, sem ``json.loads``; mensagens fora do formato
+esperado caem no parser JSON completo, mantendo o texto dos números.
+"""
+
+import json
+import re
+from collections import namedtuple
+from decimal import Decimal
+
+DEFAULT_PIP_SIZE = 2
+
+# subscription: id da assinatura na Deriv (usado no "forget" de um feed parado)
+Tick = namedtuple("Tick", ["symbol", "quote", "epoch", "pip_size", "digit", "subscription"], defaults=(None,))
+
+
+def last_digit_from_text(quote_text, pip_size=DEFAULT_PIP_SIZE):
+    """Último dígito (casa decimal ``pip_size``) a partir do texto da cotação"""
+    if "e" in quote_text or "E" in quote_text:
+        quote_text = format(Decimal(quote_text), f".{pip_size}f")
+    dot = quote_text.find(".")
+    if dot < 0:
+        if pip_size == 0:
+            return ord(quote_text[-1]) - 48
+        return 0
+    if pip_size == 0:
+        return ord(quote_text[dot - 1]) - 48
+    position = dot + pip_size
+    if position < len(quote_text):
+        return ord(quote_text[position]) - 48
+    return 0  # zero à direita omitido no texto
+
+
+def last_digit_from_price(price, pip_size=DEFAULT_PIP_SIZE):
+    """Último dígito de uma cotação já convertida para float"""
+    return ord(f"{price:.{pip_size}f}"[-1]) - 48
+
+
+# Campos usados do objeto "tick" (que não tem objetos aninhados)
+_TICK_FIELD = re.compile(r'"(epoch|id|pip_size|quote|symbol)":\s*"?([^,}"\s]+)')
+
+
+def _parse_fallback(message):
+    try:
+        data = json.loads(message, parse_float=str)
+        tick = data.get("tick") if isinstance(data, dict) else None
+        if not isinstance(tick, dict) or "quote" not in tick:
+            return None
+        quote_text = str(tick["quote"])
+        pip_size = int(tick.get("pip_size", DEFAULT_PIP_SIZE))
+        epoch = tick.get("epoch")
+        return Tick(
+            tick.get("symbol"),
+            float(quote_text),
+            int(epoch) if epoch is not None else None,
+            pip_size,
+            last_digit_from_text(quote_text, pip_size),
+            tick.get("id")
+        )
+    except (ValueError, TypeError):
+        return None  # Cotação, pip_size ou epoch malformados: descarta só este frame
+
+
+def parse_tick_message(message):
+    """Extrai o tick de uma mensagem bruta da Deriv.
+
+    Retorna um ``Tick`` ou None se a mensagem não for um tick válido.
+    """
+    if isinstance(message, (bytes, bytearray)):
+        message = message.decode()
+    start = message.find('"tick":')
+    if start < 0:
+        return None
+    end = message.find("}", start)
+    if end < 0:
+        return _parse_fallback(message)
+
+    fields = dict(_TICK_FIELD.findall(message, start, end))
+    quote_text = fields.get("quote")
+    if quote_text is None:
+        return _parse_fallback(message)
+    try:
+        pip_size = int(fields.get("pip_size", DEFAULT_PIP_SIZE))
+        epoch = fields.get("epoch")
+        return Tick(
+            fields.get("symbol"),
+            float(quote_text),
+            int(epoch) if epoch is not None else None,
+            pip_size,
+            last_digit_from_text(quote_text, pip_size),
+            fields.get("id")
+        )
+    except ValueError:
+        return _parse_fallback(message)
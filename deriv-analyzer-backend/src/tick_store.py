@@ -0,0 +1,178 @@
+"""Histórico de ticks em SQLite para consultas por intervalo de tempo.
+
+Os ticks são gravados em blocos: cada linha de ``tick_blocks`` guarda um
+trecho contínuo de ticks de um mercado, com epochs, cotações e dígitos em
+BLOBs binários (arrays NumPy) e o intervalo de epochs do bloco indexado por
+(market, first_epoch). Uma consulta de dias de histórico lê algumas
+centenas de linhas e junta os BLOBs direto em arrays, sem criar um objeto
+Python por tick.
+
+A escrita acumula os ticks do ingest e grava blocos inteiros em uma única
+transação, em modo WAL: leitores (rotas Flask, cada thread com sua conexão)
+não bloqueiam a escrita. Os ticks ainda não gravados também aparecem nas
+consultas: cada gravação incrementa um contador, e uma leitura que cruzou
+uma gravação é refeita, para não perder nem duplicar ticks.
+
+Com ``retention`` definido, os blocos mais antigos que isso são apagados
+(no máximo uma vez por ``PRUNE_INTERVAL``); sem ele o banco cresce sem
+limite. As páginas liberadas são reaproveitadas pelas gravações seguintes.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+PRUNE_INTERVAL = 3600  # segundos entre duas limpezas de blocos fora da retenção
+READ_RETRIES = 3  # leituras refeitas sem lock antes de ler segurando o lock de escrita
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tick_blocks (
+    market TEXT NOT NULL,
+    first_epoch REAL NOT NULL,
+    last_epoch REAL NOT NULL,
+    count INTEGER NOT NULL,
+    epochs BLOB NOT NULL,
+    quotes BLOB NOT NULL,
+    digits BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tick_blocks_market_epoch ON tick_blocks (market, first_epoch);
+"""
+
+# Blocos que cobrem [start, end]: começa no último bloco iniciado até ``start``
+RANGE_QUERY = """
+SELECT epochs, quotes, digits FROM tick_blocks
+WHERE market = :market
+  AND first_epoch >= COALESCE(
+      (SELECT MAX(first_epoch) FROM tick_blocks WHERE market = :market AND first_epoch <= :start),
+      :start)
+  AND first_epoch <= :end
+ORDER BY first_epoch
+"""
+
+
+class TickStore:
+    """Ticks de todos os mercados em um banco SQLite"""
+
+    def __init__(self, path, block_size=512, flush_interval=60.0, retention=None):
+        self.path = path
+        self.block_size = block_size
+        self.flush_interval = flush_interval
+        self.retention = retention  # segundos de histórico mantidos (None = sem limite)
+        self._lock = threading.Lock()
+        self._writer = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+        self._writer.executescript(SCHEMA)
+        self._pending = defaultdict(list)  # market -> [(epochs, quotes, digits)]
+        self._pending_count = defaultdict(int)
+        self._last_flush = time.monotonic()
+        self._last_prune = None
+        self._flushes = 0  # gravações feitas: uma leitura que cruza uma delas é refeita
+        self._readers = threading.local()
+
+    # === Escrita ===
+
+    def append(self, market, epochs, quotes, digits):
+        """Acumula um lote de ticks; grava quando um bloco enche ou o intervalo vence"""
+        with self._lock:
+            self._pending[market].append((
+                np.asarray(epochs, dtype=np.float64),
+                np.asarray(quotes, dtype=np.float64),
+                np.asarray(digits, dtype=np.uint8)
+            ))
+            self._pending_count[market] += len(digits)
+            if (self._pending_count[market] >= self.block_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        rows = []
+        for market, parts in self._pending.items():
+            if not parts:
+                continue
+            epochs, quotes, digits = (np.concatenate(column) for column in zip(*parts))
+            for start in range(0, len(digits), self.block_size):
+                block = slice(start, start + self.block_size)
+                rows.append((
+                    market,
+                    float(epochs[block][0]),
+                    float(epochs[block][-1]),
+                    len(digits[block]),
+                    epochs[block].tobytes(),
+                    quotes[block].tobytes(),
+                    digits[block].tobytes()
+                ))
+        if rows:
+            self._writer.execute("BEGIN")
+            try:
+                self._writer.executemany("INSERT INTO tick_blocks VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self._writer.execute("COMMIT")
+            except Exception:
+                self._writer.execute("ROLLBACK")
+                raise
+            self._flushes += 1
+        self._pending.clear()
+        self._pending_count.clear()
+        self._last_flush = time.monotonic()
+        if self.retention is not None and (self._last_prune is None
+                                           or self._last_flush - self._last_prune >= PRUNE_INTERVAL):
+            self._prune(time.time() - self.retention)
+            self._last_prune = self._last_flush
+
+    def _prune(self, before):
+        """Apaga os blocos que terminam antes do epoch ``before``"""
+        deleted = self._writer.execute("DELETE FROM tick_blocks WHERE last_epoch < ?", (before,)).rowcount
+        if deleted:
+            print(f"[Histórico] {deleted} blocos anteriores à retenção apagados")
+
+    # === Leitura ===
+
+    def _reader(self):
+        connection = getattr(self._readers, "connection", None)
+        if connection is None:
+            connection = self._readers.connection = sqlite3.connect(self.path)
+        return connection
+
+    def read_range(self, market, start=None, end=None):
+        """Arrays (epochs, quotes, digits) dos ticks de ``market`` com epoch em [start, end]"""
+        start = float("-inf") if start is None else float(start)
+        end = float("inf") if end is None else float(end)
+        parameters = {"market": market, "start": start, "end": end}
+        for _ in range(READ_RETRIES):
+            with self._lock:
+                flushes = self._flushes
+                pending = list(self._pending.get(market, ()))
+            rows = self._reader().execute(RANGE_QUERY, parameters).fetchall()
+            with self._lock:
+                if self._flushes == flushes:
+                    break  # nenhuma gravação entre as duas leituras: banco e pendentes não se sobrepõem
+        else:
+            with self._lock:
+                pending = list(self._pending.get(market, ()))
+                rows = self._reader().execute(RANGE_QUERY, parameters).fetchall()
+
+        stored = [
+            np.frombuffer(b"".join(row[index] for row in rows), dtype=dtype)
+            for index, dtype in enumerate((np.float64, np.float64, np.uint8))
+        ]
+        epochs, quotes, digits = (
+            np.concatenate([column] + [part[index] for part in pending])
+            for index, column in enumerate(stored)
+        )
+        selected = (epochs >= start) & (epochs <= end)
+        return epochs[selected], quotes[selected], digits[selected]
+
+    def digits(self, market, start=None, end=None):
+        """Dígitos dos ticks de ``market`` com epoch em [start, end], prontos para o motor"""
+        return self.read_range(market, start, end)[2]
+
+    def close(self):
+        self.flush()
+        self._writer.close()
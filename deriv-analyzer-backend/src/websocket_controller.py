@@ -1,21 +1,228 @@
-import websocket
-import threading
 import json
+import os
+import re
+import threading
 import time
+import urllib.request
+import numpy as np
 from collections import deque, defaultdict
+from src.alert_engine import AlertEngine, LogSink, WebhookSink, rules_from_thresholds
+from src.batch_engine import calculate_stats
+from src.collector import AsyncCollector
+from src.digit_strategies import STRATEGIES, FusedStrategyEngine, strategy_stats
+from src.ingest_queue import IngestQueue, IngestWorker
+from src.metrics import (
+    FEED_LATENCY_BUCKETS, PIPELINE_LATENCY_BUCKETS, TICK_PROCESSING_BUCKETS, Histogram, histogram_lines, metric_lines
+)
+from src.profiler import Profiler
+from src.push_stream import PushHub
+from src.shared_stats import READ_RETRIES, SharedStatsPublisher, SharedStatsReader, SharedStatsWriter, SharedTickView
+from src.tick_log import TickLog
+from src.tick_store import TickStore
+from src.snapshot import MarketSnapshot, initial_snapshot, next_snapshot, snapshot_groups, snapshot_strategies
+from src.tick_buffer import TickRingBuffer
+from src.tick_parser import DEFAULT_PIP_SIZE, last_digit_from_price, parse_tick_message
+from src.strategy_engine import IncrementalStrategyEngine
+from src.window_stats import WindowedStats, format_entry
 
 # === CONFIGURAÇÃO ===
 MARKETS = ["1HZ10V", "1HZ25V", "1HZ50V", "1HZ75V", "1HZ100V"]
-TICK_LIMIT = 10000
+TICK_LIMIT = 100000  # cobre as 24 h da maior janela de tempo com 1 tick/s
 ANALYZE_DIGITS_RANGE = range(3, 16)  # de 3 a 15
-WS_URL = "wss://ws.binaryws.com/websockets/v3?app_id=82681"
-RECONNECT_DELAY = 5  # segundos para tentar reconectar
+FILTER_WINDOWS = (25, 50, 100, 500, 1000, 3000)  # janelas mantidas ao vivo
+TIME_WINDOWS = {"15m": 15 * 60, "1h": 60 * 60, "24h": 24 * 60 * 60}  # janelas de tempo mantidas ao vivo
+TIME_WINDOW_REFRESH_INTERVAL = 1.0  # segundos entre avanços das janelas de tempo pelo relógio (com ou sem ticks)
+LIVE_WINDOWS = (*FILTER_WINDOWS, *TIME_WINDOWS)
+WS_URL = os.environ.get("WS_URL", "wss://ws.binaryws.com/websockets/v3?app_id=82681")  # ws://127.0.0.1:8765 para o src/fake_deriv_server.py
+RECONNECT_DELAY = 5  # atraso base (s) do backoff exponencial de reconexão
+MAX_RECONNECT_DELAY = 120  # teto (s) do backoff de reconexão
 MAX_RECONNECT_ATTEMPTS = 100  # máximo de tentativas de reconexão
+MARKETS_PER_CONNECTION = 0  # mercados por conexão WebSocket (0 = todos em uma só, 1 = uma por mercado)
+STALE_FEED_TIMEOUT = 30  # segundos sem ticks para considerar o feed parado
+PUSH_MAX_RATE = 4  # máximo de frames por segundo enviados no /api/stream
+INGEST_QUEUE_SIZE = 10000  # ticks aguardando análise antes de aplicar a política de transbordo
+INGEST_QUEUE_POLICY = "block"  # "block" (backpressure no socket), "drop_oldest" ou "drop_newest"
+INGEST_BLOCK_TIMEOUT = 1.0  # espera máxima (s) do leitor com a fila cheia na política "block"
+INGEST_BATCH_SIZE = 500  # máximo de ticks processados por lote
+TICK_LOG_DIR = os.environ.get("TICK_LOG_DIR", os.path.join(os.path.dirname(__file__), "database", "ticks")) or None  # vazio/None desativa o log
+TICK_LOG_FSYNC_INTERVAL = 5  # segundos entre fsyncs do log de ticks
+TICK_LOG_SEGMENT_RECORDS = 1 << 20  # ticks por segmento do log antes da rotação
+TICK_STORE_PATH = os.environ.get("TICK_STORE_PATH", os.path.join(os.path.dirname(__file__), "database", "ticks.db")) or None  # vazio/None desativa o histórico
+TICK_STORE_BLOCK_SIZE = 512  # ticks por bloco gravado no histórico
+TICK_STORE_FLUSH_INTERVAL = 60  # segundos máximos antes de gravar um bloco incompleto
+TICK_STORE_RETENTION_DAYS = 30  # dias de histórico mantidos no SQLite (None = cresce sem limite)
+PERSIST_QUEUE_SIZE = 2000  # lotes aguardando o writer de persistência antes de o ingest esperar
+SNAPSHOT_KEYS = (*LIVE_WINDOWS, "sem_filtro")  # filtros publicados prontos nos snapshots
+ALERT_THRESHOLDS = {7: 6, 8: 5, 9: 4, 10: 3, 11: 2, 12: 2, 13: 1, 14: 1, 15: 1}  # grupo: alerta com losses seguidas acima do limite
+ALERT_COOLDOWN = 60  # segundos mínimos entre dois alertas da mesma regra e mercado
+ALERT_WEBHOOK_URL = os.environ.get("ALERT_WEBHOOK_URL")  # None desativa o webhook
+ALERT_LOG_PATH = os.environ.get("ALERT_LOG_PATH", os.path.join(os.path.dirname(__file__), "database", "alerts.log")) or None  # vazio/None desativa o log de alertas
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN") or None  # token (Authorization: Bearer) das rotas /api/admin; None desativa essas rotas
+PROFILE_SPANS = ("on_message", "process_ticks", "simulate_strategy", "_calculate_filtered_stats", "get_formatted_results")  # métodos cronometrados nas sessões de profiling
+PROFILE_MAX_DURATION = 300  # duração máxima (s) de uma sessão de profiling
+PROFILE_SAMPLE_INTERVAL = 0.005  # intervalo (s) padrão entre amostras no modo sampling
+PROFILE_SWITCH_INTERVAL = 0.00001  # intervalo de troca do GIL durante o sampling (o padrão de 5 ms concentra as amostras onde o NumPy libera o GIL)
+SHARED_STATS_NAME = os.environ.get("SHARED_STATS_NAME") or None  # segmento de memória compartilhada lido pelos workers da API (None desativa)
+SHARED_STATS_ROLE = os.environ.get("SHARED_STATS_ROLE", "collector")  # "collector" coleta e publica; "reader" só lê (workers do gunicorn)
+SHARED_STATS_COLLECTOR_URL = os.environ.get("SHARED_STATS_COLLECTOR_URL")  # para onde os leitores encaminham /start, /stop, /reset e /filter
+SHARED_STATS_MAX_RATE = 10  # máximo de publicações por segundo no segmento
+SHARED_STATS_BLOB_SIZE = 1 << 19  # bytes reservados de início para os dados de cada mercado (~60 KB em uso; dobra se faltar)
+SHARED_STATS_STATUS_SIZE = 1 << 18  # bytes reservados de início para status, tickets, alertas e métricas (~20 KB em uso; dobra se faltar)
+SHARED_STATS_STALE_AFTER = 5  # segundos sem publicação para o leitor tentar reconectar ao segmento
+SHARED_STATS_FORWARD_TIMEOUT = 10  # espera máxima (s) pelo coletor nos comandos encaminhados
+
+def build_shards(markets, per_connection):
+    """Agrupa os mercados em conexões (shards) de até ``per_connection`` mercados"""
+    size = per_connection if per_connection and per_connection < len(markets) else len(markets)
+    shards = {}
+    for start in range(0, len(markets), size):
+        group = tuple(markets[start:start + size])
+        # Conexões de um único mercado mantêm o nome do mercado como identificador
+        shard_id = group[0] if len(group) == 1 else f"shard-{start // size}"
+        shards[shard_id] = group
+    return shards
+
+_DURATION = re.compile(r"^(\d+)(s|m|h|d)$")
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+def parse_time_window(value):
+    """Duração em segundos de um filtro de tempo ("15m", "2h", ...), ou None"""
+    match = _DURATION.match(value) if isinstance(value, str) else None
+    if match is None or int(match.group(1)) == 0:
+        return None
+    return int(match.group(1)) * _DURATION_UNITS[match.group(2)]
+
+def parse_filter(value):
+    """Normaliza um filtro (quantidade de tickets, janela de tempo ou "sem_filtro"), ou None se inválido"""
+    if value == "sem_filtro" or value in TIME_WINDOWS or parse_time_window(value):
+        return value
+    try:
+        count = int(value)
+    except (TypeError, ValueError):
+        return None
+    return count if count > 0 else None
+
+class ResultsView:
+    """Leitura dos resultados a partir dos snapshots publicados.
+
+    Usada pelo controlador que faz o ingest e pelos workers que só leem o
+    estado dele da memória compartilhada (``SharedStatsController``).
+    """
+
+    def is_delta_valid(self, since):
+        """Indica se um delta a partir da versão ``since`` pode ser montado"""
+        return since is not None and self.full_refresh_version <= since <= self.state_version
+
+    def get_filtered_results(self, filter_value=None, since=None, markets=None, group_lens=None, snapshots=None):
+        """Retorna os resultados filtrados (pelo filtro atual, se nenhum for informado).
+
+        Com ``since``, só os mercados e entradas alterados depois dessa versão
+        são incluídos. Filtros fora das janelas ao vivo sempre voltam completos.
+        ``markets`` e ``group_lens`` limitam o cálculo a esses mercados e
+        tamanhos de grupo (padrão: todos). ``snapshots`` (de ``published()``)
+        fixa os dados lidos; sem ele, vale a última publicação.
+        """
+        if filter_value is None:
+            filter_value = self.data_filter
+        if filter_value == "sem_filtro":
+            return self._select_groups(self.get_formatted_results(since, markets, snapshots), group_lens)
+        if filter_value not in LIVE_WINDOWS:
+            since = None
+        duration = parse_time_window(filter_value) if filter_value not in LIVE_WINDOWS else None
+        
+        # Aplica filtro baseado na quantidade de tickets (ou no tempo)
+        filtered_data = {}
+        if snapshots is None:
+            snapshots = self.snapshots  # Lido uma vez: um reset no meio da leitura não mistura os dados
+        
+        for market in (MARKETS if markets is None else markets):
+            snapshot = snapshots[market]
+            if since is not None and snapshot.version <= since:
+                continue
+            filtered_data[market] = {
+                "connected": snapshot.connected,
+                "total_ticks": snapshot.total_ticks,
+                "groups": {}
+            }
+            
+            # Janelas padrão são mantidas ao vivo: a leitura é só uma consulta ao snapshot
+            if filter_value in LIVE_WINDOWS:
+                filtered_data[market]["groups"] = snapshot_groups(snapshot, filter_value, since)
+            # Pega apenas os tickets dos últimos N segundos (busca binária nos epochs)
+            elif duration is not None:
+                start = time.time() - duration
+                filtered_digits = self._snapshot_digits(market, snapshot, lambda view: view.digits_since(start))
+                filtered_data[market]["groups"] = self._calculate_filtered_stats(market, filtered_digits, group_lens)
+            # Pega apenas os últimos N tickets para análise
+            else:
+                filtered_digits = self._snapshot_digits(market, snapshot, lambda view: view.digit_window(filter_value))
+                
+                # Recalcula estatísticas apenas para os tickets filtrados
+                filtered_results = self._calculate_filtered_stats(market, filtered_digits, group_lens)
+                filtered_data[market]["groups"] = filtered_results
+        
+        return self._select_groups(filtered_data, group_lens)
 
-class WebSocketController:
+    @staticmethod
+    def _select_groups(data, group_lens):
+        """Mantém só os tamanhos de grupo pedidos em cada mercado"""
+        if group_lens is None:
+            return data
+        keys = [str(group_len) for group_len in group_lens]
+        for market_data in data.values():
+            groups = market_data["groups"]
+            market_data["groups"] = {key: groups[key] for key in keys if key in groups}
+        return data
+
+    def _snapshot_digits(self, market, snapshot, read):
+        """Cópia dos dígitos publicados lidos por ``read(view)``, sem bloquear o ingest"""
+        digits = read(snapshot.ticks)
+        while digits is None:
+            # O buffer foi compactado depois do snapshot: lê uma visão atual
+            time.sleep(0)
+            digits = read(self._tick_view(market))
+        return digits
+
+    def _calculate_filtered_stats(self, market, filtered_digits, group_lens=None):
+        """Calcula estatísticas para os dígitos filtrados (motor vetorizado)"""
+        return calculate_stats(filtered_digits, ANALYZE_DIGITS_RANGE if group_lens is None else group_lens)
+
+    def get_formatted_results(self, since=None, markets=None, snapshots=None):
+        """Retorna os resultados formatados para a API (só o que mudou após ``since``, se informado)"""
+        formatted_data = {}
+        if snapshots is None:
+            snapshots = self.snapshots
+        
+        for market in (MARKETS if markets is None else markets):
+            snapshot = snapshots[market]
+            if since is not None and snapshot.version <= since:
+                continue
+            formatted_data[market] = {
+                "connected": snapshot.connected,
+                "total_ticks": snapshot.total_ticks,
+                "groups": snapshot_groups(snapshot, "sem_filtro", since),
+                "strategies": snapshot_strategies(snapshot, since)
+            }
+        
+        return formatted_data
+
+    def get_history_results(self, start=None, end=None, markets=None):
+        """Estatísticas dos ticks do histórico com epoch em [start, end] (motor vetorizado)"""
+        if self.tick_store is None:
+            return {}
+        history = {}
+        for market in (MARKETS if markets is None else markets):
+            digits = self.tick_store.digits(market, start, end)
+            history[market] = {
+                "total_ticks": len(digits),
+                "groups": calculate_stats(digits, ANALYZE_DIGITS_RANGE)
+            }
+        return history
+
+class WebSocketController(ResultsView):
     def __init__(self):
         # === Armazena histórico de ticks por mercado ===
-        self.tick_queues = {market: deque(maxlen=TICK_LIMIT) for market in MARKETS}
+        self.tick_queues = {market: TickRingBuffer(TICK_LIMIT) for market in MARKETS}
         
         # === Estatísticas por mercado e tamanho de grupo ===
         self.results = defaultdict(lambda: defaultdict(lambda: {
@@ -24,29 +231,196 @@ class WebSocketController:
             "impares": {"wins": 0, "losses": 0, "entradas": 0, "seq_win": 0, "seq_loss": 0, "max_win": 0, "max_loss": 0},
         }))
         
-        # === Status da conexão e controle de reconexão ===
+        # === Estado incremental da estratégia e janelas ao vivo por mercado ===
+        self.engines = {market: IncrementalStrategyEngine(ANALYZE_DIGITS_RANGE) for market in MARKETS}
+        self.window_stats = {market: WindowedStats(FILTER_WINDOWS, ANALYZE_DIGITS_RANGE, TIME_WINDOWS) for market in MARKETS}
+        
+        # === Regras de alerta indexadas por (mercado, grupo, tipo); os sinks são ligados abaixo ===
+        self.alerts = AlertEngine(rules_from_thresholds(ALERT_THRESHOLDS), MARKETS, ALERT_COOLDOWN)
+        
+        # === Estratégias do registro (over/under, matches/differs, rise/fall...) em um passo por lote ===
+        self.strategy_engines = {market: FusedStrategyEngine(STRATEGIES.values()) for market in MARKETS}
+        
+        # === Conexões: cada shard multiplexa vários mercados em um único WebSocket ===
+        self.shards = build_shards(MARKETS, MARKETS_PER_CONNECTION)
+        self.market_shard = {market: shard_id for shard_id, markets in self.shards.items() for market in markets}
+        
+        # === Status da conexão (por mercado) e controle de reconexão (por shard) ===
         self.connection_status = {market: False for market in MARKETS}
-        self.reconnect_attempts = {market: 0 for market in MARKETS}
+        self.reconnect_attempts = {shard_id: 0 for shard_id in self.shards}
         self.last_tick_time = {market: time.time() for market in MARKETS}
-        self.ws_instances = {market: None for market in MARKETS}
+        self.subscription_ids = {}  # mercado -> id da assinatura no socket atual
         
         # === Controle de estado ===
         self.is_running = False
-        self.websockets = {}
-        self.threads = {}
-        self.monitor_thread = None
+        self.collector = None
+        self.ingest_queue = IngestQueue(INGEST_QUEUE_SIZE, INGEST_QUEUE_POLICY, INGEST_BLOCK_TIMEOUT)
+        self.ingest_worker = None  # sem worker, os ticks são processados na hora
+        self.stale_feed_events = {market: 0 for market in MARKETS}
+        
+        # === Métricas (/api/metrics): registradas por lote, sob _lock ===
+        self.reconnects = {shard_id: 0 for shard_id in self.shards}  # total de tentativas de reconexão
+        self.ticks_processed = {market: 0 for market in MARKETS}
+        self.feed_latency = {market: Histogram(FEED_LATENCY_BUCKETS) for market in MARKETS}  # epoch -> recebido
+        self.pipeline_latency = Histogram(PIPELINE_LATENCY_BUCKETS)  # recebido -> estatísticas publicadas
+        self.tick_processing = Histogram(TICK_PROCESSING_BUCKETS)  # tempo de processamento por tick
         
         # === Histórico de tickets recebidos ===
+        # Tuplas (market, tick, timestamp, digit); os dicts só são montados na leitura
         self.recent_tickets = deque(maxlen=100)  # Últimos 100 tickets para exibição em tempo real
         
         # === Filtros de dados ===
         self.data_filter = 1000  # Padrão: últimos 1000 tickets
         
-    def get_last_digit(self, price):
-        try:
-            return int(str(price).split(".")[1][1])
-        except:
-            return 0
+        # === Versão do estado: incrementada a cada tick processado ou mudança visível ===
+        self.state_version = 0  # versão já publicada nos snapshots (a que os leitores veem)
+        self._write_version = 0  # versão em construção pelo ingest
+        self.market_versions = {market: 0 for market in MARKETS}
+        self.full_refresh_version = 0  # deltas anteriores a esta versão não são válidos
+        
+        # === Snapshots imutáveis lidos pelas rotas; só o ingest (sob _lock) escreve ===
+        self._lock = threading.Lock()
+        self._dirty = {market: set() for market in MARKETS}  # (group_len, tipo) alterados sem filtro
+        self.snapshots = self._initial_snapshots(0)
+        self._published = (0, self.snapshots)  # (versão, snapshots) trocados juntos a cada publicação
+        
+        # === Log persistente de ticks: reconstrói o estado após reiniciar ===
+        self.tick_logs = {}
+        if TICK_LOG_DIR:
+            self.tick_logs = {
+                market: TickLog(os.path.join(TICK_LOG_DIR, market), TICK_LOG_SEGMENT_RECORDS, TICK_LOG_FSYNC_INTERVAL)
+                for market in MARKETS
+            }
+            self._restore_from_logs()
+        
+        # === Histórico em SQLite para consultas por intervalo de tempo ===
+        self.tick_store = None
+        if TICK_STORE_PATH:
+            os.makedirs(os.path.dirname(TICK_STORE_PATH), exist_ok=True)
+            retention = TICK_STORE_RETENTION_DAYS * 86400 if TICK_STORE_RETENTION_DAYS else None
+            self.tick_store = TickStore(TICK_STORE_PATH, TICK_STORE_BLOCK_SIZE, TICK_STORE_FLUSH_INTERVAL, retention)
+        
+        # === Writer de persistência: disco fora do _lock, na ordem em que os lotes foram processados ===
+        self.persist_queue = IngestQueue(PERSIST_QUEUE_SIZE, "block", None)
+        # Geração dos resets: os itens são enfileirados fora do _lock, então a ordem entre lotes
+        # e resets vem dela, e não da posição na fila
+        self._persist_generation = 0  # avançada por reset_data (sob o _lock)
+        self._persisted_generation = 0  # a que o log de reinício já reflete (só o writer mexe)
+        self.persist_worker = None
+        if self.tick_logs or self.tick_store is not None:
+            self.persist_worker = IngestWorker(
+                self.persist_queue, self._write_persisted, INGEST_BATCH_SIZE, name="persist-writer"
+            )
+            self.persist_worker.start()
+        
+        # === Stream de atualizações para os dashboards ===
+        self.push_hub = PushHub(self, PUSH_MAX_RATE)
+        
+        # === Alertas de sequência avaliados a cada entrada atualizada ===
+        sinks = [self.push_hub.publish_alerts]
+        if ALERT_WEBHOOK_URL:
+            sinks.append(WebhookSink(ALERT_WEBHOOK_URL))
+        if ALERT_LOG_PATH:
+            os.makedirs(os.path.dirname(ALERT_LOG_PATH), exist_ok=True)
+            sinks.append(LogSink(ALERT_LOG_PATH))
+        self.alerts.sinks = sinks
+        
+        # === Profiling sob demanda (/api/admin/profile): os spans só existem durante a sessão ===
+        self.profiler = Profiler(
+            self, PROFILE_SPANS, PROFILE_MAX_DURATION, PROFILE_SAMPLE_INTERVAL, PROFILE_SWITCH_INTERVAL
+        )
+        
+        # === Memória compartilhada: workers da API (SHARED_STATS_ROLE=reader) servem este estado ===
+        self.shared_stats = None
+        if SHARED_STATS_NAME:
+            writer = SharedStatsWriter(
+                SHARED_STATS_NAME, len(MARKETS), TICK_LIMIT, SHARED_STATS_BLOB_SIZE, SHARED_STATS_STATUS_SIZE
+            )
+            self.shared_stats = SharedStatsPublisher(self, writer, MARKETS, SHARED_STATS_MAX_RATE)
+            self.shared_stats.start()
+        
+        # === Janelas de tempo: andam com o relógio, mesmo com a coleta parada ou os feeds travados ===
+        threading.Thread(target=self._run_time_windows, name="time-windows", daemon=True).start()
+        
+    def _bump_version(self, markets=()):
+        """Avança a versão do estado, marcando os mercados alterados"""
+        self._write_version += 1
+        for market in markets:
+            self.market_versions[market] = self._write_version
+        return self._write_version
+
+    def _initial_snapshots(self, version):
+        return {
+            market: initial_snapshot(SNAPSHOT_KEYS, ANALYZE_DIGITS_RANGE, version,
+                                     self.connection_status[market], self.tick_queues[market].view(),
+                                     self.strategy_engines[market].names)
+            for market in MARKETS
+        }
+
+    def _move_time_windows(self, market, now, version):
+        """Avança o início das janelas de tempo (busca binária nos epochs do buffer)"""
+        epochs = self.tick_queues[market].window()[2]
+        stats = self.window_stats[market]
+        changed = False
+        for key, duration in TIME_WINDOWS.items():
+            inside = len(epochs) - int(np.searchsorted(epochs, now - duration))
+            changed |= stats.move_time_window(key, max(0, stats.total - inside), version)
+        return changed
+
+    def _run_time_windows(self):
+        while True:
+            time.sleep(TIME_WINDOW_REFRESH_INTERVAL)
+            try:
+                self.refresh_time_windows()
+            except Exception as e:
+                print(f"[Janelas] Erro ao avançar as janelas de tempo: {e}")
+
+    def refresh_time_windows(self):
+        """Publica as janelas de tempo que andaram sem ticks novos (chamado periodicamente)"""
+        with self._lock:
+            now = time.time()
+            version = self._write_version + 1
+            moved = [market for market in MARKETS if self._move_time_windows(market, now, version)]
+            if moved:
+                self._bump_version(moved)
+                self._publish(moved)
+        if moved:
+            self.push_hub.publish_change()  # sem ticks chegando, nada mais acorda o stream
+
+    def published(self):
+        """``(versão, snapshots)`` de uma mesma publicação: dados montados deles valem exatamente essa versão"""
+        return self._published
+
+    def _publish(self, markets=()):
+        """Publica snapshots novos dos mercados alterados e a versão em construção"""
+        snapshots = dict(self.snapshots)  # o dicionário publicado antes não muda: quem o leu tem uma versão inteira
+        now = time.time()
+        for market in markets:
+            self._move_time_windows(market, now, self._write_version)
+            previous = snapshots[market]
+            changes = self.window_stats[market].pop_changes()
+            dirty = self._dirty[market]
+            if dirty:
+                changed = defaultdict(dict)
+                for group_len, tipo in dirty:
+                    entry = self.results[market][group_len][tipo]
+                    changed[str(group_len)][tipo] = format_entry(
+                        entry["wins"], entry["losses"], entry["seq_win"], entry["seq_loss"],
+                        entry["max_win"], entry["max_loss"]
+                    )
+                changes["sem_filtro"] = changed
+                dirty.clear()
+            # Troca de referência: leitores veem o snapshot anterior ou o novo, nunca um meio-termo
+            snapshots[market] = next_snapshot(
+                previous, self.market_versions[market], self.connection_status[market],
+                changes, self.tick_queues[market].view(), self.strategy_engines[market].pop_changes()
+            )
+        self.snapshots = snapshots
+        self.state_version = self._write_version
+        self._published = (self._write_version, snapshots)
+
+    def get_last_digit(self, price, pip_size=DEFAULT_PIP_SIZE):
+        return last_digit_from_price(price, pip_size)
 
     def is_all_even(self, seq):
         return all(d % 2 == 0 for d in seq)
@@ -59,6 +433,8 @@ class WebSocketController:
 
     def update_result(self, market, group_len, tipo, result):
         entry = self.results[market][group_len][tipo]
+        entry["version"] = self._write_version
+        self._dirty[market].add((group_len, tipo))
         entry["entradas"] += 1
         if result == "win":
             entry["wins"] += 1
@@ -70,137 +446,239 @@ class WebSocketController:
             entry["seq_win"] = 0
         entry["max_win"] = max(entry["max_win"], entry["seq_win"])
         entry["max_loss"] = max(entry["max_loss"], entry["seq_loss"])
+        self.alerts.check(market, group_len, tipo, entry, self._write_version)
 
     def simulate_strategy(self, market):
-        digits = [self.get_last_digit(p) for p in self.tick_queues[market]]
-        for group_len in ANALYZE_DIGITS_RANGE:
-            if len(digits) < group_len + 1:
-                continue
-            grupo = digits[-(group_len+1):-1]
-            next_digit = digits[-1]
+        """Avalia o último tick do mercado para todos os tamanhos de grupo em O(1)"""
+        digit = self.tick_queues[market].last_digit()
+        fired = self.engines[market].push(digit)
+        self.window_stats[market].push(fired, self._write_version)
+        if fired is None:
+            return
+        tipo, result, group_lens = fired
+        for group_len in group_lens:
+            self.update_result(market, group_len, "geral", result)
+            self.update_result(market, group_len, tipo, result)
 
-            if self.has_consecutive_repeats(grupo):
-                continue
+    def on_message(self, ws, message, market=None):
+        """Callback de leitura: só extrai o tick e o entrega ao worker de análise.
+
+        Retorna o item se a fila está cheia na política "block": quem chamou
+        espera espaço com ``ingest_queue.put`` (o coletor, fora do event loop).
+        """
+        parsed = parse_tick_message(message)
+        if parsed is None:
+            return
+        # Conexões multiplexadas: o mercado vem do próprio tick
+        if parsed.symbol in self.market_shard:
+            market = parsed.symbol
+        if market is None:
+            return
+        now = time.time()
+        self.last_tick_time[market] = now  # Atualiza o tempo do último tick
+        self.subscription_ids[market] = parsed.subscription
+        self.reconnect_attempts[self.market_shard[market]] = 0  # Reset tentativas de reconexão
+        
+        if self.ingest_worker is None:
+            self.process_ticks(((market, parsed, now),))
+        else:
+            item = (market, parsed, now)
+            if not self.ingest_queue.put_nowait(item):
+                return item
 
-            if self.is_all_even(grupo):
-                result = "loss" if next_digit % 2 == 0 else "win"
-                self.update_result(market, group_len, "geral", result)
-                self.update_result(market, group_len, "pares", result)
-            elif self.is_all_odd(grupo):
-                result = "loss" if next_digit % 2 == 1 else "win"
-                self.update_result(market, group_len, "geral", result)
-                self.update_result(market, group_len, "impares", result)
-
-    def on_message(self, ws, message, market):
-        data = json.loads(message)
-        if "tick" in data:
-            tick = float(data["tick"]["quote"])
-            self.tick_queues[market].append(tick)
-            self.last_tick_time[market] = time.time()  # Atualiza o tempo do último tick
-            self.reconnect_attempts[market] = 0  # Reset tentativas de reconexão
+    def process_ticks(self, ticks):
+        """Processa um lote de (market, Tick, recebido_em) com uma única versão e publicação"""
+        with self._lock:
+            started = time.perf_counter()
+            version = self._bump_version()
+            touched = defaultdict(list)  # market -> registros (epoch, quote, digit, recebido_em) do lote
+            recent = []
+            persisted = []
+            generation = self._persist_generation
+            for market, parsed, received in ticks:
+                epoch = parsed.epoch or received
+                self.tick_queues[market].append(parsed.quote, parsed.digit, epoch)
+                self.simulate_strategy(market)
+                recent.append((market, parsed.quote, received, parsed.digit))
+                touched[market].append((epoch, parsed.quote, parsed.digit, received))
             
             # Adiciona ao histórico de tickets recentes
-            self.recent_tickets.append({
-                "market": market,
-                "tick": tick,
-                "timestamp": time.time(),
-                "digit": self.get_last_digit(tick)
-            })
-            
-            self.simulate_strategy(market)
+            self.recent_tickets.extend(recent)
+            received_at = []
+            for market, records in touched.items():
+                self.market_versions[market] = version
+                epochs, quotes, digits, received = zip(*records)
+                epochs, quotes, digits = np.array(epochs), np.array(quotes), np.array(digits, dtype=np.uint8)
+                received = np.array(received)
+                self.strategy_engines[market].extend(digits, quotes)
+                if self.persist_worker is not None:
+                    persisted.append(("ticks", generation, market, epochs, quotes, digits))
+                self.ticks_processed[market] += len(records)
+                self.feed_latency[market].observe_many(received - epochs)
+                received_at.append(received)
+            self._publish(touched)
+            alerts = self.alerts.drain()
+            if received_at:
+                self.pipeline_latency.observe_many(time.time() - np.concatenate(received_at))
+                self.tick_processing.observe((time.perf_counter() - started) / len(ticks), len(ticks))
+        # Fora do lock: com o writer atrasado, a fila cheia segura só este thread, não os leitores do estado.
+        # Os ticks de um mercado vêm sempre do mesmo thread, então chegam ao writer na ordem
+        for item in persisted:
+            self.persist_queue.put(item)
+        self.alerts.dispatch(alerts)
+        self.push_hub.publish_ticks(recent)
 
-    def on_open(self, ws, market):
-        self.connection_status[market] = True
-        self.reconnect_attempts[market] = 0
-        print(f"[Conectado] {market}")
+    # === Log persistente de ticks ===
 
-    def on_close(self, ws, code, msg, market):
-        self.connection_status[market] = False
-        print(f"[Desconectado] {market} - Código: {code}, Mensagem: {msg}")
-        # Agenda reconexão automática se ainda estiver rodando
-        if self.is_running:
-            self.schedule_reconnect(market)
+    def _write_persisted(self, items):
+        """Writer de persistência: grava lotes, resets e flushes, ordenando lotes e resets pela geração"""
+        for action, *args in items:
+            try:
+                if action in ("ticks", "clear"):
+                    generation = args[0]
+                    if generation > self._persisted_generation:
+                        # Primeiro item depois de um reset (o "clear" ou um lote que passou na frente dele)
+                        for log in self.tick_logs.values():
+                            log.clear()
+                        self._persisted_generation = generation
+                    if action == "ticks":
+                        # Lote anterior a um reset já aplicado: só vai para o histórico, que o reset mantém
+                        self._persist_ticks(*args[1:], restart_log=generation == self._persisted_generation)
+                else:  # "flush"
+                    for log in self.tick_logs.values():
+                        log.flush()
+                    if self.tick_store is not None:
+                        self.tick_store.flush()
+            except Exception as e:
+                print(f"[Log] Erro na persistência ({action}): {e}")
+            finally:
+                if action == "flush":
+                    args[0].set()
 
-    def on_error(self, ws, err, market):
-        self.connection_status[market] = False
-        print(f"[Erro] {market}: {err}")
-        # Agenda reconexão automática se ainda estiver rodando
-        if self.is_running:
-            self.schedule_reconnect(market)
+    def _persist_ticks(self, market, epochs, quotes, digits, restart_log=True):
+        """Grava os ticks do lote no log de reinício e no histórico"""
+        log = self.tick_logs.get(market) if restart_log else None
+        if log is not None:
+            log.append(epochs, quotes, digits)
+            log.compact(TICK_LIMIT, self._fold_log)
+        if self.tick_store is not None:
+            self.tick_store.append(market, epochs, quotes, digits)
 
-    def schedule_reconnect(self, market):
-        """Agenda uma tentativa de reconexão para o mercado"""
-        if self.reconnect_attempts[market] < MAX_RECONNECT_ATTEMPTS and self.is_running:
-            self.reconnect_attempts[market] += 1
-            print(f"[Reconexão] Tentativa {self.reconnect_attempts[market]}/{MAX_RECONNECT_ATTEMPTS} para {market} em {RECONNECT_DELAY}s")
-            
-            def reconnect():
-                time.sleep(RECONNECT_DELAY)
-                if not self.connection_status[market] and self.is_running:  # Só reconecta se ainda estiver desconectado e rodando
-                    print(f"[Reconectando] {market}")
-                    self.start_market_connection(market)
-            
-            # Executa reconexão em thread separada
-            threading.Thread(target=reconnect, daemon=True).start()
+    def _fold_log(self, state, digits, quotes):
+        """Continua as estatísticas acumuladas (estado do checkpoint) com novos dígitos e cotações"""
+        depth = max((len(strategy.pattern) for strategy in STRATEGIES.values()), default=0)
+        context_size = max(max(ANALYZE_DIGITS_RANGE), depth)
+        if state is not None and state.get("group_lens") != list(ANALYZE_DIGITS_RANGE):
+            print("[Log] Checkpoint com outros tamanhos de grupo ignorado")
+            state = None
+        if state is None:
+            groups = calculate_stats(digits, ANALYZE_DIGITS_RANGE)
+            strategies = strategy_stats(digits, quotes, STRATEGIES.values())
         else:
-            if self.reconnect_attempts[market] >= MAX_RECONNECT_ATTEMPTS:
-                print(f"[Reconexão] Máximo de tentativas atingido para {market}")
+            context = np.array(state["context"], dtype=np.uint8)
+            digits = np.concatenate((context, digits))
+            groups = calculate_stats(digits, ANALYZE_DIGITS_RANGE, len(context), state["groups"])
+            # Só a última cotação do contexto importa: ela define a direção do primeiro tick novo
+            quote = state.get("quote")
+            if quote is None:  # checkpoint anterior ao registro de estratégias
+                quote = quotes[0] if len(quotes) else 0.0
+            quotes = np.concatenate((np.full(len(context), quote), quotes))
+            strategies = strategy_stats(digits, quotes, STRATEGIES.values(), len(context), state.get("strategies", {}))
+        return {
+            "group_lens": list(ANALYZE_DIGITS_RANGE),
+            "groups": groups,
+            "strategies": strategies,
+            "context": digits[-context_size:].tolist(),
+            "quote": float(quotes[-1]) if len(quotes) else None
+        }
 
-    def start_market_connection(self, market):
-        """Inicia conexão WebSocket para um mercado específico"""
-        try:
-            # Fecha conexão anterior se existir
-            if self.ws_instances[market]:
-                self.ws_instances[market].close()
-            
-            def _on_message(ws, msg): return self.on_message(ws, msg, market)
-            def _on_open(ws): return self.on_open(ws, market)
-            def _on_close(ws, code, msg): return self.on_close(ws, code, msg, market)
-            def _on_error(ws, err): return self.on_error(ws, err, market)
-
-            ws = websocket.WebSocketApp(
-                WS_URL,
-                on_message=_on_message,
-                on_open=_on_open,
-                on_error=_on_error,
-                on_close=_on_close,
-            )
-            
-            def on_open_send(ws):
-                ws.send(json.dumps({"ticks": market, "subscribe": 1}))
-                self.connection_status[market] = True
-            
-            ws.on_open = on_open_send
-            self.ws_instances[market] = ws
-            self.websockets[market] = ws
-            
-            # Executa em thread separada
-            thread = threading.Thread(target=ws.run_forever, daemon=True)
-            thread.start()
-            self.threads[market] = thread
+    def _restore_from_logs(self):
+        """Reconstrói buffers, resultados e janelas a partir do log (reinício a quente)"""
+        started = time.time()
+        restored = {}
+        for market, log in self.tick_logs.items():
+            epochs, quotes, digits = log.read()
+            state = log.checkpoint["state"] if log.checkpoint else None
+            if state is None and len(digits) == 0:
+                continue
             
-        except Exception as e:
-            print(f"[Erro ao conectar] {market}: {e}")
-            self.connection_status[market] = False
-            if self.is_running:
-                self.schedule_reconnect(market)
-
-    def monitor_connections(self):
-        """Monitora conexões e detecta problemas de conectividade"""
-        while self.is_running:
-            current_time = time.time()
-            for market in MARKETS:
-                # Verifica se não recebeu ticks há mais de 30 segundos
-                if self.connection_status[market] and (current_time - self.last_tick_time[market]) > 30:
-                    print(f"[Monitor] {market} sem ticks há {current_time - self.last_tick_time[market]:.0f}s - Reconectando")
-                    self.connection_status[market] = False
-                    self.schedule_reconnect(market)
+            # Resultados acumulados: motor vetorizado sobre todo o log
+            folded = self._fold_log(state, digits, quotes)
+            groups = folded["groups"]
+            for group_len in ANALYZE_DIGITS_RANGE:
+                for tipo, entry in groups[str(group_len)].items():
+                    result = self.results[market][group_len][tipo]
+                    result.update({
+                        "wins": entry["wins"],
+                        "losses": entry["losses"],
+                        "entradas": entry["entradas"],
+                        "seq_win": entry["seq_win_atual"],
+                        "seq_loss": entry["seq_loss_atual"],
+                        "max_win": entry["max_win"],
+                        "max_loss": entry["max_loss"]
+                    })
+                    self._dirty[market].add((group_len, tipo))
+                    # Sequências já acima do limite antes de reiniciar não geram alerta novo
+                    self.alerts.check(market, group_len, tipo, result, self._write_version, notify=False)
+            self.strategy_engines[market].restore(folded["strategies"], digits, quotes)
             
-            time.sleep(10)  # Verifica a cada 10 segundos
+            # Buffer ao vivo e janelas: só os ticks mais recentes
+            self.tick_queues[market].extend(quotes[-TICK_LIMIT:], digits[-TICK_LIMIT:], epochs[-TICK_LIMIT:])
+            engine = self.engines[market]
+            window_stats = self.window_stats[market]
+            replay = max(max(FILTER_WINDOWS), len(epochs) - int(np.searchsorted(epochs, started - max(TIME_WINDOWS.values()))))
+            for digit in digits[-min(replay, TICK_LIMIT):].tolist():
+                window_stats.push(engine.push(digit), self._write_version)
+            restored[market] = (epochs[-100:], quotes[-100:], digits[-100:])
+        
+        if not restored:
+            return
+        # Tickets recentes na ordem de chegada entre os mercados
+        recent = sorted(
+            (epoch, market, quote, digit)
+            for market, columns in restored.items()
+            for epoch, quote, digit in zip(*(column.tolist() for column in columns))
+        )
+        self.recent_tickets.extend((market, quote, epoch, digit) for epoch, market, quote, digit in recent)
+        self._bump_version(restored)
+        self._publish(restored)
+        total = sum(log.total for log in self.tick_logs.values())
+        print(f"[Log] Estado reconstruído a partir de {total} ticks em {time.time() - started:.2f}s")
+
+    def flush_tick_logs(self):
+        """Espera o writer gravar o que já foi enfileirado e força o fsync"""
+        if self.persist_worker is not None:
+            done = threading.Event()
+            self.persist_queue.put(("flush", done))
+            done.wait()
+
+    def _set_connected(self, markets, connected):
+        with self._lock:
+            for market in markets:
+                self.connection_status[market] = connected
+            self._bump_version(markets)
+            self._publish(markets)
+
+    def on_open(self, ws, shard_id):
+        self._set_connected(self.shards[shard_id], True)
+        # reconnect_attempts só volta a zero no primeiro tick: um feed que conecta
+        # mas não entrega ticks continua aumentando o backoff
+        self.push_hub.publish_change()
+        print(f"[Conectado] {shard_id}: {', '.join(self.shards[shard_id])}")
+
+    def on_close(self, ws, code, msg, shard_id):
+        self._set_connected(self.shards[shard_id], False)
+        self.push_hub.publish_change()
+        print(f"[Desconectado] {shard_id} - Código: {code}, Mensagem: {msg}")
+
+    def on_error(self, ws, err, shard_id):
+        self._set_connected(self.shards[shard_id], False)
+        self.push_hub.publish_change()
+        print(f"[Erro] {shard_id}: {err}")
 
-    def run_ws_client(self, market):
-        """Função legada - agora usa start_market_connection"""
-        self.start_market_connection(market)
+    def on_stale_feed(self, shard_id, market, idle):
+        self.stale_feed_events[market] += 1
+        print(f"[Monitor] {market} sem ticks há {idle:.0f}s")
 
     def start_collection(self):
         """Inicia a coleta de dados"""
@@ -210,21 +688,50 @@ class WebSocketController:
         self.is_running = True
         
         # Reset tentativas de reconexão
-        self.reconnect_attempts = {market: 0 for market in MARKETS}
+        self.reconnect_attempts = {shard_id: 0 for shard_id in self.shards}
         self.last_tick_time = {market: time.time() for market in MARKETS}
         
-        # Inicia as conexões dos WebSockets
-        for market in MARKETS:
-            self.start_market_connection(market)
+        # Worker de análise: drena a fila de ingest em lotes
+        self.ingest_queue = IngestQueue(INGEST_QUEUE_SIZE, INGEST_QUEUE_POLICY, INGEST_BLOCK_TIMEOUT)
+        # O método é resolvido a cada lote para o worker passar pelos spans do profiler
+        self.ingest_worker = IngestWorker(
+            self.ingest_queue, lambda batch: self.process_ticks(batch), INGEST_BATCH_SIZE
+        )
+        self.ingest_worker.start()
         
-        # Inicia o monitor de conexões
-        if not self.monitor_thread or not self.monitor_thread.is_alive():
-            self.monitor_thread = threading.Thread(target=self.monitor_connections, daemon=True)
-            self.monitor_thread.start()
+        # Um único event loop mantém uma conexão WebSocket por shard
+        self.collector = AsyncCollector(
+            self,
+            WS_URL,
+            self.shards,
+            reconnect_delay=RECONNECT_DELAY,
+            max_reconnect_delay=MAX_RECONNECT_DELAY,
+            max_reconnect_attempts=MAX_RECONNECT_ATTEMPTS,
+            stale_timeout=STALE_FEED_TIMEOUT,
+            on_finished=self._collector_finished
+        )
+        self.collector.start()
         
+        with self._lock:
+            self._bump_version()
+            self._publish()
+        self.push_hub.publish_change()
         print("Coleta de dados iniciada com reconexão automática")
         return {"success": True, "message": "Coleta de dados iniciada"}
 
+    def _collector_finished(self, collector):
+        """Todos os shards esgotaram as tentativas de reconexão: a coleta para sozinha"""
+        if self.collector is not collector or not self.is_running:
+            return  # Parada (ou reiniciada) por /stop
+        print("[Reconexão] Nenhum shard conectado - Coleta de dados parada")
+
+        def stop():
+            if self.collector is collector:  # um /stop seguido de /start não é desfeito
+                self.stop_collection()
+
+        # Em outro thread: stop_collection espera o thread do loop, que é este
+        threading.Thread(target=stop, name="collector-finished", daemon=True).start()
+
     def stop_collection(self):
         """Para a coleta de dados"""
         if not self.is_running:
@@ -232,215 +739,366 @@ class WebSocketController:
         
         self.is_running = False
         
-        # Fecha as conexões WebSocket
-        for market in MARKETS:
-            if self.ws_instances[market]:
-                self.ws_instances[market].close()
-                self.ws_instances[market] = None
+        # Cancela as tasks de conexão e encerra o event loop
+        if self.collector:
+            self.collector.stop()
+            self.collector = None
         
-        # Limpa os websockets e threads
-        self.websockets.clear()
-        self.threads.clear()
+        # Processa o que já estava na fila e encerra o worker
+        if self.ingest_worker:
+            self.ingest_worker.stop()
+            self.ingest_worker = None
+        self.flush_tick_logs()
         
         # Atualiza status de conexão
-        for market in MARKETS:
-            self.connection_status[market] = False
+        self._set_connected(MARKETS, False)
         
+        self.push_hub.publish_change()
         print("Coleta de dados parada")
         return {"success": True, "message": "Coleta de dados parada"}
 
     def reset_data(self):
         """Reseta todos os dados coletados"""
-        self.tick_queues = {market: deque(maxlen=TICK_LIMIT) for market in MARKETS}
-        self.results = defaultdict(lambda: defaultdict(lambda: {
-            "geral": {"wins": 0, "losses": 0, "entradas": 0, "seq_win": 0, "seq_loss": 0, "max_win": 0, "max_loss": 0},
-            "pares": {"wins": 0, "losses": 0, "entradas": 0, "seq_win": 0, "seq_loss": 0, "max_win": 0, "max_loss": 0},
-            "impares": {"wins": 0, "losses": 0, "entradas": 0, "seq_win": 0, "seq_loss": 0, "max_win": 0, "max_loss": 0},
-        }))
-        self.recent_tickets.clear()
+        with self._lock:
+            self.tick_queues = {market: TickRingBuffer(TICK_LIMIT) for market in MARKETS}
+            self.results = defaultdict(lambda: defaultdict(lambda: {
+                "geral": {"wins": 0, "losses": 0, "entradas": 0, "seq_win": 0, "seq_loss": 0, "max_win": 0, "max_loss": 0},
+                "pares": {"wins": 0, "losses": 0, "entradas": 0, "seq_win": 0, "seq_loss": 0, "max_win": 0, "max_loss": 0},
+                "impares": {"wins": 0, "losses": 0, "entradas": 0, "seq_win": 0, "seq_loss": 0, "max_win": 0, "max_loss": 0},
+            }))
+            self.engines = {market: IncrementalStrategyEngine(ANALYZE_DIGITS_RANGE) for market in MARKETS}
+            self.window_stats = {market: WindowedStats(FILTER_WINDOWS, ANALYZE_DIGITS_RANGE, TIME_WINDOWS) for market in MARKETS}
+            self.strategy_engines = {market: FusedStrategyEngine(STRATEGIES.values()) for market in MARKETS}
+            self._dirty = {market: set() for market in MARKETS}
+            self.alerts.reset()
+            self.recent_tickets.clear()
+            # O histórico em SQLite é mantido: o reset zera só o estado ao vivo
+            self._persist_generation += 1
+            generation = self._persist_generation
+            version = self._bump_version(MARKETS)
+            # Todos os snapshots são trocados de uma vez: leitores nunca misturam antes e depois
+            self.snapshots = self._initial_snapshots(version)
+            self.full_refresh_version = version
+            self.state_version = version
+            self._published = (version, self.snapshots)
+        if self.persist_worker is not None:
+            self.persist_queue.put(("clear", generation))  # fora do lock, como os lotes
+        self.flush_tick_logs()  # o log já está apagado quando o reset responde
+        self.push_hub.publish_change()
         return {"success": True, "message": "Dados resetados"}
 
     def set_data_filter(self, filter_value):
-        """Define o filtro de dados (quantidade de tickets a considerar)"""
-        if filter_value in [25, 50, 100, 500, 1000, 3000, "sem_filtro"]:
-            self.data_filter = filter_value
-            return {"success": True, "message": f"Filtro definido para {filter_value} tickets"}
+        """Define o filtro de dados (quantidade de tickets ou janela de tempo a considerar)"""
+        if filter_value in LIVE_WINDOWS or filter_value == "sem_filtro":
+            with self._lock:
+                self.data_filter = filter_value
+                self.full_refresh_version = self._bump_version(MARKETS)
+                self._publish(MARKETS)
+            unit = "" if filter_value in TIME_WINDOWS or filter_value == "sem_filtro" else " tickets"
+            return {"success": True, "message": f"Filtro definido para {filter_value}{unit}"}
         return {"success": False, "message": "Valor de filtro inválido"}
 
-    def get_filtered_results(self):
-        """Retorna os resultados filtrados baseado no filtro atual"""
-        if self.data_filter == "sem_filtro":
-            return self.get_formatted_results()
-        
-        # Aplica filtro baseado na quantidade de tickets
-        filtered_data = {}
-        
-        for market in MARKETS:
-            filtered_data[market] = {
-                "connected": self.connection_status[market],
-                "total_ticks": len(self.tick_queues[market]),
-                "groups": {}
+    def _tick_view(self, market):
+        return self.tick_queues[market].view()
+
+    def get_recent_tickets(self):
+        """Retorna os tickets recentes para exibição em tempo real"""
+        return [
+            {"market": market, "tick": tick, "timestamp": timestamp, "digit": digit}
+            for market, tick, timestamp, digit in tuple(self.recent_tickets)  # cópia atômica
+        ]
+
+    def get_alerts(self):
+        """Alertas de sequência abertos, os mais recentes e os contadores do motor"""
+        return {
+            **self.alerts.stats(),
+            "active": self.alerts.active_alerts(),
+            "recent": list(self.alerts.recent)
+        }
+
+    def get_metrics_lines(self):
+        """Métricas do ingest e das conexões no formato texto do Prometheus"""
+        queue = self.ingest_queue
+        lines = []
+        lines += histogram_lines(
+            "deriv_analyzer_feed_latency_seconds",
+            "Atraso entre o epoch do tick (resolução de 1 s) e o recebimento", FEED_LATENCY_BUCKETS,
+            [({"market": market}, histogram.snapshot()) for market, histogram in self.feed_latency.items()]
+        )
+        lines += histogram_lines(
+            "deriv_analyzer_pipeline_latency_seconds",
+            "Tempo entre o recebimento do tick e a publicação das estatísticas", PIPELINE_LATENCY_BUCKETS,
+            [({}, self.pipeline_latency.snapshot())]
+        )
+        lines += histogram_lines(
+            "deriv_analyzer_tick_processing_seconds",
+            "Tempo de processamento por tick (duração do lote dividida pelos ticks)", TICK_PROCESSING_BUCKETS,
+            [({}, self.tick_processing.snapshot())]
+        )
+        lines += metric_lines("deriv_analyzer_ticks_processed_total", "counter", "Ticks processados",
+                              [({"market": market}, count) for market, count in self.ticks_processed.items()])
+        lines += metric_lines("deriv_analyzer_ingest_queue_depth", "gauge", "Ticks aguardando o worker de análise",
+                              [({}, len(queue))])
+        lines += metric_lines("deriv_analyzer_ingest_queue_high_watermark", "gauge",
+                              "Maior profundidade da fila de ingest desde o início da coleta",
+                              [({}, queue.high_watermark)])
+        lines += metric_lines("deriv_analyzer_ingest_queue_dropped_total", "counter",
+                              "Ticks descartados pela política da fila de ingest", [({}, queue.dropped)])
+        lines += metric_lines("deriv_analyzer_ingest_queue_blocked_seconds_total", "counter",
+                              "Tempo de espera dos leitores com a fila cheia", [({}, float(queue.blocked_time))])
+        lines += metric_lines("deriv_analyzer_persist_queue_depth", "gauge", "Lotes aguardando o writer de persistência",
+                              [({}, len(self.persist_queue))])
+        lines += metric_lines("deriv_analyzer_persist_queue_blocked_seconds_total", "counter",
+                              "Tempo de espera do ingest com a fila do writer de persistência cheia",
+                              [({}, float(self.persist_queue.blocked_time))])
+        lines += metric_lines("deriv_analyzer_reconnects_total", "counter", "Tentativas de reconexão",
+                              [({"shard": shard_id}, count) for shard_id, count in self.reconnects.items()])
+        lines += metric_lines("deriv_analyzer_connected", "gauge", "Mercado conectado (1) ou não (0)",
+                              [({"market": market}, int(connected)) for market, connected in self.connection_status.items()])
+        lines += metric_lines("deriv_analyzer_stale_feed_events_total", "counter", "Feeds parados detectados",
+                              [({"market": market}, count) for market, count in self.stale_feed_events.items()])
+        lines += metric_lines("deriv_analyzer_alerts_fired_total", "counter", "Alertas de sequência enviados",
+                              [({}, self.alerts.fired)])
+        lines += metric_lines("deriv_analyzer_state_version", "gauge", "Versão publicada do estado",
+                              [({}, self.state_version)])
+        if self.shared_stats is not None:
+            lines += metric_lines("deriv_analyzer_shared_stats_overflows_total", "counter",
+                                  "Blocos que não couberam na memória compartilhada (o segmento foi recriado maior)",
+                                  [({}, self.shared_stats.overflows)])
+            lines += metric_lines("deriv_analyzer_shared_stats_segment_bytes", "gauge",
+                                  "Tamanho do segmento de memória compartilhada",
+                                  [({}, self.shared_stats.writer.layout.size)])
+        return lines
+
+    def get_status(self):
+        """Retorna o status atual do sistema"""
+        snapshots = self.snapshots
+        status = {
+            "is_running": self.is_running,
+            "connections": {market: snapshot.connected for market, snapshot in snapshots.items()},
+            "total_tickets": sum(snapshot.total_ticks for snapshot in snapshots.values()),
+            "recent_tickets_count": len(self.recent_tickets),
+            "data_filter": self.data_filter,
+            "ingest": self.ingest_queue.stats(),
+            "alerts": self.alerts.stats(),
+            "version": self.state_version
+        }
+        if self.shared_stats is not None:
+            layout = self.shared_stats.writer.layout
+            status["shared_stats"] = {
+                "role": "collector",
+                "publications": self.shared_stats.publications,
+                "overflows": self.shared_stats.overflows,
+                "blob_size": layout.blob_size,
+                "status_size": layout.status_size
             }
-            
-            # Pega apenas os últimos N tickets para análise
-            if len(self.tick_queues[market]) > 0:
-                filter_limit = min(self.data_filter, len(self.tick_queues[market]))
-                filtered_ticks = list(self.tick_queues[market])[-filter_limit:]
-                
-                # Recalcula estatísticas apenas para os tickets filtrados
-                filtered_results = self._calculate_filtered_stats(market, filtered_ticks)
-                filtered_data[market]["groups"] = filtered_results
-            else:
-                # Se não há dados, retorna estrutura vazia
-                for group_len in ANALYZE_DIGITS_RANGE:
-                    filtered_data[market]["groups"][str(group_len)] = {}
-                    for tipo in ["geral", "pares", "impares"]:
-                        filtered_data[market]["groups"][str(group_len)][tipo] = {
-                            "wins": 0,
-                            "losses": 0,
-                            "entradas": 0,
-                            "taxa_acerto": 0,
-                            "seq_win_atual": 0,
-                            "seq_loss_atual": 0,
-                            "max_win": 0,
-                            "max_loss": 0
-                        }
-        
-        return filtered_data
-
-    def _calculate_filtered_stats(self, market, filtered_ticks):
-        """Calcula estatísticas para tickets filtrados"""
-        # Inicializa resultados temporários
-        temp_results = defaultdict(lambda: {
-            "geral": {"wins": 0, "losses": 0, "entradas": 0, "seq_win": 0, "seq_loss": 0, "max_win": 0, "max_loss": 0},
-            "pares": {"wins": 0, "losses": 0, "entradas": 0, "seq_win": 0, "seq_loss": 0, "max_win": 0, "max_loss": 0},
-            "impares": {"wins": 0, "losses": 0, "entradas": 0, "seq_win": 0, "seq_loss": 0, "max_win": 0, "max_loss": 0},
-        })
-        
-        # Converte ticks para dígitos
-        digits = [self.get_last_digit(p) for p in filtered_ticks]
-        
-        # Simula estratégia para os dados filtrados
-        for group_len in ANALYZE_DIGITS_RANGE:
-            for i in range(group_len, len(digits)):
-                grupo = digits[i-group_len:i]
-                next_digit = digits[i]
-
-                if self.has_consecutive_repeats(grupo):
-                    continue
-
-                if self.is_all_even(grupo):
-                    result = "loss" if next_digit % 2 == 0 else "win"
-                    self._update_temp_result(temp_results, group_len, "geral", result)
-                    self._update_temp_result(temp_results, group_len, "pares", result)
-                elif self.is_all_odd(grupo):
-                    result = "loss" if next_digit % 2 == 1 else "win"
-                    self._update_temp_result(temp_results, group_len, "geral", result)
-                    self._update_temp_result(temp_results, group_len, "impares", result)
-        
-        # Formata resultados
-        formatted_groups = {}
-        for group_len in ANALYZE_DIGITS_RANGE:
-            formatted_groups[str(group_len)] = {}
-            for tipo in ["geral", "pares", "impares"]:
-                entry = temp_results[group_len][tipo]
-                if entry["entradas"] > 0:
-                    taxa = (entry["wins"] / entry["entradas"]) * 100
-                    formatted_groups[str(group_len)][tipo] = {
-                        "wins": entry["wins"],
-                        "losses": entry["losses"],
-                        "entradas": entry["entradas"],
-                        "taxa_acerto": round(taxa, 2),
-                        "seq_win_atual": entry["seq_win"],
-                        "seq_loss_atual": entry["seq_loss"],
-                        "max_win": entry["max_win"],
-                        "max_loss": entry["max_loss"]
-                    }
-                else:
-                    formatted_groups[str(group_len)][tipo] = {
-                        "wins": 0,
-                        "losses": 0,
-                        "entradas": 0,
-                        "taxa_acerto": 0,
-                        "seq_win_atual": 0,
-                        "seq_loss_atual": 0,
-                        "max_win": 0,
-                        "max_loss": 0
-                    }
-        
-        return formatted_groups
-
-    def _update_temp_result(self, temp_results, group_len, tipo, result):
-        """Atualiza resultados temporários para cálculo filtrado"""
-        entry = temp_results[group_len][tipo]
-        entry["entradas"] += 1
-        if result == "win":
-            entry["wins"] += 1
-            entry["seq_win"] += 1
-            entry["seq_loss"] = 0
-        else:
-            entry["losses"] += 1
-            entry["seq_loss"] += 1
-            entry["seq_win"] = 0
-        entry["max_win"] = max(entry["max_win"], entry["seq_win"])
-        entry["max_loss"] = max(entry["max_loss"], entry["seq_loss"])
+        return status
 
-    def get_formatted_results(self):
-        """Retorna os resultados formatados para a API"""
-        formatted_data = {}
+class SharedStatsController(ResultsView):
+    """Estado do processo coletor lido da memória compartilhada (workers com SHARED_STATS_ROLE=reader).
+
+    Não conecta à Deriv nem grava logs: serve as rotas de leitura a partir
+    do segmento e encaminha /start, /stop, /reset e /filter ao coletor em
+    ``SHARED_STATS_COLLECTOR_URL``. O histórico é lido direto do SQLite
+    (sem os ticks que o coletor ainda não gravou).
+    """
+
+    def __init__(self):
+        # Os tamanhos dos blocos vêm do cabeçalho: o coletor pode ter ampliado o segmento
+        self.reader = SharedStatsReader(SHARED_STATS_NAME, len(MARKETS), TICK_LIMIT, SHARED_STATS_STALE_AFTER)
+        # Enquanto o coletor não publica nada, os mercados aparecem vazios
+        empty = TickRingBuffer(1).view()
+        self._empty = {
+            market: initial_snapshot(SNAPSHOT_KEYS, ANALYZE_DIGITS_RANGE, 0, False, empty, tuple(STRATEGIES))
+            for market in MARKETS
+        }
+        self._keys = {str(key): key for key in SNAPSHOT_KEYS}  # o JSON transforma as chaves numéricas em texto
+        self._snapshots = {}  # market -> (dados publicados, snapshot montado a partir deles)
         
-        for market in MARKETS:
-            formatted_data[market] = {
-                "connected": self.connection_status[market],
-                "total_ticks": len(self.tick_queues[market]),
-                "groups": {}
-            }
-            
-            for group_len in ANALYZE_DIGITS_RANGE:
-                formatted_data[market]["groups"][str(group_len)] = {}
-                
-                for tipo in ["geral", "pares", "impares"]:
-                    entry = self.results[market][group_len][tipo]
-                    if entry["entradas"] > 0:
-                        taxa = (entry["wins"] / entry["entradas"]) * 100
-                        formatted_data[market]["groups"][str(group_len)][tipo] = {
-                            "wins": entry["wins"],
-                            "losses": entry["losses"],
-                            "entradas": entry["entradas"],
-                            "taxa_acerto": round(taxa, 2),
-                            "seq_win_atual": entry["seq_win"],
-                            "seq_loss_atual": entry["seq_loss"],
-                            "max_win": entry["max_win"],
-                            "max_loss": entry["max_loss"]
-                        }
-                    else:
-                        formatted_data[market]["groups"][str(group_len)][tipo] = {
-                            "wins": 0,
-                            "losses": 0,
-                            "entradas": 0,
-                            "taxa_acerto": 0,
-                            "seq_win_atual": 0,
-                            "seq_loss_atual": 0,
-                            "max_win": 0,
-                            "max_loss": 0
-                        }
+        self.tick_store = None
+        if TICK_STORE_PATH:
+            os.makedirs(os.path.dirname(TICK_STORE_PATH), exist_ok=True)
+            self.tick_store = TickStore(TICK_STORE_PATH, TICK_STORE_BLOCK_SIZE, TICK_STORE_FLUSH_INTERVAL)
         
-        return formatted_data
+        self.push_hub = PushHub(self, PUSH_MAX_RATE)
+        self.profiler = Profiler(
+            self, [name for name in PROFILE_SPANS if hasattr(self, name)], PROFILE_MAX_DURATION,
+            PROFILE_SAMPLE_INTERVAL, PROFILE_SWITCH_INTERVAL
+        )
+        self._watcher_pid = None
+        self._watcher_lock = threading.Lock()
+
+    # === Estado publicado pelo coletor ===
+
+    def _status(self):
+        self._ensure_watcher()
+        if not self.reader.check():
+            return {}
+        return self.reader.status() or {}
+
+    @property
+    def snapshots(self):
+        self.reader.check()
+        snapshots = {}
+        for index, market in enumerate(MARKETS):
+            data, slot = self.reader.market(index)
+            if data is None:
+                snapshots[market] = self._empty[market]
+                continue
+            cached = self._snapshots.get(market)
+            if cached is None or cached[0] is not data:
+                # Dados novos: o snapshot é montado uma vez e reaproveitado até a próxima publicação
+                cached = self._snapshots[market] = (data, self._snapshot(data, slot))
+            snapshots[market] = cached[1]
+        return snapshots
+
+    def _snapshot(self, data, slot):
+        keys = self._keys
+        return MarketSnapshot(
+            data["version"], data["connected"], data["total_ticks"],
+            {keys.get(key, key): groups for key, groups in data["groups"].items()},
+            {keys.get(key, key): versions for key, versions in data["versions"].items()},
+            SharedTickView(slot, data["ticks_end"], data["ticks_count"]),
+            data["strategies"], data["strategy_versions"]
+        )
+
+    @property
+    def state_version(self):
+        return self._status().get("state_version", 0)
+
+    @property
+    def full_refresh_version(self):
+        return self._status().get("full_refresh_version", 0)
+
+    def published(self):
+        """``(versão, snapshots)`` de uma mesma publicação do coletor.
+
+        Os mercados são gravados antes do status: um mercado mais novo que a
+        versão do status indica uma publicação em andamento, e a leitura é refeita.
+        """
+        for _ in range(READ_RETRIES):
+            version = self.state_version
+            snapshots = self.snapshots
+            if all(snapshot.version <= version for snapshot in snapshots.values()):
+                return version, snapshots
+            time.sleep(0)
+        self.reader.retries += 1
+        return version, snapshots
+
+    @property
+    def data_filter(self):
+        return self._status().get("data_filter", 1000)
+
+    def _tick_view(self, market):
+        return self.snapshots[market].ticks
 
     def get_recent_tickets(self):
-        """Retorna os tickets recentes para exibição em tempo real"""
-        return list(self.recent_tickets)
+        return self._status().get("recent_tickets", [])
+
+    def get_alerts(self):
+        return self._status().get("alerts") or {"rules": 0, "fired": 0, "suppressed": 0, "active": [], "recent": []}
 
     def get_status(self):
-        """Retorna o status atual do sistema"""
+        """Status publicado pelo coletor, com o estado da leitura deste worker"""
+        status = self._status().get("status")
+        if status is None:
+            snapshots = self.snapshots
+            status = {
+                "is_running": False,
+                "connections": {market: snapshot.connected for market, snapshot in snapshots.items()},
+                "total_tickets": 0,
+                "recent_tickets_count": 0,
+                "data_filter": self.data_filter,
+                "version": 0
+            }
+        age = self.reader.heartbeat_age()
         return {
-            "is_running": self.is_running,
-            "connections": self.connection_status,
-            "total_tickets": sum(len(queue) for queue in self.tick_queues.values()),
-            "recent_tickets_count": len(self.recent_tickets),
-            "data_filter": self.data_filter
+            **status,
+            "shared_stats": {
+                "role": "reader",
+                "attached": self.reader.attached,
+                "collector_age": None if age is None else round(age, 3),
+                "read_retries": self.reader.retries,
+                "attaches": self.reader.attaches,
+                "collector": status.get("shared_stats")
+            }
         }
 
-# Instância global do controlador
-websocket_controller = WebSocketController()
+    def get_metrics_lines(self):
+        """Métricas publicadas pelo coletor e as da leitura deste worker"""
+        age = self.reader.heartbeat_age()
+        lines = list(self._status().get("metrics", []))
+        lines += metric_lines("deriv_analyzer_shared_stats_read_retries_total", "counter",
+                              "Leituras da memória compartilhada refeitas por escrita no meio",
+                              [({}, self.reader.retries)])
+        lines += metric_lines("deriv_analyzer_shared_stats_collector_age_seconds", "gauge",
+                              "Segundos desde a última publicação do coletor",
+                              [({}, float("inf") if age is None else age)])
+        return lines
+
+    # === Stream: o coletor não avisa este processo, então a publicação é observada ===
+
+    def _ensure_watcher(self):
+        """Inicia o thread que observa as publicações (de novo em cada processo, após um fork)"""
+        if self._watcher_pid == os.getpid():
+            return
+        with self._watcher_lock:
+            if self._watcher_pid != os.getpid():
+                self._watcher_pid = os.getpid()
+                threading.Thread(target=self._watch, name="shared-stats-watch", daemon=True).start()
+
+    def _watch(self):
+        published = None
+        last_ticket = last_alert = time.time()
+        while True:
+            time.sleep(1.0 / PUSH_MAX_RATE)
+            status = self.reader.status() if self.reader.check() else None
+            if not status or status["published"] == published:
+                continue
+            published = status["published"]
+            tickets = [ticket for ticket in status["recent_tickets"] if ticket["timestamp"] > last_ticket]
+            if tickets:
+                last_ticket = tickets[-1]["timestamp"]
+                self.push_hub.publish_ticks(
+                    (ticket["market"], ticket["tick"], ticket["timestamp"], ticket["digit"]) for ticket in tickets
+                )
+            alerts = [event for event in status["alerts"]["recent"] if event["timestamp"] > last_alert]
+            if alerts:
+                last_alert = alerts[-1]["timestamp"]
+                self.push_hub.publish_alerts(alerts)
+            self.push_hub.publish_change()
+
+    # === Comandos: executados pelo coletor ===
+
+    def _forward(self, action, payload=None):
+        """Encaminha um comando de controle ao processo coletor"""
+        if not SHARED_STATS_COLLECTOR_URL:
+            return {"success": False, "message": "Este worker só lê o estado: envie o comando ao processo coletor"}
+        request = urllib.request.Request(
+            f"{SHARED_STATS_COLLECTOR_URL.rstrip('/')}/api/{action}",
+            data=json.dumps(payload or {}).encode(), headers={"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=SHARED_STATS_FORWARD_TIMEOUT) as response:
+                return json.loads(response.read())
+        except Exception as e:
+            return {"success": False, "message": f"Coletor indisponível em {SHARED_STATS_COLLECTOR_URL}: {e}"}
+
+    def start_collection(self):
+        return self._forward("start")
+
+    def stop_collection(self):
+        return self._forward("stop")
+
+    def reset_data(self):
+        return self._forward("reset")
+
+    def set_data_filter(self, filter_value):
+        return self._forward("filter", {"filter": filter_value})
+
+# Instância global do controlador: o coletor, ou só um leitor do estado dele nos workers da API
+if SHARED_STATS_NAME and SHARED_STATS_ROLE == "reader":
+    websocket_controller = SharedStatsController()
+else:
+    websocket_controller = WebSocketController()
 
@@ -0,0 +1,336 @@
+"""Estatísticas de janela deslizante mantidas ao vivo.
+
+Para cada tamanho de filtro (últimos N ticks) as estatísticas de cada
+(group_len, tipo) são atualizadas a cada tick: entradas novas entram na
+janela e entradas antigas saem quando o grupo que as originou deixa de
+caber nos últimos N ticks. A maior sequência de wins/losses dentro da
+janela é mantida com uma deque monotônica sobre as sequências fechadas,
+então a leitura é apenas uma consulta.
+
+Janelas de tempo ("últimos 15 min") usam a mesma estrutura: a diferença é
+que o início delas não anda com a contagem de ticks, e sim quando o dono
+informa a nova posição de início (``move_time_window``).
+"""
+
+from collections import deque, defaultdict
+from src.strategy_engine import TIPOS
+
+
+def empty_entry():
+    """Entrada formatada sem nenhuma operação"""
+    return {
+        "wins": 0,
+        "losses": 0,
+        "entradas": 0,
+        "taxa_acerto": 0,
+        "seq_win_atual": 0,
+        "seq_loss_atual": 0,
+        "max_win": 0,
+        "max_loss": 0
+    }
+
+
+def format_entry(wins, losses, seq_win, seq_loss, max_win, max_loss):
+    """Formata uma entrada de estatística no padrão da API"""
+    entradas = wins + losses
+    if entradas == 0:
+        return empty_entry()
+    return {
+        "wins": wins,
+        "losses": losses,
+        "entradas": entradas,
+        "taxa_acerto": round((wins / entradas) * 100, 2),
+        "seq_win_atual": seq_win,
+        "seq_loss_atual": seq_loss,
+        "max_win": max_win,
+        "max_loss": max_loss
+    }
+
+
+class _Series:
+    """Entradas e sequências de um (group_len, tipo), compartilhadas pelas janelas"""
+
+    __slots__ = ("group_len", "tipo", "events", "event_base", "runs", "run_base", "windows")
+
+    def __init__(self, group_len, tipo):
+        self.group_len = group_len
+        self.tipo = tipo
+        self.events = deque()  # (posição do tick, win)
+        self.event_base = 0  # índice global de events[0]
+        self.runs = deque()  # [índice da primeira entrada, tamanho, win]
+        self.run_base = 0  # índice global de runs[0]
+        self.windows = []  # em ordem crescente de tamanho
+
+    @property
+    def count(self):
+        return self.event_base + len(self.events)
+
+    def add(self, tick_pos, win, version):
+        index = self.count
+        self.events.append((tick_pos, win))
+        runs = self.runs
+        if runs and runs[-1][2] == win:
+            runs[-1][1] += 1
+        else:
+            if runs:
+                closed = runs[-1]
+                for window in self.windows:
+                    window.push_closed_run(closed)
+            runs.append([index, 1, win])
+        for window in self.windows:
+            window.wins += win
+            window.version = version
+
+    def trim(self, first):
+        """Descarta entradas e sequências que já saíram da maior janela"""
+        while self.event_base < first:
+            self.events.popleft()
+            self.event_base += 1
+        runs = self.runs
+        while len(runs) > 1 and runs[0][0] + runs[0][1] <= first:
+            runs.popleft()
+            self.run_base += 1
+
+
+class _Window:
+    """Visão de uma série limitada aos últimos ``size`` ticks (ou a uma janela de tempo)"""
+
+    __slots__ = ("key", "size", "series", "first", "wins", "run_index", "max_runs", "version")
+
+    def __init__(self, key, size, series):
+        self.key = key  # tamanho em ticks ou rótulo da janela de tempo
+        self.size = size  # None nas janelas de tempo
+        self.series = series
+        self.first = 0  # índice global da primeira entrada dentro da janela
+        self.wins = 0
+        self.run_index = 0  # índice global da sequência que contém ``first``
+        # Deques monotônicas (loss, win) de sequências fechadas inteiras na janela
+        self.max_runs = (deque(), deque())
+        self.version = 0  # versão do estado em que a janela mudou pela última vez
+
+    def push_closed_run(self, run):
+        start, length, win = run
+        if start < self.first:
+            return  # sequência parcial, tratada via run_index
+        bucket = self.max_runs[win]
+        while bucket and bucket[-1][1] <= length:
+            bucket.pop()
+        bucket.append((start, length))
+
+    def expiry(self):
+        """Início de janela a partir do qual a primeira entrada sai, ou None"""
+        series = self.series
+        if self.first >= series.count:
+            return None
+        tick_pos = series.events[self.first - series.event_base][0]
+        return tick_pos - series.group_len + 1
+
+    def evict(self, window_start, version):
+        """Remove as entradas cujo grupo começa antes de ``window_start``"""
+        series = self.series
+        events = series.events
+        threshold = window_start + series.group_len
+        count = series.count
+        first = self.first
+        while first < count:
+            tick_pos, win = events[first - series.event_base]
+            if tick_pos >= threshold:
+                break
+            self.wins -= win
+            first += 1
+        if first == self.first:
+            return
+        self.version = version
+        self.first = first
+
+        for bucket in self.max_runs:
+            while bucket and bucket[0][0] < first:
+                bucket.popleft()
+        self._sync_run_index()
+
+        series.trim(min(window.first for window in series.windows))
+
+    def _sync_run_index(self):
+        """Avança run_index até a sequência que contém a primeira entrada da janela"""
+        series = self.series
+        runs = series.runs
+        last_run = series.run_base + len(runs) - 1
+        run_index = max(self.run_index, series.run_base)
+        while run_index < last_run:
+            start, length, _ = runs[run_index - series.run_base]
+            if start + length > self.first:
+                break
+            run_index += 1
+        self.run_index = run_index
+
+    def stats(self):
+        series = self.series
+        entradas = series.count - self.first
+        if entradas <= 0:
+            return empty_entry()
+
+        self._sync_run_index()
+        runs = series.runs
+        first = self.first
+        best = [0, 0]  # loss, win
+        for win in (0, 1):
+            if self.max_runs[win]:
+                best[win] = self.max_runs[win][0][1]
+
+        # Sequência parcial no início da janela
+        head_start, head_length, head_win = runs[self.run_index - series.run_base]
+        if head_start < first:
+            clipped = head_start + head_length - first
+            best[head_win] = max(best[head_win], clipped)
+
+        # Sequência atual, limitada à janela
+        cur_start, _, cur_win = runs[-1]
+        current = series.count - max(cur_start, first)
+        best[cur_win] = max(best[cur_win], current)
+
+        return format_entry(
+            self.wins,
+            entradas - self.wins,
+            current if cur_win else 0,
+            0 if cur_win else current,
+            best[1],
+            best[0]
+        )
+
+
+class WindowedStats:
+    """Estatísticas de um mercado para vários tamanhos de janela, atualizadas a cada tick"""
+
+    def __init__(self, window_sizes, group_lens, time_windows=()):
+        self.window_sizes = tuple(sorted(window_sizes))
+        self.time_windows = tuple(time_windows)
+        self.group_lens = tuple(group_lens)
+        self.total = 0  # ticks processados
+        self.version = 0  # versão do estado do controlador no último push
+        self.series = {}
+        self.windows = {key: {} for key in self.window_sizes + self.time_windows}
+        self.time_starts = dict.fromkeys(self.time_windows, 0)  # posição do primeiro tick de cada janela de tempo
+        for group_len in self.group_lens:
+            for tipo in TIPOS:
+                series = _Series(group_len, tipo)
+                for key in self.window_sizes + self.time_windows:
+                    window = _Window(key, key if key in self.window_sizes else None, series)
+                    series.windows.append(window)
+                    self.windows[key][(group_len, tipo)] = window
+                self.series[(group_len, tipo)] = series
+        # total de ticks -> janelas cuja primeira entrada expira nesse momento
+        self._expiry = defaultdict(list)
+        # janela de tempo -> início -> janelas cuja primeira entrada sai com esse início
+        self._time_expiry = {key: defaultdict(list) for key in self.time_windows}
+        self._touched = set()  # janelas alteradas desde o último pop_changes
+
+    def _schedule(self, window):
+        expiry = window.expiry()
+        if expiry is None:
+            return
+        if expiry + window.size <= self.total:
+            window.evict(self.total - window.size, self.version)
+            self._touched.add(window)
+            expiry = window.expiry()
+            if expiry is None:
+                return
+        self._expiry[expiry + window.size].append(window)
+
+    def _schedule_time(self, window, version):
+        expiry = window.expiry()
+        if expiry is None:
+            return
+        start = self.time_starts[window.key]
+        if expiry <= start:
+            window.evict(start, version)
+            self._touched.add(window)
+            expiry = window.expiry()
+            if expiry is None:
+                return
+        self._time_expiry[window.key][expiry].append(window)
+
+    def push(self, fired, version=0):
+        """Registra um tick e as entradas que ele gerou (saída de IncrementalStrategyEngine.push).
+
+        As janelas alteradas ficam marcadas com ``version``.
+        """
+        self.total += 1
+        self.version = version
+        total = self.total
+
+        touched = self._touched
+        for window in self._expiry.pop(total, ()):
+            window.evict(total - window.size, version)
+            touched.add(window)
+            self._schedule(window)
+
+        if fired is None:
+            return
+        tipo, result, group_lens = fired
+        win = 1 if result == "win" else 0
+        tick_pos = total - 1
+        for group_len in group_lens:
+            for key in ((group_len, "geral"), (group_len, tipo)):
+                series = self.series[key]
+                index = series.count
+                series.add(tick_pos, win, version)
+                touched.update(series.windows)
+                for window in series.windows:
+                    if window.first == index:
+                        # A janela estava vazia: a nova entrada passa a ser a primeira
+                        if window.size is None:
+                            self._schedule_time(window, version)
+                        else:
+                            self._schedule(window)
+
+    def move_time_window(self, key, start, version):
+        """Move o início da janela de tempo ``key`` para a posição de tick ``start``.
+
+        O início nunca volta. Retorna True se alguma janela mudou.
+        """
+        previous = self.time_starts[key]
+        if start <= previous:
+            return False
+        self.time_starts[key] = start
+        expiry = self._time_expiry[key]
+        if start - previous > len(expiry):
+            positions = [position for position in expiry if position <= start]
+        else:
+            positions = range(previous + 1, start + 1)
+        expired = [window for position in positions for window in expiry.pop(position, ())]
+        for window in expired:
+            self._schedule_time(window, version)
+        return bool(expired)
+
+    def get_groups(self, size, since=None):
+        """Retorna os grupos formatados da janela, no mesmo formato de _calculate_filtered_stats.
+
+        Com ``since``, só as entradas alteradas depois dessa versão são incluídas.
+        """
+        windows = self.windows[size]
+        groups = {}
+        for group_len in self.group_lens:
+            if since is None:
+                groups[str(group_len)] = {tipo: windows[(group_len, tipo)].stats() for tipo in TIPOS}
+                continue
+            changed = {}
+            for tipo in TIPOS:
+                window = windows[(group_len, tipo)]
+                if window.version > since:
+                    changed[tipo] = window.stats()
+            if changed:
+                groups[str(group_len)] = changed
+        return groups
+
+    def pop_changes(self):
+        """Entradas formatadas das janelas alteradas desde a última chamada.
+
+        Formato ``{size: {group_len: {tipo: entrada}}}``, com só o que mudou.
+        """
+        changes = {}
+        for window in self._touched:
+            series = window.series
+            size_changes = changes.setdefault(window.key, {})
+            size_changes.setdefault(str(series.group_len), {})[series.tipo] = window.stats()
+        self._touched.clear()
+        return changes
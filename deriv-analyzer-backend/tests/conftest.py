@@ -0,0 +1,8 @@
+import os
+import sys
+
+# O controlador lê estes caminhos na importação: os testes não gravam no disco nem na memória compartilhada
+for name in ("TICK_LOG_DIR", "TICK_STORE_PATH", "ALERT_LOG_PATH", "SHARED_STATS_NAME"):
+    os.environ[name] = ""
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
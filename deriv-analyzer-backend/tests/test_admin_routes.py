@@ -0,0 +1,34 @@
+"""Acesso às rotas /api/admin"""
+
+import pytest
+
+from src.main import app
+from src.routes import api
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+def test_admin_routes_are_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(api, "ADMIN_TOKEN", None)
+    assert client.get("/api/admin/profile").status_code == 404
+    assert client.post("/api/admin/profile", json={"mode": "spans", "duration": 1}).status_code == 404
+    assert api.websocket_controller.profiler.session is None
+
+
+def test_admin_routes_require_the_token(client, monkeypatch):
+    monkeypatch.setattr(api, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/api/admin/profile").status_code == 401
+    assert client.get("/api/admin/profile", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    headers = {"Authorization": "Bearer s3cret"}
+    assert client.post("/api/admin/profile", json={"mode": "spans", "duration": 1}, headers=headers).status_code == 202
+    assert client.delete("/api/admin/profile", headers=headers).status_code == 200
+
+
+def test_admin_routes_are_outside_cors(client):
+    origin = {"Origin": "https://example.com"}
+    assert client.get("/api/status", headers=origin).headers.get("Access-Control-Allow-Origin")
+    preflight = client.options("/api/admin/profile", headers={**origin, "Access-Control-Request-Method": "POST"})
+    assert preflight.headers.get("Access-Control-Allow-Origin") is None
@@ -0,0 +1,26 @@
+"""Ciclo de vida do coletor asyncio"""
+
+import socket
+import time
+
+from src import websocket_controller as controller_module
+
+
+def test_collection_stops_when_every_shard_gives_up(monkeypatch):
+    with socket.socket() as sock:  # porta livre, sem ninguém escutando
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    monkeypatch.setattr(controller_module, "WS_URL", f"ws://127.0.0.1:{port}")
+    monkeypatch.setattr(controller_module, "MAX_RECONNECT_ATTEMPTS", 0)
+    controller = controller_module.WebSocketController()
+    version = controller.state_version
+    assert controller.start_collection()["success"]
+
+    deadline = time.monotonic() + 5
+    while controller.is_running or controller.collector is not None:
+        assert time.monotonic() < deadline, "a coleta continuou marcada como em execução"
+        time.sleep(0.01)
+    assert controller.get_status()["is_running"] is False
+    assert controller.state_version > version
+    assert controller.start_collection()["success"]  # /start volta a funcionar sem /stop antes
+    controller.stop_collection()
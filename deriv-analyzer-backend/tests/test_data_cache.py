@@ -0,0 +1,33 @@
+"""ETag e corpo de /api/data vêm da mesma publicação"""
+
+import time
+
+from src.main import app
+from src.routes import api
+from src.tick_parser import Tick
+
+
+def test_body_matches_its_etag_when_a_tick_lands_during_the_build(monkeypatch):
+    controller = api.websocket_controller
+    market = api.MARKETS[0]
+    api.response_cache.clear()
+    get_filtered_results = controller.get_filtered_results
+
+    def tick_then_build(*args, **kwargs):
+        # Um tick chega entre a leitura da versão e a montagem do corpo
+        controller.process_ticks([(market, Tick(market, 100.01, time.time(), 2, 1), time.time())])
+        return get_filtered_results(*args, **kwargs)
+
+    monkeypatch.setattr(controller, "get_filtered_results", tick_then_build)
+    total = controller.snapshots[market].total_ticks
+    client = app.test_client()
+    response = client.get("/api/data?window=25")
+    body = response.get_json()
+    assert response.headers["ETag"].strip('"').split("-")[0] == str(body["version"])
+    assert body["data"][market]["total_ticks"] == total  # sem o tick que chegou depois da versão
+
+    # O próximo delta parte da versão do corpo e traz o tick
+    monkeypatch.setattr(controller, "get_filtered_results", get_filtered_results)
+    delta = client.get(f"/api/data?window=25&since={body['version']}").get_json()
+    assert delta["delta"] is True
+    assert delta["data"][market]["total_ticks"] == total + 1
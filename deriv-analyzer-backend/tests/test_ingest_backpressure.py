@@ -0,0 +1,83 @@
+"""Backpressure da fila de ingest no coletor asyncio"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src import websocket_controller as controller_module
+from src.fake_deriv_server import FakeDerivServer, synthetic_source
+
+
+@pytest.fixture
+def fake_server():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    server = FakeDerivServer(synthetic_source(controller_module.MARKETS, 1000), speed=10)
+    asyncio.run_coroutine_threadsafe(server.start("127.0.0.1", 0), loop).result()
+    yield server
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condição não atingida a tempo"
+        time.sleep(0.01)
+
+
+def test_slow_worker_does_not_stall_collector_loop(fake_server, monkeypatch):
+    monkeypatch.setattr(controller_module, "WS_URL", f"ws://127.0.0.1:{fake_server.port}")
+    monkeypatch.setattr(controller_module, "MARKETS_PER_CONNECTION", 1)
+    monkeypatch.setattr(controller_module, "INGEST_QUEUE_SIZE", 4)
+    monkeypatch.setattr(controller_module, "INGEST_QUEUE_POLICY", "block")
+    monkeypatch.setattr(controller_module, "INGEST_BLOCK_TIMEOUT", 10)
+    controller = controller_module.WebSocketController()
+
+    # Worker travado até o teste liberar
+    gate = threading.Event()
+    process_ticks = controller.process_ticks
+
+    def slow_process_ticks(batch):
+        gate.wait()
+        process_ticks(batch)
+
+    controller.process_ticks = slow_process_ticks
+    sockets = {}
+    on_open = controller.on_open
+
+    def capture_open(ws, shard_id):
+        sockets[shard_id] = ws
+        on_open(ws, shard_id)
+
+    controller.on_open = capture_open
+
+    controller.start_collection()
+    try:
+        queue = controller.ingest_queue
+        # Com a fila cheia, cada shard para no seu próprio put: se a espera travasse o loop,
+        # só o primeiro shard chegaria a esperar
+        wait_until(lambda: queue.blocked >= len(controller.shards))
+        assert len(sockets) == len(controller.shards)
+
+        loop = controller.collector.loop
+
+        async def ping_all():
+            started = time.monotonic()
+            pongs = [await ws.ping() for ws in sockets.values()]
+            await asyncio.wait_for(asyncio.gather(*pongs), timeout=1)
+            return time.monotonic() - started
+
+        assert asyncio.run_coroutine_threadsafe(ping_all(), loop).result(timeout=2) < 1
+        assert not gate.is_set() and queue.blocked >= len(controller.shards)
+
+        gate.set()
+        wait_until(lambda: sum(len(controller.tick_queues[market]) for market in controller_module.MARKETS) > 20)
+        assert queue.dropped == 0
+    finally:
+        gate.set()
+        controller.stop_collection()
@@ -0,0 +1,66 @@
+"""Writer de persistência: fila cheia fora do lock do estado e ordem entre lotes e resets"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src import websocket_controller as controller_module
+from src.tick_parser import Tick
+
+
+@pytest.fixture
+def controller(tmp_path, monkeypatch):
+    monkeypatch.setattr(controller_module, "TICK_LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setattr(controller_module, "TICK_STORE_PATH", str(tmp_path / "ticks.db"))
+    monkeypatch.setattr(controller_module, "TICK_STORE_RETENTION_DAYS", 0)
+    monkeypatch.setattr(controller_module, "PERSIST_QUEUE_SIZE", 1)
+    return controller_module.WebSocketController()
+
+
+def ticks(market, epochs):
+    return [(market, Tick(market, 100.0 + epoch, float(epoch), 2, epoch % 10), time.time()) for epoch in epochs]
+
+
+def test_full_persist_queue_does_not_hold_the_state_lock(controller):
+    market = controller_module.MARKETS[0]
+    gate = threading.Event()
+    persist_ticks = controller._persist_ticks
+
+    def slow_persist_ticks(*args, **kwargs):
+        gate.wait()
+        persist_ticks(*args, **kwargs)
+
+    controller._persist_ticks = slow_persist_ticks
+    # Writer travado e fila de 1: o terceiro lote espera espaço na fila
+    worker = threading.Thread(target=lambda: [controller.process_ticks(ticks(market, [i])) for i in range(1, 4)])
+    worker.start()
+    try:
+        deadline = time.monotonic() + 5
+        while controller.persist_queue.blocked == 0:
+            assert time.monotonic() < deadline, "o ingest não chegou a esperar a fila"
+            time.sleep(0.01)
+        acquired = controller._lock.acquire(timeout=1)
+        assert acquired, "o ingest esperou a fila segurando o lock do estado"
+        controller._lock.release()
+    finally:
+        gate.set()
+        worker.join()
+    controller.flush_tick_logs()
+    assert controller.tick_store.read_range(market)[0].tolist() == [1, 2, 3]
+
+
+def test_reset_generation_orders_batches_enqueued_outside_the_lock(controller):
+    market = controller_module.MARKETS[0]
+
+    def batch(generation, epochs):
+        epochs = np.array(epochs, dtype=np.float64)
+        return ("ticks", generation, market, epochs, epochs + 100, (epochs % 10).astype(np.uint8))
+
+    controller._write_persisted([batch(0, [1, 2])])
+    # Lote depois do reset que chegou antes do "clear", e lote de antes do reset que chegou depois dele
+    controller._write_persisted([batch(1, [3]), ("clear", 1), batch(0, [4])])
+    controller.flush_tick_logs()
+    assert controller.tick_logs[market].read()[0].tolist() == [3]
+    assert sorted(controller.tick_store.read_range(market)[0].tolist()) == [1, 2, 3, 4]
@@ -0,0 +1,133 @@
+"""Seqlock, anel de ticks e troca de segmento da memória compartilhada"""
+
+import itertools
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pytest
+
+from src import shared_stats
+from src.shared_stats import SharedStatsReader, SharedStatsWriter, SharedTickView, SlotFull
+
+pytestmark = pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="precisa de /proc e fork")
+
+_names = itertools.count()
+
+
+@pytest.fixture
+def name():
+    name = f"dts-test-{os.getpid()}-{next(_names)}"
+    yield name
+    try:
+        shared_stats._SharedMemory(name).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+def _write_forever(writer, stop):
+    for i in itertools.count():
+        if stop.is_set():
+            return
+        digit = str(i % 10)
+        writer.write_status(json.dumps({"digit": digit, "pad": digit * (100 + i % 4000)}).encode())
+
+
+def test_seqlock_never_returns_torn_blocks(name):
+    writer = SharedStatsWriter(name, 1, 8, 8192, 8192)
+    reader = SharedStatsReader(name, 1, 8)
+    assert reader.check()
+    # Escritor em outro processo: cópias de verdade concorrentes, fora do GIL
+    context = multiprocessing.get_context("fork")
+    stop = context.Event()
+    process = context.Process(target=_write_forever, args=(writer, stop))
+    process.start()
+    try:
+        seen = set()
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            status = reader.status()  # um bloco rasgado quebraria o JSON ou misturaria os dígitos
+            if status is not None:
+                assert set(status["pad"]) == {status["digit"]}
+                seen.add(len(status["pad"]))
+        assert len(seen) > 1
+    finally:
+        stop.set()
+        process.join()
+        writer.close()
+
+
+def test_ring_overrun_discards_overwritten_ticks(name):
+    writer = SharedStatsWriter(name, 1, 8, 64, 64)
+    reader = SharedStatsReader(name, 1, 8)
+    assert reader.check()
+    writer.write_market(0, b"{}")
+    _, slot = reader.market(0)
+
+    end = writer.append_ticks(0, np.arange(6, dtype=np.uint8), np.arange(6, dtype=np.float64))
+    view = SharedTickView(slot, end, 6)
+    assert view.digit_window().tolist() == [0, 1, 2, 3, 4, 5]
+    assert view.digits_since(3.0).tolist() == [3, 4, 5]
+
+    # O anel dá a volta: os ticks mais antigos da visão foram sobrescritos
+    end = writer.append_ticks(0, np.arange(6, 9, dtype=np.uint8), np.arange(6, 9, dtype=np.float64))
+    assert view.digit_window() is None
+    assert view.digits_since(0.0) is None
+    assert view.digit_window(2).tolist() == [4, 5]
+    assert SharedTickView(slot, end, 8).digit_window().tolist() == [1, 2, 3, 4, 5, 6, 7, 8]
+    writer.close()
+
+
+def test_stale_segment_is_not_reattached(name, monkeypatch):
+    monkeypatch.setattr(shared_stats, "ATTACH_INTERVAL", 0.0)
+    writer = SharedStatsWriter(name, 1, 8, 64, 64)
+    reader = SharedStatsReader(name, 1, 8, stale_after=0.0)  # o coletor parece sempre parado
+    assert reader.check()
+    fds = open_fds()
+    for _ in range(50):
+        assert reader.check()
+    assert open_fds() == fds
+    assert reader.attaches == 1
+
+    # Coletor reiniciado com outro segmento: o leitor troca e fecha o antigo quando as visões somem
+    writer.write_market(0, b'{"run": 1}')
+    data, slot = reader.market(0)
+    assert data == {"run": 1}
+    writer.close(unlink=True)
+    writer = SharedStatsWriter(name, 1, 8, 64, 64)
+    writer.write_market(0, b'{"run": 2}')
+    assert reader.check()
+    assert reader.market(0)[0] == {"run": 2}
+    assert reader.attaches == 2
+    assert open_fds() > fds  # o segmento antigo continua aberto enquanto ``slot`` existe
+    del slot
+    reader.check()
+    assert open_fds() == fds
+    writer.close()
+
+
+def test_overflow_grows_segment(name, monkeypatch):
+    monkeypatch.setattr(shared_stats, "ATTACH_INTERVAL", 0.0)
+    writer = SharedStatsWriter(name, 1, 8, 64, 64)
+    reader = SharedStatsReader(name, 1, 8)
+    assert reader.check()
+    payload = json.dumps({"pad": "x" * 200}).encode()
+    with pytest.raises(SlotFull) as full:
+        writer.write_market(0, payload)
+    kind, needed = full.value.kind, full.value.needed
+    del full  # o traceback guarda visões do segmento antigo
+    layout = writer.grow(kind, needed)
+    assert layout.blob_size >= len(payload) and layout.status_size == 64
+    writer.write_market(0, payload)
+
+    # O segmento antigo foi marcado como movido: o leitor troca sem esperar o heartbeat envelhecer
+    assert reader.check()
+    assert reader.market(0)[0] == {"pad": "x" * 200}
+    assert reader.attaches == 2
+    writer.close(unlink=True)
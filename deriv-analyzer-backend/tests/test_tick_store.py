@@ -0,0 +1,55 @@
+"""Histórico em SQLite: ticks pendentes nas consultas e retenção"""
+
+import threading
+import time
+
+import numpy as np
+
+from src.tick_store import TickStore
+
+
+def append(store, market, epochs):
+    epochs = np.asarray(epochs, dtype=np.float64)
+    store.append(market, epochs, epochs + 100, (epochs % 10).astype(np.uint8))
+
+
+def test_pending_ticks_with_the_last_stored_epoch_are_returned(tmp_path):
+    store = TickStore(str(tmp_path / "ticks.db"), block_size=4, flush_interval=3600)
+    append(store, "R_10", [10, 11, 12, 12])  # bloco cheio: gravado
+    append(store, "R_10", [12, 13])  # pendente, começando no último epoch gravado
+    epochs, quotes, digits = store.read_range("R_10")
+    assert epochs.tolist() == [10, 11, 12, 12, 12, 13]
+    assert quotes.tolist() == [110, 111, 112, 112, 112, 113]
+    store.close()
+
+
+def test_reads_during_flushes_neither_lose_nor_duplicate_ticks(tmp_path):
+    store = TickStore(str(tmp_path / "ticks.db"), block_size=7, flush_interval=3600)
+    total = 3000
+    written = [0]
+
+    def writer():
+        for start in range(0, total, 3):
+            append(store, "R_10", range(start, start + 3))
+            written[0] = start + 3
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while thread.is_alive():
+        before = written[0]
+        epochs = store.read_range("R_10")[0]
+        assert len(epochs) >= before
+        assert np.array_equal(epochs, np.arange(len(epochs)))
+    thread.join()
+    assert len(store.read_range("R_10")[0]) == total
+    store.close()
+
+
+def test_retention_prunes_old_blocks(tmp_path):
+    store = TickStore(str(tmp_path / "ticks.db"), block_size=2, flush_interval=3600, retention=86400)
+    now = time.time()
+    append(store, "R_10", [now - 3 * 86400, now - 3 * 86400 + 1])
+    append(store, "R_10", [now - 10, now - 9])
+    store.flush()
+    assert store.read_range("R_10")[0].tolist() == [now - 10, now - 9]
+    store.close()
@@ -0,0 +1,32 @@
+"""Janelas de tempo andam com o relógio, sem depender do ingest"""
+
+import time
+
+import numpy as np
+
+from src import websocket_controller as controller_module
+from src.tick_parser import Tick
+
+
+def entradas(results, market):
+    return sum(group["geral"]["entradas"] for group in results[market]["groups"].values())
+
+
+def test_time_windows_expire_with_collection_stopped(monkeypatch):
+    monkeypatch.setattr(controller_module, "TIME_WINDOW_REFRESH_INTERVAL", 0.05)
+    controller = controller_module.WebSocketController()
+    market = controller_module.MARKETS[0]
+    digits = np.random.default_rng(1).integers(0, 10, 300)
+    # Ticks que saem da janela de 15 min daqui a meio segundo
+    epoch = time.time() - controller_module.TIME_WINDOWS["15m"] + 0.5
+    controller.process_ticks([
+        (market, Tick(market, 100.0 + digit / 100, epoch, 2, int(digit)), time.time()) for digit in digits
+    ])
+    assert not controller.is_running
+    assert entradas(controller.get_filtered_results("15m"), market) > 0
+
+    deadline = time.monotonic() + 5
+    while entradas(controller.get_filtered_results("15m"), market) > 0:
+        assert time.monotonic() < deadline, "a janela de 15 min não andou com a coleta parada"
+        time.sleep(0.05)
+    assert entradas(controller.get_filtered_results("1h"), market) > 0
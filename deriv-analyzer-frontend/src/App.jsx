@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card'
 import { Badge } from '@/components/ui/badge'
 import { Button } from '@/components/ui/button'
@@ -15,6 +15,21 @@ import './App.css'
 const COLORS = ['#0088FE', '#00C49F', '#FFBB28', '#FF8042', '#8884D8']
 const API_BASE_URL = 'http://localhost:5000/api'
 
+// Aplica um delta do /api/stream sobre os dados atuais
+const mergeDelta = (base, changes) => {
+  const next = { ...base }
+  Object.entries(changes).forEach(([market, change]) => {
+    const previous = next[market] || { groups: {} }
+    const groups = { ...previous.groups }
+    Object.entries(change.groups || {}).forEach(([groupLen, tipos]) => {
+      groups[groupLen] = { ...groups[groupLen], ...tipos }
+    })
+    const strategies = { ...previous.strategies, ...change.strategies }
+    next[market] = { ...previous, ...change, groups, strategies }
+  })
+  return next
+}
+
 function App() {
   const [data, setData] = useState(null)
   const [loading, setLoading] = useState(true)
@@ -38,10 +53,13 @@ function App() {
   const [browserNotificationsEnabled, setBrowserNotificationsEnabled] = useState(false)
   const [notificationPermission, setNotificationPermission] = useState('default')
 
+  // Stream de atualizações do servidor (substitui o polling quando conectado)
+  const [streamConnected, setStreamConnected] = useState(false)
+
   const fetchData = async () => {
     try {
       setLoading(true)
-      const response = await fetch(`${API_BASE_URL}/data`)
+      const response = await fetch(`${API_BASE_URL}/data?window=${dataFilter}`)
       if (!response.ok) {
         throw new Error(`Erro HTTP: ${response.status}`)
       }
@@ -208,21 +226,9 @@ function App() {
     }
   }
 
-  const updateFilter = async (newFilter) => {
-    try {
-      const response = await fetch(`${API_BASE_URL}/filter`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ filter: newFilter })
-      })
-      const result = await response.json()
-      if (result.success) {
-        setDataFilter(newFilter)
-        fetchData() // Recarrega os dados com o novo filtro
-      }
-    } catch (err) {
-      console.error('Erro ao atualizar filtro:', err)
-    }
+  // O filtro é só deste painel: vai como parâmetro em cada requisição (stream e polling)
+  const updateFilter = (newFilter) => {
+    setDataFilter(newFilter)
   }
 
   const analyzeOpportunities = (marketData) => {
@@ -438,31 +444,12 @@ function App() {
             if (currentLossSeq > threshold) {
               // Verifica se já não está alertando
               if (!activeAlerts.includes(alertKey)) {
-                newAlerts.push({
-                  key: alertKey,
-                  market,
-                  groupLen,
-                  currentLossSeq,
-                  threshold,
-                  message: (
-                    <>
-                      🚨 <strong>MOMENTO DE ENTRADA DETECTADO!</strong> O mercado <strong>{market}</strong> com grupos de <strong>{groupLen} dígitos</strong> acumulou <strong>{currentLossSeq} perdas consecutivas</strong> (acima do limite de <strong>{threshold}</strong>). Segundo a <strong>estratégia de reversão</strong>, esta pode ser uma <strong>oportunidade favorável para entrada</strong>. Analise o padrão e considere sua estratégia!
-                    </>
-                  )
-                })
+                newAlerts.push(buildEntryAlert(market, groupLen, currentLossSeq, threshold))
               }
             } else {
               // Remove alerta se a condição não é mais atendida
               if (activeAlerts.includes(alertKey)) {
-                setActiveAlerts(prev => prev.filter(alert => alert !== alertKey))
-                if (alertIntervals[alertKey]) {
-                  clearInterval(alertIntervals[alertKey])
-                  setAlertIntervals(prev => {
-                    const newIntervals = { ...prev }
-                    delete newIntervals[alertKey]
-                    return newIntervals
-                  })
-                }
+                stopAlert(alertKey)
               }
             }
           }
@@ -470,12 +457,60 @@ function App() {
       }
     })
 
+    startAlerts(newAlerts)
+  }
+
+  // Alertas calculados no servidor (eventos "alert"/"clear" do /api/stream)
+  const handleServerAlerts = (events) => {
+    if (!alertsEnabled) return
+    const newAlerts = []
+    events.forEach(event => {
+      if (event.tipo !== 'geral' || event.field !== 'seq_loss') return
+      const groupLen = String(event.group_len)
+      const alertKey = `${event.market}-${groupLen}`
+      if (event.type === 'alert') {
+        // Já alertando (ou repetido no mesmo delta): não duplica a notificação nem o som
+        if (!activeAlerts.includes(alertKey) && !newAlerts.some(alert => alert.key === alertKey)) {
+          newAlerts.push(buildEntryAlert(event.market, groupLen, event.value, event.threshold))
+        }
+      } else {
+        stopAlert(alertKey)
+      }
+    })
+    startAlerts(newAlerts)
+  }
+
+  const buildEntryAlert = (market, groupLen, currentLossSeq, threshold) => ({
+    key: `${market}-${groupLen}`,
+    market,
+    groupLen,
+    currentLossSeq,
+    threshold,
+    message: (
+      <>
+        🚨 <strong>MOMENTO DE ENTRADA DETECTADO!</strong> O mercado <strong>{market}</strong> com grupos de <strong>{groupLen} dígitos</strong> acumulou <strong>{currentLossSeq} perdas consecutivas</strong> (acima do limite de <strong>{threshold}</strong>). Segundo a <strong>estratégia de reversão</strong>, esta pode ser uma <strong>oportunidade favorável para entrada</strong>. Analise o padrão e considere sua estratégia!
+      </>
+    )
+  })
+
+  const stopAlert = (alertKey) => {
+    setActiveAlerts(prev => prev.filter(alert => alert !== alertKey))
+    setAlertIntervals(prev => {
+      if (!prev[alertKey]) return prev
+      clearInterval(prev[alertKey])
+      const newIntervals = { ...prev }
+      delete newIntervals[alertKey]
+      return newIntervals
+    })
+  }
+
+  const startAlerts = (newAlerts) => {
     // Adiciona novos alertas
     if (newAlerts.length > 0) {
       const ctx = initAudioContext()
       
       newAlerts.forEach(alert => {
-        setActiveAlerts(prev => [...prev, alert.key])
+        setActiveAlerts(prev => prev.includes(alert.key) ? prev : [...prev, alert.key])
         
         // Adiciona notificação
         setNotifications(prev => [...prev, {
@@ -503,10 +538,14 @@ function App() {
           playAlertSound(ctx)
         }, 1500) // Toca a cada 1.5 segundos
         
-        setAlertIntervals(prev => ({
-          ...prev,
-          [alert.key]: intervalId
-        }))
+        setAlertIntervals(prev => {
+          // Um intervalo antigo da mesma chave seria perdido e tocaria para sempre
+          if (prev[alert.key]) clearInterval(prev[alert.key])
+          return {
+            ...prev,
+            [alert.key]: intervalId
+          }
+        })
       })
     }
   }
@@ -537,7 +576,63 @@ function App() {
     }
   }
 
+  // Os listeners do stream duram enquanto o filtro não muda: chamam as funções do último render,
+  // que leem os valores atuais de alertsEnabled, activeAlerts e browserNotificationsEnabled
+  const streamHandlers = useRef(null)
+  streamHandlers.current = { handleServerAlerts }
+
+  // Recebe snapshot + deltas pelo /api/stream; o polling abaixo só roda sem o stream
+  useEffect(() => {
+    if (!('EventSource' in window)) return
+    const source = new EventSource(`${API_BASE_URL}/stream?filter=${dataFilter}`)
+    let currentData = null
+
+    const applyData = (nextData) => {
+      currentData = nextData
+      setData(nextData)
+      setLastUpdate(new Date())
+      setError(null)
+      setLoading(false)
+      // Com o stream, os alertas vêm do servidor (handleServerAlerts); analyzeOpportunities fica para o polling
+    }
+
+    const applyStatus = (status) => {
+      setSystemStatus({ success: true, ...status })
+      setIsRunning(status.is_running)
+    }
+
+    source.addEventListener('snapshot', (event) => {
+      const payload = JSON.parse(event.data)
+      applyData(payload.data)
+      applyStatus(payload.status)
+      setRecentTickets(payload.tickets.slice(-10))
+      setStreamConnected(true)
+    })
+
+    source.addEventListener('delta', (event) => {
+      const payload = JSON.parse(event.data)
+      if (currentData && Object.keys(payload.changes).length > 0) {
+        applyData(mergeDelta(currentData, payload.changes))
+      }
+      if (payload.status) {
+        applyStatus(payload.status)
+      }
+      if (payload.ticks) {
+        setRecentTickets(prev => [...prev, ...payload.ticks].slice(-10))
+      }
+      if (payload.alerts) {
+        streamHandlers.current.handleServerAlerts(payload.alerts)
+      }
+    })
+
+    // O EventSource reconecta sozinho; enquanto isso volta para o polling
+    source.onerror = () => setStreamConnected(false)
+
+    return () => source.close()
+  }, [dataFilter])
+
   useEffect(() => {
+    if (streamConnected) return
     fetchStatus()
     fetchData()
     const interval = setInterval(() => {
@@ -548,7 +643,7 @@ function App() {
       }
     }, 1000) // Atualiza a cada 1 segundo para tempo real
     return () => clearInterval(interval)
-  }, [isRunning])
+  }, [isRunning, streamConnected, dataFilter])
 
   // Verifica permissão de notificação ao carregar
   useEffect(() => {
@@ -706,7 +801,7 @@ function App() {
               {/* Filtro de dados */}
               <div className="flex items-center space-x-2">
                 <Filter className="h-4 w-4" />
-                <Select value={dataFilter.toString()} onValueChange={(value) => updateFilter(value === "sem_filtro" ? "sem_filtro" : parseInt(value))}>
+                <Select value={dataFilter.toString()} onValueChange={(value) => updateFilter(/^\d+$/.test(value) ? parseInt(value) : value)}>
                   <SelectTrigger className="w-24">
                     <SelectValue />
                   </SelectTrigger>
@@ -717,6 +812,9 @@ function App() {
                     <SelectItem value="500">500</SelectItem>
                     <SelectItem value="1000">1000</SelectItem>
                     <SelectItem value="3000">3000</SelectItem>
+                    <SelectItem value="15m">15 min</SelectItem>
+                    <SelectItem value="1h">1 h</SelectItem>
+                    <SelectItem value="24h">24 h</SelectItem>
                     <SelectItem value="sem_filtro">Sem Filtro</SelectItem>
                   </SelectContent>
                 </Select>
@@ -1050,7 +1148,7 @@ function App() {
                 <span>Análise Detalhada - {selectedMarket}</span>
               </CardTitle>
               <CardDescription className={darkMode ? 'text-gray-400' : ''}>
-                Estatísticas por tamanho de grupo e tipo de estratégia (Filtro: {dataFilter} tickets)
+                Estatísticas por tamanho de grupo e tipo de estratégia (Filtro: {dataFilter}{typeof dataFilter === "number" ? " tickets" : ""})
               </CardDescription>
             </CardHeader>
             <CardContent>